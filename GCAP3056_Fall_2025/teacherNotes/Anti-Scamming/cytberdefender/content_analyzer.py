@@ -12,6 +12,9 @@ import logging
 from pathlib import Path
 from datetime import datetime
 import re
+import sys
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'crawl_common'))
+from crawl_logging import setup_crawl_logging, log_event, log_progress
 
 class ContentAnalyzer:
     def __init__(self, output_dir="C:\\Users\\simonwang\\Documents\\Vault4sync\\01-Courses\\GCAP3056\\Anti-Scamming\\cytberdefender"):
@@ -26,20 +29,13 @@ class ContentAnalyzer:
     def setup_logging(self):
         """Setup logging configuration"""
         log_file = self.output_dir / "content_analyzer.log"
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file, encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
+        setup_crawl_logging(log_file, events_file=self.output_dir / "content_analyzer.events.jsonl")
         self.logger = logging.getLogger(__name__)
     
     def extract_page_summary(self, url):
         """Extract a one-line summary from a webpage"""
         try:
-            self.logger.info(f"Analyzing: {url}")
+            self.logger.debug(f"Analyzing: {url}")
             
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -60,7 +56,7 @@ class ContentAnalyzer:
             return summary
             
         except Exception as e:
-            self.logger.error(f"Failed to analyze {url}: {str(e)}")
+            log_event(self.logger, 'analysis_failed', logging.ERROR, url=url, error=str(e))
             return f"Error: {str(e)[:100]}"
     
     def generate_summary(self, soup, url):
@@ -170,18 +166,21 @@ class ContentAnalyzer:
         
         # Create URL to summary mapping
         url_summaries = {}
+        sitemap_by_url = {entry['URL']: entry for entry in sitemap_data}
+        duplicates = {}
         
         self.logger.info(f"Analyzing {len(discovered_urls)} URLs...")
         
         for i, url in enumerate(discovered_urls, 1):
-            self.logger.info(f"Progress: {i}/{len(discovered_urls)} - {url}")
+            log_progress(self.logger, f"Progress: {i}/{len(discovered_urls)} - {url}")
             
             # Check if we already have this URL in sitemap
-            existing_entry = None
-            for entry in sitemap_data:
-                if entry['URL'] == url:
-                    existing_entry = entry
-                    break
+            existing_entry = sitemap_by_url.get(url)
+            
+            if existing_entry and existing_entry.get('Status') == 'duplicate':
+                # The crawler saw this page under another URL; reuse that summary
+                duplicates[url] = existing_entry.get('Duplicate Of', '')
+                continue
             
             if existing_entry:
                 # Use existing data
@@ -198,6 +197,9 @@ class ContentAnalyzer:
             if i % 10 == 0:
                 self.logger.info(f"Completed {i} URLs, continuing...")
         
+        for url, original in duplicates.items():
+            url_summaries[url] = url_summaries.get(original, f"Duplicate of {original}")
+        
         # Create enhanced sitemap
         self.create_enhanced_sitemap(sitemap_data, url_summaries)
         
@@ -210,7 +212,7 @@ class ContentAnalyzer:
         with open(enhanced_file, 'w', newline='', encoding='utf-8') as f:
             fieldnames = [
                 'URL', 'Filename', 'Title', 'Links Found', 'Status', 
-                'Timestamp', 'Error (if failed)', 'Category', 'Page Summary'
+                'Timestamp', 'Error (if failed)', 'Category', 'Duplicate Of', 'Page Summary'
             ]
             writer = csv.DictWriter(f, fieldnames=fieldnames)
             writer.writeheader()
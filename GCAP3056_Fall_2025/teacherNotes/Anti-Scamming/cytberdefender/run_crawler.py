@@ -5,14 +5,25 @@ Simple script to run the CyberDefender crawler
 
 import sys
 import os
+import argparse
 from pathlib import Path
 
 # Add the current directory to Python path
 sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'crawl_common'))
 
 from web_crawler import CyberDefenderCrawler
+from crawl_profiler import add_profile_arguments, run_profiled
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the CyberDefender crawler")
+    parser.add_argument('--max-pages', type=int, default=200)
+    parser.add_argument('--delay', type=float, default=1, help="Seconds between requests")
+    add_profile_arguments(parser)
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
     print("Starting CyberDefender Web Crawler...")
     print("=" * 50)
     
@@ -21,7 +32,7 @@ def main():
     
     # Run the crawler
     try:
-        crawler.crawl(max_pages=200, delay=1)
+        run_profiled(args, lambda: crawler.crawl(max_pages=args.max_pages, delay=args.delay), crawler.output_dir)
         print("\nCrawling completed successfully!")
         print(f"Check the output directory for downloaded files:")
         print(f"  {crawler.output_dir}")
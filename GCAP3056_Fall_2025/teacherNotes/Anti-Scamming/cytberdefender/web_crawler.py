@@ -15,6 +15,13 @@ import re
 from datetime import datetime
 import csv
 import json
+import sys
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'crawl_common'))
+from columnar_export import write_records
+from crawl_logging import setup_crawl_logging, log_event, log_progress
+from near_duplicates import NearDuplicateIndex, page_blocks
+from page_index import PageIndex
+from page_text import PageText
 
 class CyberDefenderCrawler:
     def __init__(self, base_url="https://cyberdefender.hk/en-us/", output_dir="C:\\Users\\simonwang\\Documents\\Vault4sync\\01-Courses\\GCAP3056\\Anti-Scamming\\cytberdefender"):
@@ -29,23 +36,22 @@ class CyberDefenderCrawler:
         self.unique_urls_to_crawl = set()
         self.url_normalization_cache = {}
         
+        # Pages already seen under another URL variant are not stored or expanded
+        self.duplicate_index = NearDuplicateIndex()
+        
         # Create output directory if it doesn't exist
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
         # Setup logging
         self.setup_logging()
         
+        # Full-text index of the saved pages, searchable with page_index.py
+        self.page_index = PageIndex(self.output_dir / "page_index.sqlite")
+        
     def setup_logging(self):
         """Setup logging configuration"""
         log_file = self.output_dir / "crawler.log"
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file, encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
+        setup_crawl_logging(log_file, events_file=self.output_dir / "crawler.events.jsonl")
         self.logger = logging.getLogger(__name__)
         
     def normalize_url(self, url):
@@ -97,7 +103,7 @@ class CyberDefenderCrawler:
     def download_page(self, url):
         """Download a single page"""
         try:
-            self.logger.info(f"Downloading: {url}")
+            self.logger.debug(f"Downloading: {url}")
             
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -114,6 +120,21 @@ class CyberDefenderCrawler:
             # Parse the HTML
             soup = BeautifulSoup(response.content, 'html.parser')
             
+            # Same page under another URL: record it, skip saving and link expansion
+            duplicate_of = self.duplicate_index.check(page_blocks(soup), url)
+            if duplicate_of:
+                self.site_map.append({
+                    'url': url,
+                    'filename': self.sanitize_filename(duplicate_of),
+                    'title': soup.title.string if soup.title else 'No Title',
+                    'links_found': 0,
+                    'timestamp': datetime.now().isoformat(),
+                    'status': 'duplicate',
+                    'duplicate_of': duplicate_of
+                })
+                log_event(self.logger, 'page_duplicate', url=url, duplicate_of=duplicate_of)
+                return []
+            
             # Extract all links from the page
             links = []
             for link in soup.find_all('a', href=True):
@@ -132,6 +153,7 @@ class CyberDefenderCrawler:
             
             with open(filepath, 'w', encoding='utf-8') as f:
                 f.write(response.text)
+            self.page_index.add(url, PageText.from_soup(soup).text(), soup.title.get_text().strip() if soup.title else '')
             
             # Add to site map
             self.site_map.append({
@@ -150,11 +172,12 @@ class CyberDefenderCrawler:
                 'links_found': len(links)
             })
             
-            self.logger.info(f"Saved: {filename} ({len(links)} links found)")
+            log_event(self.logger, 'page_saved', url=url, file=filename, status=response.status_code,
+                      bytes=len(response.content), links=len(links))
             return links
             
         except Exception as e:
-            self.logger.error(f"Failed to download {url}: {str(e)}")
+            log_event(self.logger, 'page_failed', logging.ERROR, url=url, error=str(e))
             self.failed_urls.append({'url': url, 'error': str(e)})
             
             # Add failed URL to site map
@@ -221,10 +244,12 @@ class CyberDefenderCrawler:
             # Respectful crawling delay
             time.sleep(delay)
             
-            self.logger.info(f"Progress: {pages_crawled} pages crawled, {len(urls_to_visit)} URLs in queue, {len(self.unique_urls_to_crawl)} unique URLs discovered")
+            log_progress(self.logger, f"Progress: {pages_crawled} pages crawled, {len(urls_to_visit)} URLs in queue, {len(self.unique_urls_to_crawl)} unique URLs discovered")
         
         self.generate_summary()
         self.generate_sitemap_csv()
+        self.page_index.commit()
+        self.logger.info(f"Near-duplicate pages skipped: {self.duplicate_index.duplicates}")
         self.logger.info("Crawling completed!")
     
     def crawl_all_discovered(self, max_pages=500, delay=1):
@@ -253,10 +278,11 @@ class CyberDefenderCrawler:
             time.sleep(delay)
             
             if pages_crawled % 50 == 0:
-                self.logger.info(f"Progress: {pages_crawled} pages crawled, {len(self.unique_urls_to_crawl)} total unique URLs discovered")
+                log_progress(self.logger, f"Progress: {pages_crawled} pages crawled, {len(self.unique_urls_to_crawl)} total unique URLs discovered")
         
         self.generate_summary()
         self.generate_sitemap_csv()
+        self.page_index.commit()
         self.logger.info("Comprehensive crawling completed!")
     
     def generate_summary(self):
@@ -269,6 +295,7 @@ class CyberDefenderCrawler:
             f.write(f"**Base URL:** {self.base_url}\n\n")
             f.write(f"**Total Pages Downloaded:** {len(self.downloaded_files)}\n\n")
             f.write(f"**Failed Downloads:** {len(self.failed_urls)}\n\n")
+            f.write(f"**Near-Duplicates Skipped:** {self.duplicate_index.duplicates}\n\n")
             
             f.write("## Downloaded Files\n\n")
             for file_info in self.downloaded_files:
@@ -291,7 +318,7 @@ class CyberDefenderCrawler:
             # Write header
             writer.writerow([
                 'URL', 'Filename', 'Title', 'Links Found', 'Status', 
-                'Timestamp', 'Error (if failed)', 'Category'
+                'Timestamp', 'Error (if failed)', 'Category', 'Duplicate Of'
             ])
             
             # Write site map data
@@ -307,9 +334,22 @@ class CyberDefenderCrawler:
                     page['status'],
                     page['timestamp'],
                     page.get('error', ''),
-                    category
+                    category,
+                    page.get('duplicate_of', '')
                 ])
         
+        # Typed copy of the site map for fast loading in pandas
+        table_file = self.output_dir / "sitemap.parquet"
+        write_records(
+            [dict(page, category=self.categorize_url(page['url'])) for page in self.site_map],
+            table_file,
+            [
+                ('url', 'string'), ('filename', 'string'), ('title', 'string'),
+                ('links_found', 'int'), ('status', 'category'), ('timestamp', 'timestamp'),
+                ('error', 'string'), ('category', 'category'), ('duplicate_of', 'string')
+            ]
+        )
+        
         # Also create a comprehensive URL list
         url_list_file = self.output_dir / "all_discovered_urls.txt"
         with open(url_list_file, 'w', encoding='utf-8') as f:
@@ -317,6 +357,7 @@ class CyberDefenderCrawler:
                 f.write(f"{url}\n")
         
         self.logger.info(f"Site map CSV saved to: {csv_file}")
+        self.logger.info(f"Site map Parquet saved to: {table_file}")
         self.logger.info(f"All discovered URLs saved to: {url_list_file}")
         self.logger.info(f"Total unique URLs discovered: {len(self.all_discovered_urls)}")
     
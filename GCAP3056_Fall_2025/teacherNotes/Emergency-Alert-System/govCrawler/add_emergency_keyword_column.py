@@ -2,67 +2,128 @@
 """
 Add emergency keyword column to the CSV file
 Identifies URLs that explicitly contain emergency-related keywords
+Tagging is vectorized: each chunk is scanned with one compiled regex, and
+only the matching rows are checked keyword by keyword, so large result files
+are processed in chunks without loading them into memory.
 """
 
 import pandas as pd
 import re
 import os
+import argparse
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'crawl_common'))
+from columnar_export import iter_batches, ColumnarWriter
 
-def add_emergency_keyword_column():
+# Define emergency-related keywords
+EMERGENCY_KEYWORDS = [
+    'emergency', 'crisis', 'disaster', 'alert', 'warning', 'preparedness',
+    'response', 'rescue', 'safety', 'security', 'incident', 'hazard',
+    'evacuation', 'shelter', 'relief', 'assistance', 'support', 'coordination',
+    'management', 'control', 'monitoring', 'assessment', 'planning'
+]
+
+CHUNK_SIZE = 100000
+
+
+def indicator_column(keyword):
+    """Name of the per-keyword indicator column"""
+    return f"kw_{keyword}"
+
+
+def tag_keywords(df, keywords=EMERGENCY_KEYWORDS, pattern=None):
+    """Add keyword indicator, count and summary columns to a DataFrame chunk"""
+    pattern = pattern or re.compile('|'.join(re.escape(keyword) for keyword in keywords))
+    text = (df['url'].fillna('').astype(str) + ' ' + df['title'].fillna('').astype(str)).str.lower()
+
+    # One regex pass finds the rows worth checking keyword by keyword
+    candidates = text.str.contains(pattern)
+    matrix = pd.DataFrame(False, index=df.index, columns=keywords)
+    if candidates.any():
+        candidate_text = text[candidates]
+        for keyword in keywords:
+            matrix.loc[candidates, keyword] = candidate_text.str.contains(keyword, regex=False)
+
+    df['emergency_keyword_count'] = matrix.sum(axis=1)
+    df['has_emergency_keywords'] = df['emergency_keyword_count'] > 0
+    # Boolean matrix dot keyword names joins the matches of each row
+    df['emergency_keywords_found'] = matrix.dot(pd.Index(keywords) + '; ').str.rstrip('; ')
+    for keyword in keywords:
+        df[indicator_column(keyword)] = matrix[keyword]
+    return df
+
+
+def read_chunks(input_file, chunksize):
+    """Read the crawl results in chunks from the typed table or the CSV"""
+    if input_file.endswith(('.parquet', '.arrows', '.arrow')):
+        return iter_batches(input_file, batch_size=chunksize)
+    return pd.read_csv(input_file, chunksize=chunksize)
+
+
+def add_emergency_keyword_column(input_file=None, output_file='emergency_directory_results_with_keywords.csv',
+                                 chunksize=CHUNK_SIZE):
     """Add a column to identify URLs with explicit emergency keywords"""
-    
-    # Define emergency-related keywords
-    emergency_keywords = [
-        'emergency', 'crisis', 'disaster', 'alert', 'warning', 'preparedness',
-        'response', 'rescue', 'safety', 'security', 'incident', 'hazard',
-        'evacuation', 'shelter', 'relief', 'assistance', 'support', 'coordination',
-        'management', 'control', 'monitoring', 'assessment', 'planning'
-    ]
-    
-    # Read the CSV file
-    csv_file = 'emergency_directory_results.csv'
-    df = pd.read_csv(csv_file)
-    
-    def contains_emergency_keywords(url, title):
-        """Check if URL or title contains emergency keywords"""
-        text_to_check = f"{url} {title}".lower()
-        
-        # Check for exact keyword matches
-        found_keywords = []
-        for keyword in emergency_keywords:
-            if keyword in text_to_check:
-                found_keywords.append(keyword)
-        
-        return found_keywords if found_keywords else None
-    
-    # Add the new column
-    df['emergency_keywords_found'] = df.apply(
-        lambda row: contains_emergency_keywords(row['url'], row['title']), 
-        axis=1
-    )
-    
-    # Create a more readable version
-    df['has_emergency_keywords'] = df['emergency_keywords_found'].notna()
-    
-    # Save the updated CSV
-    output_file = 'emergency_directory_results_with_keywords.csv'
-    df.to_csv(output_file, index=False)
-    
+
+    # Read the typed table if the crawler wrote one, otherwise the CSV
+    if input_file is None:
+        table_file = 'emergency_directory_results.parquet'
+        input_file = table_file if os.path.exists(table_file) else 'emergency_directory_results.csv'
+
+    pattern = re.compile('|'.join(re.escape(keyword) for keyword in EMERGENCY_KEYWORDS))
+
+    # Typed copy with the keyword matches as a real list column
+    table_output = os.path.splitext(output_file)[0] + '.parquet'
+    table_columns = [
+        ('url', 'string'), ('title', 'string'), ('crawled_at', 'timestamp'),
+        ('emergency_keywords_found', 'list'), ('emergency_keyword_count', 'int'),
+        ('has_emergency_keywords', 'bool')
+    ] + [(indicator_column(keyword), 'bool') for keyword in EMERGENCY_KEYWORDS]
+
+    total_rows = 0
+    emergency_total = 0
+    keyword_totals = pd.Series(0, index=EMERGENCY_KEYWORDS)
+    examples = []
+
+    with ColumnarWriter(table_output, table_columns) as writer:
+        for chunk_number, df in enumerate(read_chunks(input_file, chunksize)):
+            df = tag_keywords(df, pattern=pattern)
+
+            # Save the updated CSV, appending after the first chunk
+            df.to_csv(output_file, index=False, mode='w' if chunk_number == 0 else 'a',
+                      header=chunk_number == 0)
+            writer.write_frame(df)
+
+            total_rows += len(df)
+            emergency_total += int(df['has_emergency_keywords'].sum())
+            keyword_totals += df[[indicator_column(keyword) for keyword in EMERGENCY_KEYWORDS]].sum().values
+            if len(examples) < 5:
+                examples.extend(df[df['has_emergency_keywords']].head(5 - len(examples)).to_dict('records'))
+
     print(f"Updated CSV saved as: {output_file}")
-    print(f"Total rows: {len(df)}")
-    print(f"Rows with emergency keywords: {df['has_emergency_keywords'].sum()}")
-    
+    print(f"Typed table saved as: {table_output}")
+    print(f"Total rows: {total_rows}")
+    print(f"Rows with emergency keywords: {emergency_total}")
+
+    top_keywords = keyword_totals[keyword_totals > 0].sort_values(ascending=False).head(10)
+    if not top_keywords.empty:
+        print("\nMost frequent keywords:")
+        for keyword, count in top_keywords.items():
+            print(f"- {keyword}: {count}")
+
     # Show some examples
-    emergency_rows = df[df['has_emergency_keywords'] == True]
-    if not emergency_rows.empty:
+    if examples:
         print("\nExamples of URLs with emergency keywords:")
-        for idx, row in emergency_rows.head(5).iterrows():
+        for row in examples:
             print(f"- {row['url']}")
-            print(f"  Keywords: {', '.join(row['emergency_keywords_found'])}")
-            print(f"  Title: {row['title'][:100]}...")
+            print(f"  Keywords: {row['emergency_keywords_found'].replace('; ', ', ')}")
+            print(f"  Title: {str(row['title'])[:100]}...")
             print()
 
 if __name__ == "__main__":
-    add_emergency_keyword_column()
-
-
+    parser = argparse.ArgumentParser(description="Tag crawl results that mention emergency keywords")
+    parser.add_argument('--input', help="Results CSV or Parquet file (default: the crawler's output)")
+    parser.add_argument('--output', default='emergency_directory_results_with_keywords.csv', help="Output CSV file")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE, help="Rows processed per chunk")
+    args = parser.parse_args()
+    add_emergency_keyword_column(args.input, args.output, args.chunksize)
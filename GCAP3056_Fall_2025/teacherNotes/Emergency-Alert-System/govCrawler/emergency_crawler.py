@@ -13,6 +13,13 @@ from urllib.parse import urljoin, urlparse
 import logging
 from datetime import datetime
 import os
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'crawl_common'))
+from columnar_export import write_records
+from crawl_logging import setup_crawl_logging, markdown_log, log_event
+from page_index import PageIndex
+from page_text import PageText, KeywordMatcher
 
 class EmergencyDirectoryCrawler:
     def __init__(self, base_url="https://tel.directory.gov.hk/", output_dir=None):
@@ -27,15 +34,13 @@ class EmergencyDirectoryCrawler:
         
         # Setup logging
         log_file = os.path.join(self.output_dir, 'emergency_crawler.log')
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file),
-                logging.StreamHandler()
-            ]
-        )
+        setup_crawl_logging(log_file, events_file=os.path.join(self.output_dir, 'emergency_crawler.events.jsonl'))
         self.logger = logging.getLogger(__name__)
+        # Progress notes for govCrawllog.md, appended in batches by the logging thread
+        self.crawl_log = markdown_log('govCrawllog', os.path.join(self.output_dir, 'govCrawllog.md'))
+        
+        # Full-text index of every fetched page, so new keywords can be tried without a new crawl
+        self.page_index = PageIndex(os.path.join(self.output_dir, 'page_index.sqlite'))
         
         # Comprehensive emergency-related keywords
         self.emergency_keywords = [
@@ -75,42 +80,52 @@ class EmergencyDirectoryCrawler:
             
             # Time-sensitive terms
             'urgent', 'immediate', 'critical', 'priority', 'essential',
-            'vital', 'important', 'significant', 'major', 'severe'
+            'vital', 'important', 'significant', 'major', 'severe',
+            
+            # Traditional Chinese pages: emergency, disaster, warning, typhoon, rescue, evacuation
+            '緊急', '災害', '警告', '颱風', '救援', '疏散'
         ]
+        self.keyword_matcher = KeywordMatcher(self.emergency_keywords)
 
     def is_emergency_related(self, text, title=""):
-        """Check if content is emergency-related based on keywords with scoring"""
-        text_lower = (text + " " + title).lower()
+        """Check if content (a PageText or plain text) is emergency-related based on keywords"""
+        page = text if isinstance(text, PageText) else PageText.from_text(text)
+        if title:
+            page = PageText(page.segments + [title])
         
-        # Count keyword matches
-        matches = []
-        for keyword in self.emergency_keywords:
-            if keyword in text_lower:
-                matches.append(keyword)
+        # Keyword matches, checked one block of text at a time
+        matches = list(self.keyword_matcher.positions(page))
         
         # Return matches if any found
         return matches if matches else None
 
+    def is_valid_url(self, url):
+        """Only crawl pages from the directory's own domain"""
+        return urlparse(url).netloc == urlparse(self.base_url).netloc
+
     def crawl_page(self, url, max_depth=5, current_depth=0):
         """Crawl a single page and extract emergency-related information"""
         if url in self.visited_urls or current_depth > max_depth:
             return
         
         self.visited_urls.add(url)
-        self.logger.info(f"Crawling: {url} (depth: {current_depth})")
+        self.logger.debug(f"Crawling: {url} (depth: {current_depth})")
         
         try:
             response = self.session.get(url, timeout=10)
             response.raise_for_status()
             
             soup = BeautifulSoup(response.content, 'html.parser')
+            log_event(self.logger, 'page_fetched', url=url, depth=current_depth, status=response.status_code,
+                      bytes=len(response.content))
             
             # Extract page information
             title = soup.find('title')
             title_text = title.get_text().strip() if title else ""
             
-            # Get all text content
-            page_text = soup.get_text()
+            # Get all text content, block by block
+            page_text = PageText.from_soup(soup)
+            self.page_index.add(url, page_text.text(), title_text)
             
             # Check if page is emergency-related
             keyword_matches = self.is_emergency_related(page_text, title_text)
@@ -141,13 +156,12 @@ class EmergencyDirectoryCrawler:
                     href = link['href']
                     full_url = urljoin(url, href)
                     
-                    # Only crawl pages from the same domain
-                    if urlparse(full_url).netloc == urlparse(self.base_url).netloc:
+                    if self.is_valid_url(full_url):
                         time.sleep(1)  # Be respectful with requests
                         self.crawl_page(full_url, max_depth, current_depth + 1)
                         
         except Exception as e:
-            self.logger.error(f"Error crawling {url}: {str(e)}")
+            log_event(self.logger, 'page_failed', logging.ERROR, url=url, depth=current_depth, error=str(e))
 
     def extract_contact_info(self, soup):
         """Extract contact information from the page"""
@@ -173,11 +187,7 @@ class EmergencyDirectoryCrawler:
 
     def update_log_file(self, message):
         """Update the log file with progress"""
-        log_file = os.path.join(self.output_dir, 'govCrawllog.md')
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        with open(log_file, 'a', encoding='utf-8') as f:
-            f.write(f"\n{timestamp}: {message}")
+        self.crawl_log.info(message)
 
     def save_to_csv(self):
         """Save results to CSV file"""
@@ -190,14 +200,23 @@ class EmergencyDirectoryCrawler:
                 writer.writerows(self.emergency_pages)
         
         self.logger.info(f"Results saved to {csv_file}")
+        
+        # Typed copy with keyword matches as a real list column
+        table_file = os.path.join(self.output_dir, 'emergency_directory_results.parquet')
+        write_records(self.emergency_pages, table_file, [
+            ('url', 'string'), ('title', 'string'), ('contacts', 'json'),
+            ('crawled_at', 'timestamp'), ('depth', 'int'),
+            ('keyword_matches', 'list'), ('match_count', 'int')
+        ])
+        self.logger.info(f"Results saved to {table_file}")
 
-    def run_crawl(self):
-        """Main crawling function"""
+    def run_crawl(self, priority_urls=None, max_depth=5):
+        """Main crawling function; priority_urls replaces the built-in list of starting points"""
         self.logger.info("Starting enhanced emergency directory crawl...")
         self.update_log_file("Starting enhanced emergency directory crawl with deeper search...")
         
         # Priority emergency-related starting points
-        priority_urls = [
+        priority_urls = priority_urls or [
             self.base_url,
             "https://tel.directory.gov.hk/0262000019_ENG.html",  # Emergency Preparedness and Assessment
             "https://tel.directory.gov.hk/index_HKO_ENG.html",   # Hong Kong Observatory
@@ -221,11 +240,12 @@ class EmergencyDirectoryCrawler:
         # Crawl priority URLs first
         for url in priority_urls:
             self.logger.info(f"Crawling priority URL: {url}")
-            self.crawl_page(url, max_depth=5, current_depth=0)
+            self.crawl_page(url, max_depth=max_depth, current_depth=0)
             time.sleep(2)  # Be respectful with requests
         
         # Save results
         self.save_to_csv()
+        self.page_index.close()
         
         self.logger.info(f"Enhanced crawling completed. Found {len(self.emergency_pages)} emergency-related pages.")
         self.update_log_file(f"Enhanced crawling completed. Found {len(self.emergency_pages)} emergency-related pages.")
@@ -3,12 +3,21 @@
 Show emergency-related URLs from the CSV
 """
 
+import os
 import pandas as pd
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'crawl_common'))
+from columnar_export import read_table
 
 def show_emergency_results():
     """Display URLs that contain emergency keywords"""
     
-    df = pd.read_csv('emergency_directory_results_with_keywords.csv')
+    table_file = 'emergency_directory_results_with_keywords.parquet'
+    if os.path.exists(table_file):
+        df = read_table(table_file)
+    else:
+        df = pd.read_csv('emergency_directory_results_with_keywords.csv')
     
     # Filter rows with emergency keywords
     emergency_rows = df[df['has_emergency_keywords'] == True]
@@ -9,6 +9,12 @@ import json
 from datetime import datetime
 from pathlib import Path
 import logging
+from collections import Counter
+import sys
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'crawl_common'))
+from crawl_logging import setup_crawl_logging
+from crawl_report import TopK, ReportSection, write_markdown, HIGH_RELEVANCE
+from page_text import PageText, KeywordMatcher
 
 class HKOContentAnalyzer:
     def __init__(self, output_dir):
@@ -55,28 +61,33 @@ class HKOContentAnalyzer:
         self.related_keywords = [
             'chatbot', 'bot', 'ai', 'artificial intelligence', 'assistant',
             'weather', 'forecast', 'meteorology', 'observatory', 'hko',
-            'dr tin', 'tin', 'weatherman', 'meteorologist'
+            'dr tin', 'tin', 'weatherman', 'meteorologist',
+            # Traditional Chinese pages: chatbot, artificial intelligence, observatory, weather
+            '聊天機械人', '人工智能', '天文台', '天氣'
         ]
+        self.compiled_patterns = [re.compile(pattern) for pattern in self.dr_tin_patterns]
+        self.keyword_matcher = KeywordMatcher(self.related_keywords)
         
         self.analysis_results = []
+        
+        # Running totals for the analysis report, updated per relevant page
+        self.dr_tin_page_count = 0
+        self.high_relevance_count = 0
+        self.high_relevance_pages = TopK()   # (url, keywords) by relevance score
+        self.keyword_totals = Counter()
+        self.mention_entries = ReportSection()
         self.setup_logging()
     
     def setup_logging(self):
         """Setup logging for content analyzer"""
         log_file = self.output_dir / "content_analyzer.log"
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file, encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
+        # Joins the crawler's logging pipeline rather than configuring a second one
+        setup_crawl_logging(log_file)
         self.logger = logging.getLogger(__name__)
     
     def analyze_content(self, content, url, filename):
-        """Analyze content for Dr Tin chatbot mentions and related content"""
-        content_lower = content.lower()
+        """Analyze content (a PageText or plain text) for Dr Tin chatbot mentions and related content"""
+        page = content if isinstance(content, PageText) else PageText.from_text(content)
         analysis = {
             'url': url,
             'filename': filename,
@@ -87,42 +98,63 @@ class HKOContentAnalyzer:
             'has_dr_tin_mention': False
         }
         
-        # Check for Dr Tin patterns
-        for pattern in self.dr_tin_patterns:
-            matches = re.finditer(pattern, content_lower, re.IGNORECASE)
-            for match in matches:
-                context_start = max(0, match.start() - 150)
-                context_end = min(len(content), match.end() + 150)
-                context = content[context_start:context_end].strip()
-                
-                analysis['dr_tin_mentions'].append({
-                    'pattern': pattern,
-                    'match': match.group(),
-                    'context': context,
-                    'position': match.start(),
-                    'confidence': self.calculate_confidence(match.group(), context)
-                })
-                analysis['has_dr_tin_mention'] = True
+        # Check for Dr Tin patterns, one casefolded block of text at a time
+        for number, match, index, offset in page.finditer(self.compiled_patterns):
+            context = page.context(index, match.start(), match.end(), 150)
+            analysis['dr_tin_mentions'].append({
+                'pattern': self.dr_tin_patterns[number],
+                'match': match.group(),
+                'context': context,
+                'position': offset + match.start(),
+                'confidence': self.calculate_confidence(match.group(), context)
+            })
+            analysis['has_dr_tin_mention'] = True
         
         # Check for related keywords
-        for keyword in self.related_keywords:
-            if keyword in content_lower:
-                count = content_lower.count(keyword)
-                analysis['related_keywords'].append({
-                    'keyword': keyword,
-                    'count': count,
-                    'positions': [m.start() for m in re.finditer(keyword, content_lower)]
-                })
+        for keyword, positions in self.keyword_matcher.positions(page).items():
+            analysis['related_keywords'].append({
+                'keyword': keyword,
+                'count': len(positions),
+                'positions': positions
+            })
         
         # Calculate relevance score
         analysis['relevance_score'] = self.calculate_relevance_score(analysis)
         
         if analysis['has_dr_tin_mention'] or analysis['relevance_score'] > 0.3:
             self.analysis_results.append(analysis)
+            self.record_analysis(analysis)
             self.logger.info(f"Relevant content found in: {url}")
         
         return analysis
     
+    def record_analysis(self, analysis):
+        """Update the report totals and render this page's report entry"""
+        url = analysis['url']
+        for kw in analysis['related_keywords']:
+            self.keyword_totals[kw['keyword']] += kw['count']
+        if analysis['relevance_score'] > HIGH_RELEVANCE:
+            self.high_relevance_count += 1
+            keywords = ', '.join([kw['keyword'] for kw in analysis['related_keywords']])
+            self.high_relevance_pages.add(analysis['relevance_score'], (url, keywords))
+        if not analysis['has_dr_tin_mention']:
+            return
+        
+        self.dr_tin_page_count += 1
+        lines = [
+            f"### {self.mention_entries.next_number()}. [{url}]({url})\n\n",
+            f"**Filename:** {analysis['filename']}\n",
+            f"**Relevance Score:** {analysis['relevance_score']:.2f}\n\n",
+            "**Mentions Found:**\n"
+        ]
+        for j, mention in enumerate(analysis['dr_tin_mentions'], 1):
+            lines.append(f"{j}. **Pattern:** `{mention['pattern']}`\n")
+            lines.append(f"   **Match:** `{mention['match']}`\n")
+            lines.append(f"   **Confidence:** {mention['confidence']:.2f}\n")
+            lines.append(f"   **Context:** {mention['context']}\n\n")
+        lines.append("---\n\n")
+        self.mention_entries.add(''.join(lines))
+    
     def calculate_confidence(self, match, context):
         """Calculate confidence score for a match"""
         confidence = 0.5  # Base confidence
@@ -163,63 +195,41 @@ class HKOContentAnalyzer:
         """Generate comprehensive analysis report"""
         report_file = self.output_dir / "reports" / "content_analysis_report.md"
         
-        with open(report_file, 'w', encoding='utf-8') as f:
-            f.write("# HKO Content Analysis Report\n\n")
-            f.write(f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            f.write(f"**Total pages analyzed:** {len(self.analysis_results)}\n\n")
-            
+        report_file.parent.mkdir(parents=True, exist_ok=True)
+        
+        parts = [
+            "# HKO Content Analysis Report\n\n",
+            f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n",
+            f"**Total pages analyzed:** {len(self.analysis_results)}\n\n",
             # Summary statistics
-            dr_tin_pages = [a for a in self.analysis_results if a['has_dr_tin_mention']]
-            high_relevance = [a for a in self.analysis_results if a['relevance_score'] > 0.5]
-            
-            f.write("## Summary Statistics\n\n")
-            f.write(f"- **Pages with Dr Tin mentions:** {len(dr_tin_pages)}\n")
-            f.write(f"- **High relevance pages:** {len(high_relevance)}\n")
-            f.write(f"- **Total relevant pages:** {len(self.analysis_results)}\n\n")
-            
-            # Dr Tin mentions
-            if dr_tin_pages:
-                f.write("## Dr Tin Chatbot Mentions\n\n")
-                for i, analysis in enumerate(dr_tin_pages, 1):
-                    f.write(f"### {i}. [{analysis['url']}]({analysis['url']})\n\n")
-                    f.write(f"**Filename:** {analysis['filename']}\n")
-                    f.write(f"**Relevance Score:** {analysis['relevance_score']:.2f}\n\n")
-                    
-                    f.write("**Mentions Found:**\n")
-                    for j, mention in enumerate(analysis['dr_tin_mentions'], 1):
-                        f.write(f"{j}. **Pattern:** `{mention['pattern']}`\n")
-                        f.write(f"   **Match:** `{mention['match']}`\n")
-                        f.write(f"   **Confidence:** {mention['confidence']:.2f}\n")
-                        f.write(f"   **Context:** {mention['context']}\n\n")
-                    
-                    f.write("---\n\n")
-            else:
-                f.write("## No Dr Tin Chatbot Mentions Found\n\n")
-                f.write("The analysis did not find any direct mentions of 'Dr Tin chatbot' on the HKO website.\n\n")
-            
-            # High relevance pages
-            if high_relevance:
-                f.write("## High Relevance Pages\n\n")
-                for i, analysis in enumerate(high_relevance, 1):
-                    f.write(f"### {i}. [{analysis['url']}]({analysis['url']})\n\n")
-                    f.write(f"**Relevance Score:** {analysis['relevance_score']:.2f}\n")
-                    f.write(f"**Related Keywords:** {', '.join([kw['keyword'] for kw in analysis['related_keywords']])}\n\n")
-            
-            # Keyword analysis
-            f.write("## Keyword Analysis\n\n")
-            keyword_stats = {}
-            for analysis in self.analysis_results:
-                for kw in analysis['related_keywords']:
-                    keyword = kw['keyword']
-                    if keyword not in keyword_stats:
-                        keyword_stats[keyword] = 0
-                    keyword_stats[keyword] += kw['count']
-            
-            f.write("**Most frequently mentioned keywords:**\n")
-            for keyword, count in sorted(keyword_stats.items(), key=lambda x: x[1], reverse=True)[:10]:
-                f.write(f"- **{keyword}:** {count} mentions\n")
+            "## Summary Statistics\n\n",
+            f"- **Pages with Dr Tin mentions:** {self.dr_tin_page_count}\n",
+            f"- **High relevance pages:** {self.high_relevance_count}\n",
+            f"- **Total relevant pages:** {len(self.analysis_results)}\n\n"
+        ]
+        
+        # Dr Tin mentions, rendered as each page was analyzed
+        if self.mention_entries:
+            parts += ["## Dr Tin Chatbot Mentions\n\n", self.mention_entries]
+        else:
+            parts += ["## No Dr Tin Chatbot Mentions Found\n\n",
+                      "The analysis did not find any direct mentions of 'Dr Tin chatbot' on the HKO website.\n\n"]
+        
+        # High relevance pages
+        if self.high_relevance_pages:
+            parts.append(f"## High Relevance Pages (top {len(self.high_relevance_pages)} of {self.high_relevance_count})\n\n")
+            for i, (score, (url, keywords)) in enumerate(self.high_relevance_pages.items(), 1):
+                parts.append(f"### {i}. [{url}]({url})\n\n")
+                parts.append(f"**Relevance Score:** {score:.2f}\n")
+                parts.append(f"**Related Keywords:** {keywords}\n\n")
+        
+        # Keyword analysis
+        parts += ["## Keyword Analysis\n\n", "**Most frequently mentioned keywords:**\n"]
+        for keyword, count in self.keyword_totals.most_common(10):
+            parts.append(f"- **{keyword}:** {count} mentions\n")
         
-        self.logger.info(f"Analysis report saved to: {report_file}")
+        write_markdown(report_file, parts)
+        self.logger.debug(f"Analysis report saved to: {report_file}")
     
     def save_analysis_data(self):
         """Save analysis data as JSON for further processing"""
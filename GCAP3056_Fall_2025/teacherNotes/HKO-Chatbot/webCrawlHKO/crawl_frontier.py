@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Crawl Frontier
+Priority frontier for the enhanced HKO crawler. In focused mode every link is
+given a predicted relevance before it is fetched, from its anchor text, the
+words in its URL and the page that links to it, and the most promising link
+is crawled next. The parent's contribution is how far HKOContentAnalyzer
+scored it above the average page crawled so far (weather words alone give
+most HKO pages a middling score), or the parent's own predicted relevance if
+that is higher, so a trail of promising hub pages keeps its priority. The crawl
+stops once the last PATIENCE pages found no new Dr Tin mention and nothing
+left on the frontier looks promising, instead of spending the whole page
+budget on weather pages.
+
+With every link at the same priority the frontier is plain breadth-first, so
+the default crawl keeps its original order.
+"""
+
+import heapq
+import re
+from urllib.parse import urlparse, unquote
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'crawl_common'))
+from page_text import fold, keyword_pattern
+
+# Weights of the evidence behind a link's predicted relevance (sum to 1)
+ANCHOR_WEIGHT = 0.5
+URL_WEIGHT = 0.3
+PARENT_WEIGHT = 0.2
+
+# Words that point towards Dr Tin / chatbot pages. Weather words are on nearly
+# every HKO page, so they are not evidence here.
+CUE_WEIGHTS = {
+    'chatbot': 0.6,
+    'dr tin': 0.6,
+    'artificial intelligence': 0.4,
+    'ai': 0.3,
+    'bot': 0.3,
+    'assistant': 0.3,
+    'technology': 0.15,
+    'education': 0.1,
+    '聊天機械人': 0.6,    # chatbot
+    '人工智能': 0.4       # artificial intelligence
+}
+MAX_CUE_SCORE = 0.8    # cue words alone never rate as high as a Dr Tin pattern
+
+PATIENCE = 50          # pages without a new Dr Tin mention before the crawl may stop
+STOP_PRIORITY = 0.25   # ... provided no link on the frontier is predicted above this
+
+URL_WORD_SPLIT = re.compile(r'[\W_]+')
+
+
+class LinkScorer:
+    """Predicted relevance of a link, using the analyzer's Dr Tin patterns"""
+
+    def __init__(self, analyzer):
+        self.patterns = [re.compile(rf'\b(?:{p})\b') for p in analyzer.dr_tin_patterns]
+        self.cues = [(keyword_pattern(term, whole_words=True), weight) for term, weight in CUE_WEIGHTS.items()]
+        self.relevance_total = 0.0
+        self.pages = 0
+
+    def text_score(self, text):
+        """1.0 for a Dr Tin pattern, otherwise the summed weight of the cue words present"""
+        text = ' '.join(fold(text).split())
+        if not text:
+            return 0.0
+        if any(p.search(text) for p in self.patterns):
+            return 1.0
+        return min(sum(weight for cue, weight in self.cues if cue.search(text)), MAX_CUE_SCORE)
+
+    def url_words(self, url):
+        """The words of a URL's path and query, e.g. '.../00569-How-Chatbot-Dr-Tin' -> '00569 how chatbot dr tin'"""
+        parsed = urlparse(url)
+        return ' '.join(URL_WORD_SPLIT.split(fold(unquote(f"{parsed.path} {parsed.query}")))).strip()
+
+    def observe(self, relevance):
+        """Add a crawled page's relevance score to the site average"""
+        self.relevance_total += relevance
+        self.pages += 1
+
+    def parent_signal(self, relevance, predicted):
+        """How promising the linking page is: relevance above the site average, or its own prediction"""
+        mean = self.relevance_total / self.pages if self.pages else 0.0
+        excess = max(relevance - mean, 0.0) / (1.0 - mean) if mean < 1.0 else 0.0
+        return max(excess, predicted)
+
+    def predict(self, url, anchor_text, parent_signal):
+        return (ANCHOR_WEIGHT * self.text_score(anchor_text) +
+                URL_WEIGHT * self.text_score(self.url_words(url)) +
+                PARENT_WEIGHT * parent_signal)
+
+
+class CrawlFrontier:
+    """URLs waiting to be crawled, highest priority first and first-come first among equals"""
+
+    def __init__(self, patience=None, stop_priority=STOP_PRIORITY):
+        self.heap = []          # (-priority, arrival, url); superseded entries are skipped on pop
+        self.priority = {}      # queued url -> best priority so far
+        self.arrivals = 0
+        self.patience = patience
+        self.stop_priority = stop_priority
+        self.pages_since_gain = 0
+
+    def push(self, url, priority=0.0):
+        """Queue a URL, or raise its priority if it is already queued with a lower one"""
+        if url in self.priority and self.priority[url] >= priority:
+            return
+        self.priority[url] = priority
+        heapq.heappush(self.heap, (-priority, self.arrivals, url))
+        self.arrivals += 1
+
+    def discard_stale(self):
+        while self.heap and self.priority.get(self.heap[0][2]) != -self.heap[0][0]:
+            heapq.heappop(self.heap)
+
+    def pop(self):
+        """(url, priority) of the most promising queued URL"""
+        self.discard_stale()
+        neg_priority, _, url = heapq.heappop(self.heap)
+        del self.priority[url]
+        return url, -neg_priority
+
+    def best_priority(self):
+        self.discard_stale()
+        return -self.heap[0][0] if self.heap else None
+
+    def record(self, gain):
+        """Note whether the page just crawled added anything (e.g. a Dr Tin mention)"""
+        self.pages_since_gain = 0 if gain else self.pages_since_gain + 1
+
+    def exhausted(self):
+        """True once recent pages stopped paying off and nothing queued looks better"""
+        if self.patience is None or self.pages_since_gain < self.patience:
+            return False
+        best = self.best_priority()
+        return best is None or best < self.stop_priority
+
+    def __contains__(self, url):
+        return url in self.priority
+
+    def __len__(self):
+        return len(self.priority)
+
+    def __bool__(self):
+        return bool(self.priority)
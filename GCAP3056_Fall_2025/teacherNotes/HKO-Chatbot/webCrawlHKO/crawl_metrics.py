@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Crawl Metrics
+Counters, gauges and per-stage timing histograms for the HKO crawlers,
+exposed on a local OpenMetrics (Prometheus) endpoint and as a JSON snapshot.
+Stages cover the network (connect, tls, ttfb, download) as well as our own
+work (parse, analysis, disk_write) and the politeness delay (sleep), so a run
+shows whether hko.gov.hk or the crawler itself is the bottleneck.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Upper bounds (seconds) of the stage histogram buckets
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Estimate a quantile as the upper bound of the bucket it falls in"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        for bound, cumulative in zip(self.buckets, self.counts):
+            if cumulative >= target:
+                return bound
+        return self.max
+
+
+class CrawlMetrics:
+    """Thread-safe metrics registry for one crawl"""
+
+    def __init__(self, prefix='hko_crawl'):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.counters = {}    # (name, labels) -> value
+        self.gauges = {}      # name -> value
+        self.stages = {}      # stage name -> Histogram
+        self.server = None
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+
+    def add_gauge(self, name, amount):
+        with self.lock:
+            self.gauges[name] = self.gauges.get(name, 0) + amount
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            if stage not in self.stages:
+                self.stages[stage] = Histogram()
+            self.stages[stage].observe(seconds)
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as one observation of a stage"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def session(self, pool_size=10):
+        """requests.Session whose connections report connect and TLS times"""
+        session = requests.Session()
+        adapter = TimedHTTPAdapter(self, pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def fetch(self, session, url, **kwargs):
+        """GET a page, timing time-to-first-byte and the body download separately"""
+        self.add_gauge('requests_in_flight', 1)
+        try:
+            response = session.get(url, stream=True, **kwargs)
+            # elapsed runs from sending the request to parsing the headers, so on a
+            # new connection it includes the connect and tls stages
+            self.observe('ttfb', response.elapsed.total_seconds())
+            with self.stage('download'):
+                body = response.content
+            self.inc('bytes_downloaded', len(body))
+            self.inc('responses', code=str(response.status_code))
+            return response
+        except requests.RequestException as e:
+            self.inc('request_errors', error=type(e).__name__)
+            raise
+        finally:
+            self.add_gauge('requests_in_flight', -1)
+
+    def snapshot(self):
+        """All metrics as a JSON-serialisable dict"""
+        with self.lock:
+            stages = {
+                name: {
+                    'count': hist.count,
+                    'total_seconds': round(hist.sum, 6),
+                    'mean_seconds': round(hist.sum / hist.count, 6) if hist.count else 0.0,
+                    'p50_seconds': hist.quantile(0.5),
+                    'p95_seconds': hist.quantile(0.95),
+                    'max_seconds': round(hist.max, 6),
+                    'buckets': dict(zip((str(b) for b in hist.buckets), hist.counts))
+                }
+                for name, hist in self.stages.items()
+            }
+            counters = {}
+            for (name, labels), value in self.counters.items():
+                label_text = ','.join(f'{k}={v}' for k, v in labels)
+                counters[f'{name}{{{label_text}}}' if labels else name] = value
+            return {
+                'generated': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'uptime_seconds': round(time.time() - self.started, 3),
+                'counters': counters,
+                'gauges': dict(self.gauges),
+                'stages': stages
+            }
+
+    def write_snapshot(self, path):
+        """Write the JSON snapshot, replacing the previous one atomically"""
+        path = str(path)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(path + '.tmp', path)
+
+    def render_openmetrics(self):
+        """All metrics in the OpenMetrics text format"""
+        p = self.prefix
+        lines = []
+        with self.lock:
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f'# TYPE {p}_{name} counter')
+                for (counter, labels), value in sorted(self.counters.items()):
+                    if counter == name:
+                        lines.append(f'{p}_{name}_total{format_labels(labels)} {value}')
+
+            for name, value in sorted(self.gauges.items()):
+                lines.append(f'# TYPE {p}_{name} gauge')
+                lines.append(f'{p}_{name} {value}')
+
+            lines.append(f'# TYPE {p}_stage_seconds histogram')
+            lines.append(f'# UNIT {p}_stage_seconds seconds')
+            for stage, hist in sorted(self.stages.items()):
+                for bound, count in zip(hist.buckets, hist.counts):
+                    labels = format_labels((('stage', stage), ('le', str(bound))))
+                    lines.append(f'{p}_stage_seconds_bucket{labels} {count}')
+                labels = format_labels((('stage', stage), ('le', '+Inf')))
+                lines.append(f'{p}_stage_seconds_bucket{labels} {hist.count}')
+                lines.append(f'{p}_stage_seconds_count{format_labels((("stage", stage),))} {hist.count}')
+                lines.append(f'{p}_stage_seconds_sum{format_labels((("stage", stage),))} {hist.sum:.6f}')
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port=9108, host='127.0.0.1'):
+        """Expose /metrics (OpenMetrics) and /metrics.json on a background thread"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith('/metrics.json'):
+                    body, content_type = json.dumps(metrics.snapshot(), indent=2), 'application/json'
+                elif self.path.startswith('/metrics'):
+                    body, content_type = metrics.render_openmetrics(), OPENMETRICS_CONTENT_TYPE
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f'http://{host}:{self.server.server_address[1]}/metrics'
+
+    def shutdown(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def summary_lines(self):
+        """Where the crawl spent its time, largest stage first"""
+        snapshot = self.snapshot()
+        stages = sorted(snapshot['stages'].items(), key=lambda item: item[1]['total_seconds'], reverse=True)
+        total = sum(stats['total_seconds'] for _, stats in stages) or 1.0
+        lines = []
+        for name, stats in stages:
+            lines.append(f"{name:<15} {stats['total_seconds']:9.2f}s {100 * stats['total_seconds'] / total:5.1f}%  "
+                         f"n={stats['count']}  mean={stats['mean_seconds'] * 1000:.1f}ms  "
+                         f"p95<={stats['p95_seconds'] * 1000:.0f}ms")
+        return lines
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """Transport adapter whose new connections report connect and TLS handshake times.
+
+    DNS resolution happens inside urllib3's connect call, so it is counted in
+    the connect stage rather than timed on its own.
+    """
+
+    def __init__(self, metrics, **kwargs):
+        self.metrics = metrics
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        metrics = self.metrics
+
+        class TimedHTTPConnection(HTTPConnection):
+            def _new_conn(self):
+                with metrics.stage('connect'):
+                    return super()._new_conn()
+
+        class TimedHTTPSConnection(HTTPSConnection):
+            def _new_conn(self):
+                started = time.perf_counter()
+                sock = super()._new_conn()
+                self.connect_seconds = time.perf_counter() - started
+                metrics.observe('connect', self.connect_seconds)
+                return sock
+
+            def connect(self):
+                self.connect_seconds = 0.0
+                started = time.perf_counter()
+                super().connect()
+                metrics.observe('tls', time.perf_counter() - started - self.connect_seconds)
+
+        class TimedHTTPConnectionPool(HTTPConnectionPool):
+            ConnectionCls = TimedHTTPConnection
+
+        class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+            ConnectionCls = TimedHTTPSConnection
+
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool
+        }
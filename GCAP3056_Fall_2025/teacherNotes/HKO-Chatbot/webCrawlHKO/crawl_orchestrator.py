@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""
+Crawl Orchestrator
+Runs the crawls listed in a JSON job file (HKO, CyberDefender, NASA, the
+government telephone directory, ...) at the same time instead of one script
+after another, and shows their progress in one table.
+
+Each job names a crawler, its seed URLs, scope rules, limits, an output
+directory and any analyzers to run once the crawl is done. Jobs are grouped
+by the host of their first seed into lanes. A lane is a process of its own
+that runs its jobs in order, so a host is never crawled by two jobs at once,
+the crawlers' politeness delays still hold, and the scripts cannot trip over
+each other's logging setup or same-named modules (content_analyzer.py exists
+in two directories).
+
+The lanes share two budgets: at most CONNECTIONS requests in flight across
+all lanes, and at most CPU_SLOTS lanes doing Python work (parsing, analysis,
+reports) at once. A lane gives up its CPU slot while it waits for the network
+or sleeps between requests, so one host's slow responses overlap with another
+host's work.
+
+    python crawl_orchestrator.py crawl_jobs.json
+    python crawl_orchestrator.py crawl_jobs.json --only hko nasa --connections 4 --cpu 2
+"""
+
+import argparse
+import contextlib
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+JOBS_FILE = 'crawl_jobs.json'
+LOG_DIR = 'orchestrator_logs'     # per-job console output and the run summary, next to the job file
+CONNECTIONS = 8                   # requests in flight across all lanes
+CPU_SLOTS = os.cpu_count() or 1   # lanes doing Python work at once
+PROGRESS_EVERY = 10               # seconds between progress tables
+
+# Crawlers a job can name: module (in the job's directory), class, the method
+# that runs the crawl, the limits it accepts and, if the seeds are not just
+# the base URL, the argument they go to
+CRAWLERS = {
+    'hko': {'module': 'hko_web_crawler', 'class': 'HKOWebCrawler', 'run': 'crawl',
+            'limits': ('max_pages', 'delay')},
+    'hko_enhanced': {'module': 'enhanced_hko_crawler', 'class': 'EnhancedHKOWebCrawler', 'run': 'crawl',
+                     'limits': ('max_pages', 'delay', 'focused', 'patience')},
+    'cyberdefender': {'module': 'web_crawler', 'class': 'CyberDefenderCrawler', 'run': 'crawl',
+                      'limits': ('max_pages', 'delay')},
+    'nasa': {'module': 'nasa_explorer', 'class': 'NASAExplorer', 'run': 'explore_nasa_site',
+             'limits': ('max_pages',)},
+    'gov_directory': {'module': 'emergency_crawler', 'class': 'EmergencyDirectoryCrawler', 'run': 'run_crawl',
+                      'limits': ('max_depth',), 'seeds': 'priority_urls'},
+}
+
+# Analyzers that run on a job's output directory after its crawl
+ANALYZERS = {
+    'page_summaries': {'module': 'content_analyzer', 'class': 'ContentAnalyzer', 'run': 'analyze_all_content'},
+    'complete_page_summaries': {'module': 'complete_content_analyzer', 'class': 'CompleteContentAnalyzer',
+                                'run': 'analyze_all_urls'},
+}
+
+# Limits every job accepts; the orchestrator enforces them on each request
+REQUEST_LIMITS = ('max_requests', 'max_minutes')
+
+JOB_KEYS = {'name', 'crawler', 'dir', 'seeds', 'scope', 'limits', 'analyzers', 'output_dir'}
+
+
+class JobFileError(ValueError):
+    pass
+
+
+class RequestRefused(requests.RequestException):
+    """Raised instead of sending a request that is out of scope or over the job's limits"""
+
+
+def load_jobs(path, only=None):
+    """The job file's budget and its jobs, checked and with directories resolved"""
+    path = Path(path)
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    base = path.resolve().parent
+
+    jobs = []
+    for number, job in enumerate(config.get('jobs', []), 1):
+        name = job.get('name') or f'job{number}'
+        unknown = set(job) - JOB_KEYS
+        if unknown:
+            raise JobFileError(f"{name}: unknown keys {sorted(unknown)}")
+        if job.get('crawler') not in CRAWLERS:
+            raise JobFileError(f"{name}: crawler must be one of {sorted(CRAWLERS)}")
+        if not job.get('seeds'):
+            raise JobFileError(f"{name}: needs at least one seed URL")
+
+        crawler = CRAWLERS[job['crawler']]
+        limits = job.get('limits', {})
+        unsupported = set(limits) - set(crawler['limits']) - set(REQUEST_LIMITS)
+        if unsupported:
+            raise JobFileError(f"{name}: {job['crawler']} does not take limits {sorted(unsupported)}")
+        for analyzer in job.get('analyzers', []):
+            if analyzer not in ANALYZERS:
+                raise JobFileError(f"{name}: analyzer must be one of {sorted(ANALYZERS)}")
+        scope = job.get('scope', {})
+        for pattern in scope.get('allow', []) + scope.get('deny', []):
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise JobFileError(f"{name}: bad scope pattern {pattern!r}: {e}")
+
+        directory = (base / job.get('dir', '.')).resolve()
+        jobs.append({
+            'name': name,
+            'crawler': job['crawler'],
+            'dir': str(directory),
+            'seeds': list(job['seeds']),
+            'host': urlparse(job['seeds'][0]).netloc,
+            'scope': {'allow': scope.get('allow', []), 'deny': scope.get('deny', [])},
+            'limits': limits,
+            'analyzers': job.get('analyzers', []),
+            'output_dir': str((base / job['output_dir']).resolve()) if job.get('output_dir') else str(directory)
+        })
+
+    names = [job['name'] for job in jobs]
+    if len(set(names)) != len(names):
+        raise JobFileError("job names must be unique")
+    if only:
+        missing = set(only) - set(names)
+        if missing:
+            raise JobFileError(f"no jobs named {sorted(missing)}")
+        jobs = [job for job in jobs if job['name'] in only]
+    return config.get('budget', {}), jobs
+
+
+def group_lanes(jobs):
+    """{host: [jobs]} in job-file order"""
+    lanes = {}
+    for job in jobs:
+        lanes.setdefault(job['host'], []).append(job)
+    return lanes
+
+
+class Lane:
+    """One host's jobs, run one after another in a worker process.
+
+    HTTPAdapter.send and time.sleep are wrapped for the whole process, so the
+    budgets, scope rules and request limits apply to every crawler and analyzer
+    without changing them.
+    """
+
+    def __init__(self, connections, cpu, events):
+        self.connections = connections
+        self.cpu = cpu
+        self.events = events
+        self.holding_cpu = False
+        self.job = None
+        self.allow = []
+        self.deny = []
+        self.max_requests = None
+        self.deadline = None
+        self.requests = 0
+        self.cut_off = False
+        self.sleep_for = time.sleep
+
+    def install(self):
+        lane = self
+        send = HTTPAdapter.send
+
+        def budgeted_send(adapter, request, *args, **kwargs):
+            return lane.send(send, adapter, request, *args, **kwargs)
+
+        HTTPAdapter.send = budgeted_send
+        time.sleep = self.sleep
+
+    def report(self, kind, **fields):
+        self.events.put((self.job['name'], kind, fields))
+
+    def acquire_cpu(self):
+        if not self.holding_cpu:
+            self.cpu.acquire()
+            self.holding_cpu = True
+
+    def release_cpu(self):
+        if self.holding_cpu:
+            self.holding_cpu = False
+            self.cpu.release()
+
+    def in_scope(self, url):
+        return ((not self.allow or any(p.search(url) for p in self.allow)) and
+                not any(p.search(url) for p in self.deny))
+
+    def refusal(self, url):
+        """Why a request may not be sent, or None"""
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self.cut_off = True
+            return 'time limit reached'
+        if self.max_requests is not None and self.requests >= self.max_requests:
+            self.cut_off = True
+            return 'request limit reached'
+        if not self.in_scope(url):
+            return 'out of scope'
+        return None
+
+    def send(self, send, adapter, request, *args, **kwargs):
+        if self.job is None or threading.current_thread() is not threading.main_thread():
+            return send(adapter, request, *args, **kwargs)
+        reason = self.refusal(request.url)
+        if reason:
+            self.report('refused', url=request.url, reason=reason)
+            raise RequestRefused(f"{reason}: {request.url}")
+
+        self.requests += 1
+        self.release_cpu()
+        waited = time.perf_counter()
+        self.connections.acquire()
+        started = time.perf_counter()
+        try:
+            response = send(adapter, request, *args, **kwargs)
+            size = len(response.content)   # read the body while the connection is still counted
+        except Exception as e:
+            self.report('request', url=request.url, error=type(e).__name__,
+                        wait=started - waited, seconds=time.perf_counter() - started)
+            raise
+        finally:
+            self.connections.release()
+            self.acquire_cpu()
+        self.report('request', url=request.url, status=response.status_code, bytes=size,
+                    wait=started - waited, seconds=time.perf_counter() - started)
+        return response
+
+    def sleep(self, seconds):
+        if self.job is None or threading.current_thread() is not threading.main_thread():
+            return self.sleep_for(seconds)
+        if self.cut_off:
+            return   # nothing more will be sent, so there is nobody to be polite to
+        self.release_cpu()
+        try:
+            self.sleep_for(seconds)
+        finally:
+            self.acquire_cpu()
+
+    def run_job(self, job, log_dir):
+        """Run one job's crawl and analyzers; failures are reported, not raised"""
+        self.job = job
+        self.allow = [re.compile(p) for p in job['scope']['allow']]
+        self.deny = [re.compile(p) for p in job['scope']['deny']]
+        self.max_requests = job['limits'].get('max_requests')
+        minutes = job['limits'].get('max_minutes')
+        self.deadline = time.monotonic() + 60 * minutes if minutes else None
+        self.requests = 0
+        self.cut_off = False
+
+        sys.path.insert(0, job['dir'])
+        console = open(Path(log_dir) / f"{job['name']}.console.log", 'w', encoding='utf-8')
+        try:
+            with contextlib.redirect_stdout(console), contextlib.redirect_stderr(console):
+                self.acquire_cpu()
+                self.report('state', state='running')
+                try:
+                    self.crawl(job)
+                    for name in job['analyzers']:
+                        self.report('state', state=f'analyzing: {name}')
+                        spec = ANALYZERS[name]
+                        analyzer = getattr(importlib.import_module(spec['module']), spec['class'])(job['output_dir'])
+                        getattr(analyzer, spec['run'])()
+                    self.report('finished', state='done')
+                except Exception as e:
+                    traceback.print_exc()
+                    self.report('finished', state='failed', error=f"{type(e).__name__}: {e}")
+                finally:
+                    reset_logging()
+                    self.release_cpu()
+        finally:
+            console.close()
+            sys.path.remove(job['dir'])
+            # The next job may come from another directory with modules of the same names
+            for name, module in list(sys.modules.items()):
+                if Path(getattr(module, '__file__', None) or '/').parent == Path(job['dir']):
+                    del sys.modules[name]
+            self.job = None
+
+    def crawl(self, job):
+        spec = CRAWLERS[job['crawler']]
+        module = importlib.import_module(spec['module'])
+        crawler = getattr(module, spec['class'])(base_url=job['seeds'][0], output_dir=job['output_dir'])
+
+        # Out-of-scope links are not queued at all, rather than refused one by one
+        if hasattr(crawler, 'is_valid_url'):
+            is_valid_url = crawler.is_valid_url
+            crawler.is_valid_url = lambda url: is_valid_url(url) and self.in_scope(url)
+
+        kwargs = {key: value for key, value in job['limits'].items() if key in spec['limits']}
+        if 'seeds' in spec:
+            kwargs[spec['seeds']] = job['seeds']
+        getattr(crawler, spec['run'])(**kwargs)
+
+
+def reset_logging():
+    """Stop the job's logging pipeline and detach every handler, so the next job starts clean"""
+    crawl_logging = sys.modules.get('crawl_logging')
+    if crawl_logging:
+        crawl_logging.stop_crawl_logging()
+    loggers = [logging.getLogger()] + [logger for logger in logging.Logger.manager.loggerDict.values()
+                                       if isinstance(logger, logging.Logger)]
+    for logger in loggers:
+        for handler in logger.handlers[:]:
+            logger.removeHandler(handler)
+            handler.close()
+
+
+def run_lane(jobs, connections, cpu, events, log_dir):
+    """Worker process: run a host's jobs in order"""
+    lane = Lane(connections, cpu, events)
+    lane.install()
+    for job in jobs:
+        lane.run_job(job, log_dir)
+
+
+class Progress:
+    """Combined view of every job, built from the lanes' events"""
+
+    def __init__(self, jobs):
+        self.started = time.time()
+        self.jobs = {job['name']: {
+            'host': job['host'], 'state': 'queued', 'requests': 0, 'errors': 0, 'refused': 0,
+            'bytes': 0, 'fetch_seconds': 0.0, 'wait_seconds': 0.0,
+            'started': None, 'finished': None, 'last_url': '', 'error': ''
+        } for job in jobs}
+
+    def update(self, name, kind, fields):
+        job = self.jobs[name]
+        if kind == 'state':
+            job['state'] = fields['state']
+            if job['started'] is None:
+                job['started'] = time.time()
+        elif kind == 'request':
+            job['requests'] += 1
+            job['bytes'] += fields.get('bytes', 0)
+            job['fetch_seconds'] += fields['seconds']
+            job['wait_seconds'] += fields['wait']
+            job['last_url'] = fields['url']
+            if 'error' in fields or fields['status'] >= 400:
+                job['errors'] += 1
+        elif kind == 'refused':
+            job['refused'] += 1
+        elif kind == 'finished':
+            job['state'] = fields['state']
+            job['error'] = fields.get('error', '')
+            job['finished'] = time.time()
+
+    def lane_exited(self, host, exitcode):
+        """Mark the unfinished jobs of a lane whose process died"""
+        for job in self.jobs.values():
+            if job['host'] == host and job['finished'] is None:
+                job['state'] = 'failed'
+                job['error'] = job['error'] or f"lane process exited with code {exitcode}"
+                job['finished'] = time.time()
+
+    def elapsed(self, job):
+        if job['started'] is None:
+            return 0.0
+        return (job['finished'] or time.time()) - job['started']
+
+    def failed(self):
+        return [name for name, job in self.jobs.items() if job['state'] == 'failed']
+
+    def render(self):
+        lines = [f"{'job':<16} {'host':<24} {'state':<28} {'requests':>8} {'errors':>6} {'refused':>7} "
+                 f"{'MB':>7} {'elapsed':>8}  last URL"]
+        for name, job in self.jobs.items():
+            lines.append(f"{name:<16} {job['host'][:24]:<24} {job['state'][:28]:<28} {job['requests']:>8} "
+                         f"{job['errors']:>6} {job['refused']:>7} {job['bytes'] / 1e6:>7.2f} "
+                         f"{self.elapsed(job):>7.0f}s  {job['last_url'][-60:]}")
+        requests_total = sum(job['requests'] for job in self.jobs.values())
+        wall = time.time() - self.started
+        fetching = sum(job['fetch_seconds'] for job in self.jobs.values())
+        waiting = sum(job['wait_seconds'] for job in self.jobs.values())
+        lines.append(f"{requests_total} requests in {wall:.0f}s ({requests_total / wall if wall else 0:.1f}/s); "
+                     f"{fetching:.0f}s of fetching across jobs, {waiting:.0f}s waiting for a connection")
+        return '\n'.join(lines)
+
+    def summary(self):
+        return {
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'wall_seconds': round(time.time() - self.started, 3),
+            'jobs': {name: {**job, 'elapsed_seconds': round(self.elapsed(job), 3)}
+                     for name, job in self.jobs.items()}
+        }
+
+
+def run(jobs, connections, cpu, log_dir, progress_every=PROGRESS_EVERY):
+    """Run the jobs in one process per host; returns the Progress when every lane has finished"""
+    Path(log_dir).mkdir(parents=True, exist_ok=True)
+    connection_slots = multiprocessing.BoundedSemaphore(connections)
+    cpu_slots = multiprocessing.BoundedSemaphore(cpu)
+    events = multiprocessing.Queue()
+    progress = Progress(jobs)
+
+    processes = {}
+    for host, lane_jobs in group_lanes(jobs).items():
+        process = multiprocessing.Process(target=run_lane, name=f'lane {host}',
+                                          args=(lane_jobs, connection_slots, cpu_slots, events, str(log_dir)))
+        process.start()
+        processes[host] = process
+
+    last_shown = time.monotonic()
+    try:
+        while any(process.is_alive() for process in processes.values()):
+            try:
+                progress.update(*events.get(timeout=1))
+            except queue.Empty:
+                pass
+            if time.monotonic() - last_shown >= progress_every:
+                print(progress.render() + '\n', flush=True)
+                last_shown = time.monotonic()
+    except KeyboardInterrupt:
+        print("\nStopping all lanes...")
+        for process in processes.values():
+            process.terminate()
+
+    for process in processes.values():
+        process.join()
+    while True:
+        try:
+            progress.update(*events.get(timeout=0.1))
+        except queue.Empty:
+            break
+    for host, process in processes.items():
+        if process.exitcode:
+            progress.lane_exited(host, process.exitcode)
+    return progress
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('jobs', nargs='?', default=JOBS_FILE, help=f"Job file (default: {JOBS_FILE})")
+    parser.add_argument('--only', nargs='+', metavar='NAME', help="Run only these jobs")
+    parser.add_argument('--connections', type=int, help=f"Requests in flight across all jobs (default: {CONNECTIONS})")
+    parser.add_argument('--cpu', type=int, help=f"Jobs doing Python work at once (default: {CPU_SLOTS})")
+    parser.add_argument('--progress-every', type=float, default=PROGRESS_EVERY, help="Seconds between progress tables")
+    parser.add_argument('--log-dir', help=f"Console logs and run summary (default: {LOG_DIR} next to the job file)")
+    args = parser.parse_args()
+
+    try:
+        budget, jobs = load_jobs(args.jobs, args.only)
+    except (OSError, ValueError) as e:
+        print(f"Cannot load {args.jobs}: {e}")
+        return 2
+    if not jobs:
+        print(f"No jobs in {args.jobs}")
+        return 2
+
+    connections = args.connections or budget.get('connections', CONNECTIONS)
+    cpu = args.cpu or budget.get('cpu', CPU_SLOTS)
+    log_dir = Path(args.log_dir) if args.log_dir else Path(args.jobs).resolve().parent / LOG_DIR
+    lanes = group_lanes(jobs)
+    print(f"Running {len(jobs)} jobs on {len(lanes)} hosts with {connections} connections and {cpu} CPU slots")
+    for host, lane_jobs in lanes.items():
+        print(f"  {host}: {', '.join(job['name'] for job in lane_jobs)}")
+    print(f"Console output of each job: {log_dir}\n")
+
+    progress = run(jobs, connections, cpu, log_dir, args.progress_every)
+    print(progress.render())
+
+    summary_file = log_dir / 'orchestrator_summary.json'
+    with open(summary_file, 'w', encoding='utf-8') as f:
+        json.dump(progress.summary(), f, indent=2)
+    print(f"\nSummary: {summary_file}")
+
+    failed = progress.failed()
+    for name in failed:
+        print(f"FAILED {name}: {progress.jobs[name]['error']}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Crawl Report
+Streaming Markdown reports for the HKO crawlers. Instead of rebuilding every
+report from site_map at the end of a run, each page is fed to a
+CrawlAggregates as it is processed. Counters, the top-K pages by relevance
+and the best mention snippets stay up to date, and per-page Markdown entries
+are rendered once, when the page arrives. Writing a report only joins those
+pieces, so reports can be refreshed every few pages during a long crawl and
+the final write does no per-page work.
+"""
+
+import heapq
+import os
+from collections import Counter
+from pathlib import Path
+
+TOP_K = 20
+HIGH_RELEVANCE = 0.5   # relevance score above which a page counts as high relevance
+REPORT_EVERY = 50      # pages between report refreshes during a crawl
+SNIPPET_CHARS = 200
+
+
+class TopK:
+    """The k highest-scoring items seen so far; on equal scores the earliest wins"""
+
+    def __init__(self, k=TOP_K):
+        self.k = k
+        self.heap = []   # min-heap of (score, -arrival, item)
+        self.seen = 0
+
+    def add(self, score, item):
+        entry = (score, -self.seen, item)
+        self.seen += 1
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, entry)
+        elif entry[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, entry)
+
+    def items(self):
+        """(score, item) pairs, best first"""
+        return [(score, item) for score, _, item in sorted(self.heap, key=lambda e: e[:2], reverse=True)]
+
+    def __len__(self):
+        return len(self.heap)
+
+
+class ReportSection:
+    """Append-only Markdown entries, each rendered once when it is added"""
+
+    def __init__(self):
+        self.entries = []
+
+    def add(self, text):
+        self.entries.append(text)
+
+    def next_number(self):
+        return len(self.entries) + 1
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class CrawlAggregates:
+    """Running totals for a crawl, updated once per page"""
+
+    def __init__(self, top_k=TOP_K, high_relevance=HIGH_RELEVANCE):
+        self.high_relevance = high_relevance
+        self.status = Counter()           # 'success' / 'failed' -> pages
+        self.dr_tin_pages = 0
+        self.high_relevance_pages = 0
+        self.top_pages = TopK(top_k)      # high relevance pages by score
+        self.snippets = TopK(top_k)       # mention contexts by confidence
+
+    def add_page(self, url, status, relevance=None, dr_tin=False):
+        self.status[status] += 1
+        if dr_tin:
+            self.dr_tin_pages += 1
+        if relevance is not None and relevance > self.high_relevance:
+            self.high_relevance_pages += 1
+            self.top_pages.add(relevance, url)
+
+    def add_mentions(self, url, mentions):
+        """Keep the page's most confident mention as a candidate snippet"""
+        if mentions:
+            best = max(mentions, key=lambda m: m.get('confidence', 1.0))
+            self.snippets.add(best.get('confidence', 1.0), (url, best['match'], shorten(best['context'])))
+
+    def top_pages_lines(self):
+        """Numbered Markdown links to the top high relevance pages"""
+        return [f"{i}. [{url}]({url}) (Score: {score:.2f})\n"
+                for i, (score, url) in enumerate(self.top_pages.items(), 1)]
+
+    def snippet_lines(self):
+        return [f"- [{url}]({url}) `{match}` ({confidence:.2f}): {context}\n"
+                for confidence, (url, match, context) in self.snippets.items()]
+
+
+def shorten(text, limit=SNIPPET_CHARS):
+    text = ' '.join(text.split())
+    return text if len(text) <= limit else text[:limit - 3] + '...'
+
+
+def write_markdown(path, parts):
+    """Write a report from rendered strings and ReportSections, replacing the old one atomically"""
+    path = Path(path)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        for part in parts:
+            if isinstance(part, ReportSection):
+                f.writelines(part.entries)
+            else:
+                f.write(part)
+    os.replace(tmp, path)
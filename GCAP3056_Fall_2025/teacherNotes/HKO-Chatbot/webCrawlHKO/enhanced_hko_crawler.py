@@ -4,22 +4,31 @@ Enhanced HKO Web Crawler with Advanced Content Analysis
 Downloads all pages from HKO website and performs detailed analysis for Dr Tin chatbot mentions
 """
 
-import requests
 from bs4 import BeautifulSoup
 import os
 import time
 import logging
 from urllib.parse import urljoin, urlparse
 from pathlib import Path
-import re
 from datetime import datetime
 import csv
 import json
 from content_analyzer import HKOContentAnalyzer
+from crawl_metrics import CrawlMetrics
+import sys
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'crawl_common'))
+from crawl_logging import setup_crawl_logging, log_event, log_progress
+from crawl_report import CrawlAggregates, ReportSection, write_markdown, REPORT_EVERY
+from near_duplicates import NearDuplicateIndex, page_blocks
+from crawl_frontier import CrawlFrontier, LinkScorer, PATIENCE
+from shared_frontier import POLL_SECONDS
+from page_index import PageIndex
+from page_text import PageText
 
 class EnhancedHKOWebCrawler:
     def __init__(self, base_url="https://www.hko.gov.hk/en/index.html", 
-                 output_dir="C:\\Users\\simonwang\\Documents\\Vault4sync\\01-Courses\\GCAP3056\\HKO-Chatbot\\webCrawlHKO"):
+                 output_dir="C:\\Users\\simonwang\\Documents\\Vault4sync\\01-Courses\\GCAP3056\\HKO-Chatbot\\webCrawlHKO",
+                 metrics_port=None):
         self.base_url = base_url
         self.domain = urlparse(base_url).netloc
         self.output_dir = Path(output_dir)
@@ -32,8 +41,23 @@ class EnhancedHKOWebCrawler:
         self.url_normalization_cache = {}
         self.dr_tin_mentions = []
         
+        # Running totals and pre-rendered report entries, updated page by page
+        self.stats = CrawlAggregates()
+        self.mention_entries = ReportSection()     # dr_tin_mentions_detailed.md
+        self.mention_links = ReportSection()       # link list in enhanced_crawl_summary.md
+        self.mention_log_links = ReportSection()   # numbered link list in webCrawllog_HKO.md
+        
+        # Pages already seen under another URL variant are not analyzed or expanded
+        self.duplicate_index = NearDuplicateIndex()
+        
+        # Per-stage timings and counters; served on metrics_port if given
+        self.metrics = CrawlMetrics()
+        self.metrics_port = metrics_port
+        self.session = self.metrics.session()
+        
         # Initialize content analyzer
         self.content_analyzer = HKOContentAnalyzer(output_dir)
+        self.link_scorer = LinkScorer(self.content_analyzer)
         
         # Create output directory structure
         self.setup_directories()
@@ -41,6 +65,9 @@ class EnhancedHKOWebCrawler:
         # Setup logging
         self.setup_logging()
         
+        # Full-text index of the stored pages, searchable with page_index.py
+        self.page_index = PageIndex(self.output_dir / "page_index.sqlite")
+        
     def setup_directories(self):
         """Create organized directory structure"""
         directories = [
@@ -58,14 +85,7 @@ class EnhancedHKOWebCrawler:
     def setup_logging(self):
         """Setup comprehensive logging"""
         log_file = self.output_dir / "logs" / "enhanced_hko_crawler.log"
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file, encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
+        setup_crawl_logging(log_file, events_file=self.output_dir / "logs" / "enhanced_hko_crawler.events.jsonl")
         self.logger = logging.getLogger(__name__)
         
     def normalize_url(self, url):
@@ -124,54 +144,69 @@ class EnhancedHKOWebCrawler:
     def download_and_analyze_page(self, url):
         """Download page and perform content analysis"""
         try:
-            self.logger.info(f"Downloading and analyzing: {url}")
+            self.logger.debug(f"Downloading and analyzing: {url}")
             
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
             }
             
-            response = requests.get(url, headers=headers, timeout=30)
+            response = self.metrics.fetch(self.session, url, headers=headers, timeout=30)
             response.raise_for_status()
             
             # Parse content
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
+            with self.metrics.stage('parse'):
+                soup = BeautifulSoup(response.content, 'html.parser')
+                
+                # Visible text by block, without script and style elements
+                content = PageText.from_soup(soup)
             
-            content = soup.get_text()
+            # Same page under another URL
+            with self.metrics.stage('dedup'):
+                duplicate_of = self.duplicate_index.check(page_blocks(soup), url)
+            if duplicate_of:
+                return self.record_duplicate(url, duplicate_of)
             
             # Save the page
             filename = self.sanitize_filename(url)
             file_path = self.output_dir / "downloaded_pages" / filename
             
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(response.text)
+            with self.metrics.stage('disk_write'):
+                with open(file_path, 'w', encoding='utf-8') as f:
+                    f.write(response.text)
+            with self.metrics.stage('indexing'):
+                self.page_index.add(url, content.text(), soup.title.get_text().strip() if soup.title else '')
             
             # Perform content analysis
-            analysis = self.content_analyzer.analyze_content(content, url, filename)
+            with self.metrics.stage('analysis'):
+                analysis = self.content_analyzer.analyze_content(content, url, filename)
             
             # Save to appropriate directory based on analysis
             if analysis['has_dr_tin_mention']:
                 dr_tin_file_path = self.output_dir / "dr_tin_mentions" / filename
-                with open(dr_tin_file_path, 'w', encoding='utf-8') as f:
-                    f.write(response.text)
+                with self.metrics.stage('disk_write'):
+                    with open(dr_tin_file_path, 'w', encoding='utf-8') as f:
+                        f.write(response.text)
                 self.logger.info(f"Dr Tin mention found in: {url}")
             
             if analysis['relevance_score'] > 0.5:
                 high_relevance_file_path = self.output_dir / "high_relevance_pages" / filename
-                with open(high_relevance_file_path, 'w', encoding='utf-8') as f:
-                    f.write(response.text)
+                with self.metrics.stage('disk_write'):
+                    with open(high_relevance_file_path, 'w', encoding='utf-8') as f:
+                        f.write(response.text)
                 self.logger.info(f"High relevance content found in: {url}")
             
-            # Extract links
+            # Extract links, with their anchor text for the focused crawl
             links = []
-            for link in soup.find_all('a', href=True):
-                href = link['href']
-                full_url = urljoin(url, href)
-                if self.is_valid_url(full_url):
-                    links.append(full_url)
+            anchor_texts = {}
+            with self.metrics.stage('link_extraction'):
+                for link in soup.find_all('a', href=True):
+                    href = link['href']
+                    full_url = urljoin(url, href)
+                    if self.is_valid_url(full_url):
+                        links.append(full_url)
+                        text = ' '.join([link.get_text(' ', strip=True), link.get('title', '')] +
+                                        [img.get('alt', '') for img in link.find_all('img')])
+                        anchor_texts[full_url] = f"{anchor_texts.get(full_url, '')} {text}"
             
             # Store page information
             page_info = {
@@ -185,17 +220,25 @@ class EnhancedHKOWebCrawler:
                 'related_keywords_count': len(analysis['related_keywords']),
                 'timestamp': datetime.now().isoformat(),
                 'links': links,
+                'anchor_texts': anchor_texts,
                 'analysis': analysis
             }
             
             self.site_map.append(page_info)
             self.downloaded_files.append(str(file_path))
+            self.metrics.inc('pages', status='success')
+            self.record_page(page_info)
+            log_event(self.logger, 'page_saved', url=url, status=response.status_code, bytes=len(response.content),
+                      links=len(links), dr_tin=analysis['has_dr_tin_mention'],
+                      relevance=round(analysis['relevance_score'], 3))
             
             return page_info
             
         except Exception as e:
-            self.logger.error(f"Failed to download {url}: {str(e)}")
+            log_event(self.logger, 'page_failed', logging.ERROR, url=url, error=str(e))
             self.failed_urls.append(url)
+            self.metrics.inc('pages', status='failed')
+            self.stats.add_page(url, 'failed')
             
             page_info = {
                 'url': url,
@@ -206,20 +249,37 @@ class EnhancedHKOWebCrawler:
             self.site_map.append(page_info)
             return None
     
-    def crawl(self, max_pages=500, delay=1):
-        """Main crawling function with enhanced analysis"""
+    def crawl(self, max_pages=500, delay=1, focused=False, patience=PATIENCE):
+        """Main crawling function with enhanced analysis.
+        
+        focused=True crawls the links with the highest predicted relevance
+        first and stops early once `patience` pages in a row found no Dr Tin
+        mention and no promising link is left; otherwise the crawl is breadth-first.
+        """
         self.logger.info("=" * 60)
         self.logger.info("STARTING ENHANCED HKO WEB CRAWL")
         self.logger.info("=" * 60)
         self.logger.info(f"Base URL: {self.base_url}")
         self.logger.info(f"Max pages: {max_pages}")
+        self.logger.info(f"Strategy: {'focused (best-first)' if focused else 'breadth-first'}")
         self.logger.info(f"Output directory: {self.output_dir}")
+        if self.metrics_port:
+            self.logger.info(f"Metrics: {self.metrics.serve(self.metrics_port)}")
+        metrics_file = self.output_dir / "reports" / "crawl_metrics.json"
         
-        urls_to_visit = [self.base_url]
+        urls_to_visit = CrawlFrontier(patience=patience if focused else None)
+        urls_to_visit.push(self.normalize_url(self.base_url))
         pages_crawled = 0
         
         while urls_to_visit and pages_crawled < max_pages:
-            current_url = urls_to_visit.pop(0)
+            if urls_to_visit.exhausted():
+                self.logger.info(f"Focused crawl stopped: no Dr Tin mention in the last {patience} pages "
+                                 f"and best remaining link scores {urls_to_visit.best_priority() or 0:.2f}")
+                break
+            self.metrics.set_gauge('queue_depth', len(urls_to_visit))
+            current_url, predicted = urls_to_visit.pop()
+            if focused:
+                self.logger.debug(f"Next: {current_url} (predicted relevance {predicted:.2f})")
             
             # Normalize URL
             normalized_url = self.normalize_url(current_url)
@@ -233,34 +293,166 @@ class EnhancedHKOWebCrawler:
             page_info = self.download_and_analyze_page(normalized_url)
             
             if page_info and page_info['status'] == 'success':
-                # Add new links to queue
-                for link in page_info['links']:
-                    normalized_link = self.normalize_url(link)
-                    if normalized_link not in self.visited_urls and normalized_link not in urls_to_visit:
-                        urls_to_visit.append(normalized_link)
-                        self.all_discovered_urls.add(normalized_link)
+                # Add new links to queue; in a focused crawl the most promising go first
+                for link, priority in self.scored_links(page_info, predicted, focused):
+                    urls_to_visit.push(link, priority)
+            urls_to_visit.record(bool(page_info and page_info.get('has_dr_tin_mention')))
             
             pages_crawled += 1
-            
-            # Progress update
-            if pages_crawled % 10 == 0:
-                dr_tin_count = len([p for p in self.site_map if p.get('has_dr_tin_mention', False)])
-                high_relevance_count = len([p for p in self.site_map if p.get('relevance_score', 0) > 0.5])
-                self.logger.info(f"Progress: {pages_crawled} pages crawled, {dr_tin_count} Dr Tin mentions, {high_relevance_count} high relevance")
+            self.page_done(pages_crawled, metrics_file)
             
             # Delay between requests
-            time.sleep(delay)
+            with self.metrics.stage('sleep'):
+                time.sleep(delay)
+        
+        self.finish_crawl(pages_crawled, len(urls_to_visit), metrics_file)
+    
+    def crawl_shared(self, frontier, worker, max_pages=500, focused=False):
+        """Crawl as one of several workers sharing a frontier (shared_frontier.py).
+        
+        The frontier holds the seen-set and hands out URLs host by host with
+        the politeness delay between claims, so this loop does not sleep and
+        visited_urls only covers this worker's pages. Downloads and reports go
+        to this crawler's output directory as usual.
+        """
+        self.logger.info("=" * 60)
+        self.logger.info(f"STARTING ENHANCED HKO WEB CRAWL (shared frontier, worker {worker})")
+        self.logger.info("=" * 60)
+        self.logger.info(f"Base URL: {self.base_url}")
+        self.logger.info(f"Max pages for this worker: {max_pages}")
+        self.logger.info(f"Output directory: {self.output_dir}")
+        if self.metrics_port:
+            self.logger.info(f"Metrics: {self.metrics.serve(self.metrics_port)}")
+        metrics_file = self.output_dir / "reports" / "crawl_metrics.json"
+        
+        # Every worker seeds the frontier; only the first one adds anything
+        frontier.add([(self.normalize_url(self.base_url), 0.0)])
+        pages_crawled = 0
+        
+        while pages_crawled < max_pages:
+            claim = frontier.claim(worker)
+            if claim is None:
+                if not frontier.pending():
+                    break
+                # Every host with queued URLs is busy or was fetched from too recently
+                with self.metrics.stage('frontier_wait'):
+                    time.sleep(POLL_SECONDS)
+                continue
+            current_url, predicted = claim
+            self.visited_urls.add(current_url)
+            
+            page_info = self.download_and_analyze_page(current_url)
+            links = []
+            if page_info and page_info['status'] == 'success':
+                links = self.scored_links(page_info, predicted, focused)
+            with self.metrics.stage('frontier'):
+                if not frontier.complete(current_url, worker, links):
+                    self.logger.warning(f"Lease on {current_url} ran out before it was completed")
+            
+            pages_crawled += 1
+            self.page_done(pages_crawled, metrics_file)
+        
+        self.finish_crawl(pages_crawled, frontier.pending(), metrics_file)
+    
+    def scored_links(self, page_info, predicted, focused):
+        """(normalized link, priority) for the page's links not visited yet.
+        
+        Priorities are the LinkScorer's predicted relevance in a focused crawl, 0 otherwise.
+        """
+        anchor_texts = page_info.pop('anchor_texts')
+        if focused:
+            self.link_scorer.observe(page_info['relevance_score'])
+            parent_signal = self.link_scorer.parent_signal(page_info['relevance_score'], predicted)
+        links = []
+        for link in page_info['links']:
+            normalized_link = self.normalize_url(link)
+            if normalized_link not in self.visited_urls:
+                priority = 0.0
+                if focused:
+                    priority = self.link_scorer.predict(normalized_link, anchor_texts.get(link, ''), parent_signal)
+                links.append((normalized_link, priority))
+                self.all_discovered_urls.add(normalized_link)
+        return links
+    
+    def page_done(self, pages_crawled, metrics_file):
+        """Progress line, metrics snapshot and report refresh after each page"""
+        self.metrics.set_gauge('pages_crawled', pages_crawled)
+        
+        # Progress update
+        if pages_crawled % 10 == 0:
+            log_progress(self.logger, f"Progress: {pages_crawled} pages crawled, {self.stats.dr_tin_pages} Dr Tin mentions, {self.stats.high_relevance_pages} high relevance")
+            self.metrics.write_snapshot(metrics_file)
         
+        # Keep the Markdown reports current during long crawls
+        if pages_crawled % REPORT_EVERY == 0:
+            with self.metrics.stage('reports'):
+                self.write_markdown_reports()
+    
+    def finish_crawl(self, pages_crawled, queue_depth, metrics_file):
+        """Final reports, index and metrics snapshot, and the closing summary in the log"""
         # Generate comprehensive reports
-        self.generate_comprehensive_reports()
+        with self.metrics.stage('reports'):
+            self.generate_comprehensive_reports()
+        self.page_index.close()
+        self.metrics.set_gauge('queue_depth', queue_depth)
+        self.metrics.write_snapshot(metrics_file)
+        self.metrics.shutdown()
         
         self.logger.info("=" * 60)
         self.logger.info("ENHANCED HKO CRAWL COMPLETED")
         self.logger.info("=" * 60)
         self.logger.info(f"Total pages crawled: {pages_crawled}")
-        self.logger.info(f"Dr Tin mentions found: {len([p for p in self.site_map if p.get('has_dr_tin_mention', False)])}")
-        self.logger.info(f"High relevance pages: {len([p for p in self.site_map if p.get('relevance_score', 0) > 0.5])}")
+        self.logger.info(f"Dr Tin mentions found: {self.stats.dr_tin_pages}")
+        self.logger.info(f"High relevance pages: {self.stats.high_relevance_pages}")
         self.logger.info(f"Failed downloads: {len(self.failed_urls)}")
+        self.logger.info(f"Near-duplicates skipped: {self.duplicate_index.duplicates}")
+        self.logger.info("Time by stage:")
+        for line in self.metrics.summary_lines():
+            self.logger.info(f"  {line}")
+        self.logger.info(f"Metrics snapshot: {metrics_file}")
+    
+    def record_duplicate(self, url, duplicate_of):
+        """Record a page already seen under another URL; it is not analyzed, saved or expanded"""
+        page_info = {
+            'url': url,
+            'status': 'duplicate',
+            'duplicate_of': duplicate_of,
+            'timestamp': datetime.now().isoformat()
+        }
+        self.site_map.append(page_info)
+        self.metrics.inc('pages', status='duplicate')
+        self.stats.add_page(url, 'duplicate')
+        log_event(self.logger, 'page_duplicate', url=url, duplicate_of=duplicate_of)
+        return page_info
+    
+    def record_page(self, page):
+        """Add a successfully analyzed page to the running totals and report entries"""
+        url = page['url']
+        score = page['relevance_score']
+        analysis = page['analysis']
+        self.stats.add_page(url, 'success', relevance=score, dr_tin=page['has_dr_tin_mention'])
+        if not page['has_dr_tin_mention']:
+            return
+        
+        number = self.mention_entries.next_number()
+        lines = [
+            f"## {number}. [{url}]({url})\n\n",
+            f"**Filename:** {page.get('filename', 'N/A')}\n",
+            f"**Relevance Score:** {score:.2f}\n",
+            f"**Dr Tin Mentions Count:** {page['dr_tin_mentions_count']}\n",
+            f"**Related Keywords Count:** {page['related_keywords_count']}\n\n",
+            "**Detailed Mentions:**\n"
+        ]
+        for j, mention in enumerate(analysis['dr_tin_mentions'], 1):
+            lines.append(f"{j}. **Pattern:** `{mention['pattern']}`\n")
+            lines.append(f"   **Match:** `{mention['match']}`\n")
+            lines.append(f"   **Confidence:** {mention['confidence']:.2f}\n")
+            lines.append(f"   **Context:** {mention['context']}\n\n")
+        lines.append("---\n\n")
+        self.stats.add_mentions(url, analysis['dr_tin_mentions'])
+        self.mention_entries.add(''.join(lines))
+        self.mention_links.add(f"- [{url}]({url}) (Score: {score:.2f})\n")
+        self.mention_log_links.add(f"{number}. [{url}]({url}) (Score: {score:.2f})\n")
     
     def generate_comprehensive_reports(self):
         """Generate comprehensive reports with analysis"""
@@ -270,7 +462,7 @@ class EnhancedHKOWebCrawler:
             writer = csv.writer(f)
             writer.writerow([
                 'URL', 'Filename', 'Status', 'Links Found', 'Has Dr Tin Mention', 
-                'Relevance Score', 'Dr Tin Mentions Count', 'Related Keywords Count', 'Timestamp'
+                'Relevance Score', 'Dr Tin Mentions Count', 'Related Keywords Count', 'Timestamp', 'Duplicate Of'
             ])
             for page in self.site_map:
                 writer.writerow([
@@ -282,118 +474,105 @@ class EnhancedHKOWebCrawler:
                     page.get('relevance_score', 0),
                     page.get('dr_tin_mentions_count', 0),
                     page.get('related_keywords_count', 0),
-                    page.get('timestamp', '')
+                    page.get('timestamp', ''),
+                    page.get('duplicate_of', '')
                 ])
         
-        # Generate Dr Tin mentions report
-        dr_tin_pages = [p for p in self.site_map if p.get('has_dr_tin_mention', False)]
-        dr_tin_file = self.output_dir / "reports" / "dr_tin_mentions_detailed.md"
-        with open(dr_tin_file, 'w', encoding='utf-8') as f:
-            f.write("# Dr Tin Chatbot Mentions - Detailed Report\n\n")
-            f.write(f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            f.write(f"**Total pages with Dr Tin mentions:** {len(dr_tin_pages)}\n\n")
-            
-            for i, page in enumerate(dr_tin_pages, 1):
-                f.write(f"## {i}. [{page['url']}]({page['url']})\n\n")
-                f.write(f"**Filename:** {page.get('filename', 'N/A')}\n")
-                f.write(f"**Relevance Score:** {page.get('relevance_score', 0):.2f}\n")
-                f.write(f"**Dr Tin Mentions Count:** {page.get('dr_tin_mentions_count', 0)}\n")
-                f.write(f"**Related Keywords Count:** {page.get('related_keywords_count', 0)}\n\n")
-                
-                if 'analysis' in page and 'dr_tin_mentions' in page['analysis']:
-                    f.write("**Detailed Mentions:**\n")
-                    for j, mention in enumerate(page['analysis']['dr_tin_mentions'], 1):
-                        f.write(f"{j}. **Pattern:** `{mention['pattern']}`\n")
-                        f.write(f"   **Match:** `{mention['match']}`\n")
-                        f.write(f"   **Confidence:** {mention['confidence']:.2f}\n")
-                        f.write(f"   **Context:** {mention['context']}\n\n")
-                
-                f.write("---\n\n")
-        
-        # Generate comprehensive summary
-        summary_file = self.output_dir / "reports" / "enhanced_crawl_summary.md"
-        with open(summary_file, 'w', encoding='utf-8') as f:
-            f.write("# Enhanced HKO Web Crawl Summary\n\n")
-            f.write(f"**Crawl Date:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            f.write(f"**Base URL:** {self.base_url}\n\n")
-            
-            f.write("## Summary Statistics\n\n")
-            f.write(f"- **Total Pages Crawled:** {len(self.visited_urls)}\n")
-            f.write(f"- **Successful Downloads:** {len([p for p in self.site_map if p['status'] == 'success'])}\n")
-            f.write(f"- **Failed Downloads:** {len([p for p in self.site_map if p['status'] == 'failed'])}\n")
-            f.write(f"- **Dr Tin Chatbot Mentions Found:** {len(dr_tin_pages)}\n")
-            
-            high_relevance_pages = [p for p in self.site_map if p.get('relevance_score', 0) > 0.5]
-            f.write(f"- **High Relevance Pages:** {len(high_relevance_pages)}\n\n")
-            
-            f.write("## Content Analysis Results\n\n")
-            if dr_tin_pages:
-                f.write("### Pages with Dr Tin Mentions\n\n")
-                for page in dr_tin_pages:
-                    f.write(f"- [{page['url']}]({page['url']}) (Score: {page.get('relevance_score', 0):.2f})\n")
-            else:
-                f.write("### No Direct Dr Tin Mentions Found\n\n")
-                f.write("The crawler did not find any pages with direct mentions of 'Dr Tin chatbot'.\n\n")
-            
-            if high_relevance_pages:
-                f.write("### High Relevance Pages\n\n")
-                for page in high_relevance_pages:
-                    f.write(f"- [{page['url']}]({page['url']}) (Score: {page.get('relevance_score', 0):.2f})\n")
-            
-            f.write("\n## Files Generated\n\n")
-            f.write("- `downloaded_pages/` - All downloaded HTML pages\n")
-            f.write("- `dr_tin_mentions/` - Pages containing Dr Tin chatbot mentions\n")
-            f.write("- `high_relevance_pages/` - Pages with high relevance scores\n")
-            f.write("- `reports/enhanced_hko_sitemap.csv` - Complete sitemap with analysis\n")
-            f.write("- `reports/dr_tin_mentions_detailed.md` - Detailed Dr Tin mentions report\n")
-            f.write("- `reports/enhanced_crawl_summary.md` - This summary\n")
-            f.write("- `logs/enhanced_hko_crawler.log` - Detailed logs\n")
-        
-        # Generate content analysis report
-        self.content_analyzer.generate_analysis_report()
+        # Markdown reports from the running aggregates
+        self.write_markdown_reports()
         self.content_analyzer.save_analysis_data()
         
+        self.logger.info(f"Comprehensive reports generated in: {self.output_dir / 'reports'}")
+    
+    def write_markdown_reports(self):
+        """Write the Markdown reports from the running aggregates; no pass over site_map"""
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        stats = self.stats
+        
+        # Dr Tin mentions report
+        write_markdown(self.output_dir / "reports" / "dr_tin_mentions_detailed.md", [
+            "# Dr Tin Chatbot Mentions - Detailed Report\n\n",
+            f"**Generated:** {now}\n\n",
+            f"**Total pages with Dr Tin mentions:** {stats.dr_tin_pages}\n\n",
+            self.mention_entries
+        ])
+        
+        # Comprehensive summary
+        summary = [
+            "# Enhanced HKO Web Crawl Summary\n\n",
+            f"**Crawl Date:** {now}\n\n",
+            f"**Base URL:** {self.base_url}\n\n",
+            "## Summary Statistics\n\n",
+            f"- **Total Pages Crawled:** {len(self.visited_urls)}\n",
+            f"- **Successful Downloads:** {stats.status['success']}\n",
+            f"- **Failed Downloads:** {stats.status['failed']}\n",
+            f"- **Near-Duplicates Skipped:** {stats.status['duplicate']}\n",
+            f"- **Dr Tin Chatbot Mentions Found:** {stats.dr_tin_pages}\n",
+            f"- **High Relevance Pages:** {stats.high_relevance_pages}\n\n",
+            "## Content Analysis Results\n\n"
+        ]
+        if self.mention_links:
+            summary += ["### Pages with Dr Tin Mentions\n\n", self.mention_links]
+        else:
+            summary += ["### No Direct Dr Tin Mentions Found\n\n",
+                        "The crawler did not find any pages with direct mentions of 'Dr Tin chatbot'.\n\n"]
+        if stats.top_pages:
+            summary += [f"### High Relevance Pages (top {len(stats.top_pages)} of {stats.high_relevance_pages})\n\n",
+                        *stats.top_pages_lines()]
+        if stats.snippets:
+            summary += ["\n### Top Mention Snippets\n\n", *stats.snippet_lines()]
+        summary += [
+            "\n## Files Generated\n\n",
+            "- `downloaded_pages/` - All downloaded HTML pages\n",
+            "- `dr_tin_mentions/` - Pages containing Dr Tin chatbot mentions\n",
+            "- `high_relevance_pages/` - Pages with high relevance scores\n",
+            "- `reports/enhanced_hko_sitemap.csv` - Complete sitemap with analysis\n",
+            "- `reports/dr_tin_mentions_detailed.md` - Detailed Dr Tin mentions report\n",
+            "- `reports/enhanced_crawl_summary.md` - This summary\n",
+            "- `reports/crawl_metrics.json` - Per-stage timings and counters\n",
+            "- `page_index.sqlite` - Full-text index (`python ../../crawl_common/page_index.py search <words>`)\n",
+            "- `logs/enhanced_hko_crawler.log` - Detailed logs\n"
+        ]
+        write_markdown(self.output_dir / "reports" / "enhanced_crawl_summary.md", summary)
+        
+        # Content analysis report
+        self.content_analyzer.generate_analysis_report()
+        
         # Update the main log file
         self.update_main_log()
-        
-        self.logger.info(f"Comprehensive reports generated in: {self.output_dir / 'reports'}")
     
     def update_main_log(self):
         """Update the main log file with crawl results"""
         log_file = self.output_dir / "webCrawllog_HKO.md"
+        stats = self.stats
         
-        dr_tin_pages = [p for p in self.site_map if p.get('has_dr_tin_mention', False)]
-        high_relevance_pages = [p for p in self.site_map if p.get('relevance_score', 0) > 0.5]
-        
-        with open(log_file, 'w', encoding='utf-8') as f:
-            f.write("# HKO Web Crawl Log - Enhanced Analysis\n\n")
-            f.write(f"**Last Updated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            f.write("## Crawl Summary\n\n")
-            f.write(f"- **Total Pages Crawled:** {len(self.visited_urls)}\n")
-            f.write(f"- **Dr Tin Chatbot Mentions Found:** {len(dr_tin_pages)}\n")
-            f.write(f"- **High Relevance Pages:** {len(high_relevance_pages)}\n")
-            f.write(f"- **Failed Downloads:** {len(self.failed_urls)}\n\n")
-            
-            if dr_tin_pages:
-                f.write("## Dr Tin Chatbot Mentions Found\n\n")
-                for i, page in enumerate(dr_tin_pages, 1):
-                    f.write(f"{i}. [{page['url']}]({page['url']}) (Score: {page.get('relevance_score', 0):.2f})\n")
-            else:
-                f.write("## No Dr Tin Chatbot Mentions Found\n\n")
-                f.write("The enhanced crawler did not find any pages mentioning 'Dr Tin chatbot' on the HKO website.\n")
-                f.write("However, check the high relevance pages for related content.\n\n")
-            
-            if high_relevance_pages:
-                f.write("## High Relevance Pages (May Contain Related Content)\n\n")
-                for i, page in enumerate(high_relevance_pages, 1):
-                    f.write(f"{i}. [{page['url']}]({page['url']}) (Score: {page.get('relevance_score', 0):.2f})\n")
-            
-            f.write(f"\n## Files Generated\n\n")
-            f.write(f"- Downloaded pages: `downloaded_pages/`\n")
-            f.write(f"- Dr Tin mentions: `dr_tin_mentions/`\n")
-            f.write(f"- High relevance pages: `high_relevance_pages/`\n")
-            f.write(f"- Reports: `reports/`\n")
-            f.write(f"- Detailed logs: `logs/enhanced_hko_crawler.log`\n")
+        parts = [
+            "# HKO Web Crawl Log - Enhanced Analysis\n\n",
+            f"**Last Updated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n",
+            "## Crawl Summary\n\n",
+            f"- **Total Pages Crawled:** {len(self.visited_urls)}\n",
+            f"- **Dr Tin Chatbot Mentions Found:** {stats.dr_tin_pages}\n",
+            f"- **High Relevance Pages:** {stats.high_relevance_pages}\n",
+            f"- **Failed Downloads:** {len(self.failed_urls)}\n\n"
+        ]
+        if self.mention_log_links:
+            parts += ["## Dr Tin Chatbot Mentions Found\n\n", self.mention_log_links]
+        else:
+            parts += ["## No Dr Tin Chatbot Mentions Found\n\n",
+                      "The enhanced crawler did not find any pages mentioning 'Dr Tin chatbot' on the HKO website.\n",
+                      "However, check the high relevance pages for related content.\n\n"]
+        if stats.top_pages:
+            parts += [f"## High Relevance Pages (May Contain Related Content, top {len(stats.top_pages)} of "
+                      f"{stats.high_relevance_pages})\n\n", *stats.top_pages_lines()]
+        parts += [
+            "\n## Files Generated\n\n",
+            "- Downloaded pages: `downloaded_pages/`\n",
+            "- Dr Tin mentions: `dr_tin_mentions/`\n",
+            "- High relevance pages: `high_relevance_pages/`\n",
+            "- Reports: `reports/`\n",
+            "- Detailed logs: `logs/enhanced_hko_crawler.log`\n"
+        ]
+        write_markdown(log_file, parts)
 
 def main():
     """Main function to run the enhanced HKO crawler"""
@@ -411,11 +590,8 @@ def main():
         print("=" * 60)
         print(f"Total pages crawled: {len(crawler.visited_urls)}")
         
-        dr_tin_count = len([p for p in crawler.site_map if p.get('has_dr_tin_mention', False)])
-        high_relevance_count = len([p for p in crawler.site_map if p.get('relevance_score', 0) > 0.5])
-        
-        print(f"Dr Tin chatbot mentions found: {dr_tin_count}")
-        print(f"High relevance pages: {high_relevance_count}")
+        print(f"Dr Tin chatbot mentions found: {crawler.stats.dr_tin_pages}")
+        print(f"High relevance pages: {crawler.stats.high_relevance_pages}")
         print(f"Files saved to: {crawler.output_dir}")
         print("\nGenerated files:")
         print(f"  - downloaded_pages/ (all HTML pages)")
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Extraction Rules
+Extraction rules for saved data.gov.hk pages, declared as data and compiled
+into a single traversal of the parsed page. Every node is visited once and
+tested only against the rules for its tag name, instead of each extractor
+walking the whole soup with its own find_all calls.
+Shared by html_data_extractor.py and process_all_pages.py.
+"""
+
+import re
+from bs4 import NavigableString, Tag
+
+# A rule is a dict of conditions, all of which must hold:
+#   name    - key the matches are stored under
+#   tag     - element name (omit to match any element)
+#   class   - a class the element has, or a regex one of its classes matches
+#   id      - exact id
+#   attrs   - {attribute: True (present) | exact string | compiled regex (search)}
+#   string  - regex searched in the element's single text child (like find(string=...))
+#   inside  - name of a container the element must be nested in
+#   text    - regex searched in text nodes; makes this a text-node rule
+# Containers use the same conditions; an element inside one is matched
+# together with the innermost enclosing container of that name.
+
+DATA_GOV_HK_CONTAINERS = [
+    {'name': 'main_menu', 'tag': 'nav', 'class': 'menu'},
+    {'name': 'search_form', 'tag': 'form', 'class': re.compile(r'search')},
+    {'name': 'filter_select', 'tag': 'select', 'class': 'dataset-search__select'},
+    {'name': 'sort_select', 'tag': 'select', 'id': 'dataset-search-sort'},
+    {'name': 'pagination', 'tag': 'div', 'class': 'dataset-listing__pagination'},
+    {'name': 'footer_row', 'tag': 'div', 'class': 'foot-row'}
+]
+
+DATA_GOV_HK_RULES = [
+    # Page metadata
+    {'name': 'title', 'tag': 'title'},
+    {'name': 'html', 'tag': 'html'},
+    {'name': 'meta_description', 'tag': 'meta', 'attrs': {'name': 'description'}},
+    {'name': 'meta_viewport', 'tag': 'meta', 'attrs': {'name': 'viewport'}},
+    {'name': 'meta_charset', 'tag': 'meta', 'attrs': {'charset': True}},
+    {'name': 'breadcrumb_link', 'tag': 'a', 'class': 'breadcrumb__link'},
+    {'name': 'page_heading', 'tag': 'h1', 'class': 'page-title'},
+
+    # Navigation
+    {'name': 'menu_link', 'tag': 'a', 'class': 'menu__link'},
+    {'name': 'main_menu_link', 'tag': 'a', 'class': 'menu__link', 'inside': 'main_menu'},
+    {'name': 'category_link', 'tag': 'a', 'attrs': {'href': re.compile(r'/en-datasets/category/')}},
+    {'name': 'provider_link', 'tag': 'a', 'attrs': {'href': re.compile(r'/en/providers')}},
+
+    # Search, filters and API endpoints
+    {'name': 'dataset_search_form', 'tag': 'form', 'id': 'form-dataset-search'},
+    {'name': 'search_input', 'tag': 'input', 'attrs': {'type': 'search'}, 'inside': 'search_form'},
+    {'name': 'filter_option', 'tag': 'option', 'inside': 'filter_select'},
+    {'name': 'sort_option', 'tag': 'option', 'inside': 'sort_select'},
+    {'name': 'array_select', 'tag': 'select', 'attrs': {'name': re.compile(r'\[\]$')}},
+    {'name': 'data_url_select', 'tag': 'select', 'attrs': {'data-url': True}},
+    {'name': 'api_link', 'tag': 'a', 'attrs': {'href': re.compile(r'/api/')}},
+    {'name': 'xml_link', 'tag': 'a', 'attrs': {'href': re.compile(r'\.xml$')}},
+
+    # Dataset listing
+    {'name': 'dataset_listing', 'tag': 'div', 'id': 'dataset-listing'},
+    {'name': 'total_num', 'tag': 'span', 'class': 'dataset-listing__total-num'},
+    {'name': 'template', 'tag': 'template'},
+    {'name': 'pagination_range', 'tag': 'span', 'class': 'dataset-listing__range', 'inside': 'pagination'},
+    {'name': 'pagination_total', 'tag': 'span', 'class': 'dataset-listing__total-num', 'inside': 'pagination'},
+
+    # RSS feed
+    {'name': 'rss_link', 'tag': 'a', 'attrs': {'href': re.compile(r'data_rss_en\.xml')}},
+    {'name': 'rss_description', 'tag': 'p', 'string': re.compile(r'This daily updated RSS feed')},
+    {'name': 'rss_about', 'tag': 'p', 'string': re.compile(r'Really Simple Syndication')},
+
+    # Contact information
+    {'name': 'mailto_link', 'tag': 'a', 'attrs': {'href': re.compile(r'mailto:')}},
+    {'name': 'hotline', 'tag': 'span', 'string': re.compile(r'183 5500')},
+    {'name': 'organization', 'tag': 'p', 'string': re.compile(r'Developed and Supported by')},
+    {'name': 'footer_link', 'tag': 'a', 'inside': 'footer_row'},
+    {'name': 'phone_text', 'text': re.compile(r'\d{3}\s?\d{4}')}
+]
+
+
+def compile_condition(spec):
+    """Compile a rule's element conditions into one test function"""
+    tests = []
+
+    css_class = spec.get('class')
+    if isinstance(css_class, re.Pattern):
+        tests.append(lambda el: any(css_class.search(c) for c in el.get('class') or ()))
+    elif css_class:
+        tests.append(lambda el: css_class in (el.get('class') or ()))
+
+    if spec.get('id'):
+        element_id = spec['id']
+        tests.append(lambda el: el.get('id') == element_id)
+
+    for attr, expected in spec.get('attrs', {}).items():
+        if expected is True:
+            tests.append(lambda el, attr=attr: el.has_attr(attr))
+        elif isinstance(expected, re.Pattern):
+            tests.append(lambda el, attr=attr, expected=expected:
+                         el.has_attr(attr) and expected.search(str(el[attr])) is not None)
+        else:
+            tests.append(lambda el, attr=attr, expected=expected: el.get(attr) == expected)
+
+    if spec.get('string'):
+        string_pattern = spec['string']
+        tests.append(lambda el: el.string is not None and string_pattern.search(el.string) is not None)
+
+    return lambda el: all(test(el) for test in tests)
+
+
+class RuleSet:
+    """A set of extraction rules compiled into a single tree traversal"""
+
+    def __init__(self, rules, containers=()):
+        self.rule_names = [rule['name'] for rule in rules]
+        self.container_names = [container['name'] for container in containers]
+        self.element_rules = {}
+        self.any_element_rules = []
+        self.text_rules = []
+        self.containers = {}
+
+        for rule in rules:
+            if rule.get('text'):
+                self.text_rules.append((rule['name'], rule['text']))
+                continue
+            compiled = (rule['name'], compile_condition(rule), rule.get('inside'))
+            if rule.get('tag'):
+                self.element_rules.setdefault(rule['tag'], []).append(compiled)
+            else:
+                self.any_element_rules.append(compiled)
+
+        for container in containers:
+            self.containers.setdefault(container['tag'], []).append(
+                (container['name'], compile_condition(container))
+            )
+
+    def match(self, soup):
+        """Visit every node once and collect the matches of every rule.
+
+        Returns {name: [(node, container), ...]} in document order, where
+        container is the enclosing container for 'inside' rules and None
+        otherwise. Containers are listed under their own names too.
+        """
+        results = {name: [] for name in self.rule_names + self.container_names}
+        # Depth-first with an explicit stack; scope maps container name -> innermost element
+        stack = [(soup, {})]
+
+        while stack:
+            node, scope = stack.pop()
+
+            if isinstance(node, NavigableString):
+                for name, pattern in self.text_rules:
+                    if pattern.search(node):
+                        results[name].append((node, None))
+                continue
+
+            if not isinstance(node, Tag):
+                continue
+
+            for name, test, inside in self.element_rules.get(node.name, []) + self.any_element_rules:
+                if inside and inside not in scope:
+                    continue
+                if test(node):
+                    results[name].append((node, scope.get(inside)))
+
+            for name, test in self.containers.get(node.name, []):
+                if test(node):
+                    results[name].append((node, None))
+                    scope = {**scope, name: node}
+
+            stack.extend((child, scope) for child in reversed(node.contents))
+
+        return results
+
+
+def first(matches, name):
+    """First node matched by a rule, or None"""
+    found = matches.get(name)
+    return found[0][0] if found else None
+
+
+def nodes(matches, name, container=None):
+    """Nodes matched by a rule, optionally only those inside one container"""
+    return [node for node, inside in matches.get(name, [])
+            if container is None or inside is container]
+
+
+DATA_GOV_HK = RuleSet(DATA_GOV_HK_RULES, DATA_GOV_HK_CONTAINERS)
@@ -5,60 +5,115 @@ and create a focused report for Hong Kong Observatory datasets.
 """
 
 import csv
+import io
 import os
+import re
+import sys
+import glob
+import argparse
 from datetime import datetime
+from multiprocessing import Pool
 
-def filter_hko_data(input_csv, output_csv):
-    """Filter CSV to show only HKO-related data items"""
-    
-    hko_keywords = [
-        'hko', 'observatory', 'weather', 'climate', 'meteorological',
-        'temperature', 'rainfall', 'humidity', 'wind', 'typhoon',
-        'forecast', 'warning', 'radar', 'satellite', 'lightning',
-        'tide', 'radiation', 'air quality', 'atmospheric'
-    ]
-    
-    hko_related_items = []
-    
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+HKO_KEYWORDS = [
+    'hko', 'observatory', 'weather', 'climate', 'meteorological',
+    'temperature', 'rainfall', 'humidity', 'wind', 'typhoon',
+    'forecast', 'warning', 'radar', 'satellite', 'lightning',
+    'tide', 'radiation', 'air quality', 'atmospheric'
+]
+
+# All keywords compiled once into a single alternation
+HKO_PATTERN = re.compile('|'.join(re.escape(keyword) for keyword in HKO_KEYWORDS))
+
+# Joins a row's fields so one search covers the whole row; never part of a keyword
+FIELD_SEPARATOR = '\x1f'
+
+# Rows are handed to the matcher in blocks of roughly this many characters
+BLOCK_SIZE = 4 * 1024 * 1024
+
+# Report rows can hold long page text
+csv.field_size_limit(min(sys.maxsize, 2**31 - 1))
+
+
+def is_hko_related(row):
+    """Check if any field of a row contains an HKO-related keyword"""
+    return HKO_PATTERN.search(FIELD_SEPARATOR.join(row).lower()) is not None
+
+
+def filter_block(text):
+    """Filter a block of raw CSV rows, returning (matching rows as CSV text, count)"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    matched = 0
+    for row in csv.reader(io.StringIO(text, newline='')):
+        if is_hko_related(row):
+            writer.writerow(row)
+            matched += 1
+    return output.getvalue(), matched
+
+
+def read_blocks(infile, block_size=BLOCK_SIZE):
+    """Yield the remaining rows of a CSV file as raw text blocks.
+
+    Blocks only end between rows: a line with an odd number of quotes opens
+    or closes a quoted field, so a block is not cut while one is open.
+    """
+    lines = []
+    size = 0
+    in_quotes = False
+    for line in infile:
+        lines.append(line)
+        size += len(line)
+        if line.count('"') % 2:
+            in_quotes = not in_quotes
+        if not in_quotes and size >= block_size:
+            yield ''.join(lines)
+            lines = []
+            size = 0
+    if lines:
+        yield ''.join(lines)
+
+
+def filter_hko_data(input_csv, output_csv, workers=1):
+    """Filter CSV to show only HKO-related data items, streaming matches to the output.
+
+    The input is read in blocks of rows; with workers > 1 the blocks are
+    parsed and matched by a process pool. The output keeps the input order
+    either way. Returns the number of matches.
+    """
     print("Filtering HKO-related data items...")
-    
-    with open(input_csv, 'r', encoding='utf-8') as infile:
-        reader = csv.DictReader(infile)
-        
-        for row in reader:
-            # Check if any field contains HKO-related keywords
-            is_hko_related = False
-            
-            for field_name, field_value in row.items():
-                if field_value and isinstance(field_value, str):
-                    field_lower = field_value.lower()
-                    for keyword in hko_keywords:
-                        if keyword in field_lower:
-                            is_hko_related = True
-                            break
-                if is_hko_related:
-                    break
-            
-            if is_hko_related:
-                hko_related_items.append(row)
-    
-    # Write filtered data to new CSV
-    if hko_related_items:
-        fieldnames = hko_related_items[0].keys()
-        
-        with open(output_csv, 'w', newline='', encoding='utf-8') as outfile:
-            writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(hko_related_items)
-        
-        print(f"Found {len(hko_related_items)} HKO-related items")
+    matched = 0
+
+    with open(input_csv, 'r', newline='', encoding='utf-8') as infile, \
+            open(output_csv, 'w', newline='', encoding='utf-8') as outfile:
+        header = next(csv.reader(infile), None)
+        if header is None:
+            print("Input CSV is empty")
+            return 0
+        csv.writer(outfile).writerow(header)
+
+        pool = Pool(workers) if workers > 1 else None
+        try:
+            results = pool.imap(filter_block, read_blocks(infile)) if pool else map(filter_block, read_blocks(infile))
+            for text, count in results:
+                outfile.write(text)
+                matched += count
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+    if matched:
+        print(f"Found {matched} HKO-related items")
         print(f"Filtered report saved to: {output_csv}")
     else:
+        os.remove(output_csv)
         print("No HKO-related items found in the data")
-    
-    return hko_related_items
 
-def create_hko_focused_report():
+    return matched
+
+def create_hko_focused_report(output_dir=BASE_DIR):
     """Create a focused report specifically for HKO data access"""
     
     # Key HKO-related endpoints and information
@@ -131,7 +186,7 @@ def create_hko_focused_report():
     
     # Generate timestamp for output file
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_file = f"/Users/simonwang/Documents/Usage/GCAP3056/gcap3056/GCAP3056_Fall_2025/HKO-Chatbot/webCrawlHKO/hko_focused_report_{timestamp}.csv"
+    output_file = os.path.join(output_dir, f"hko_focused_report_{timestamp}.csv")
     
     # Write focused report
     fieldnames = ['type', 'description', 'url', 'full_url', 'dataset_count', 'source']
@@ -144,22 +199,36 @@ def create_hko_focused_report():
     print(f"HKO-focused report created: {output_file}")
     return output_file
 
+def latest_comprehensive_report():
+    """Find the newest data_gov_hk_comprehensive_report_*.csv next to this script"""
+    reports = sorted(glob.glob(os.path.join(BASE_DIR, "data_gov_hk_comprehensive_report_*.csv")))
+    return reports[-1] if reports else None
+
 def main():
     """Main function to filter and create HKO-focused reports"""
+    parser = argparse.ArgumentParser(description="Filter a data.gov.hk report down to HKO-related rows")
+    parser.add_argument('input_csv', nargs='?', help="Report CSV (default: newest comprehensive report)")
+    parser.add_argument('--output-dir', default=BASE_DIR, help="Folder for the generated reports")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes for large inputs")
+    args = parser.parse_args()
+
     print("=== Creating HKO-Focused Data Report ===")
     
     # Input file
-    input_csv = "/Users/simonwang/Documents/Usage/GCAP3056/gcap3056/GCAP3056_Fall_2025/HKO-Chatbot/webCrawlHKO/data_gov_hk_comprehensive_report_20251024_154241.csv"
+    input_csv = args.input_csv or latest_comprehensive_report()
+    if not input_csv:
+        print("No data_gov_hk_comprehensive_report_*.csv found")
+        return
     
     # Generate timestamp for output file
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filtered_csv = f"/Users/simonwang/Documents/Usage/GCAP3056/gcap3056/GCAP3056_Fall_2025/HKO-Chatbot/webCrawlHKO/hko_filtered_data_{timestamp}.csv"
+    filtered_csv = os.path.join(args.output_dir, f"hko_filtered_data_{timestamp}.csv")
     
     # Filter HKO-related data
-    hko_items = filter_hko_data(input_csv, filtered_csv)
+    matched = filter_hko_data(input_csv, filtered_csv, workers=args.workers)
     
     # Create focused HKO report
-    focused_report = create_hko_focused_report()
+    focused_report = create_hko_focused_report(args.output_dir)
     
     print("\n=== HKO DATA ACCESS SUMMARY ===")
     print("Key locations to find HKO datasets:")
@@ -169,8 +238,11 @@ def main():
     print("4. Providers JSON: https://data.gov.hk/filestore/json/providers_en.json")
     print("5. Contact: enquiry@1835500.gov.hk")
     
-    print(f"\nReports generated:")
-    print(f"- Filtered HKO data: {filtered_csv}")
+    print("\nReports generated:")
+    if matched:
+        print(f"- Filtered HKO data: {filtered_csv}")
+    else:
+        print("- Filtered HKO data: none (no HKO-related items matched)")
     print(f"- HKO-focused report: {focused_report}")
 
 if __name__ == "__main__":
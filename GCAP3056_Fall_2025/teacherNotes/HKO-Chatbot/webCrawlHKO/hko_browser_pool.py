@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Headless Browser Pool
+Keeps a few warm Chrome drivers for rendering JavaScript pages in parallel.
+Pages are considered loaded once an explicit DOM condition holds, and images,
+fonts and stylesheets are blocked so only the markup is downloaded.
+"""
+
+import queue
+import logging
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# URL patterns the browser never needs to fetch to build the DOM
+BLOCKED_URL_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.css', '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot'
+]
+
+
+class BrowserPool:
+    """A fixed-size pool of reusable headless Chrome drivers"""
+
+    def __init__(self, size=3, timeout=15, block_resources=True):
+        self.size = size
+        self.timeout = timeout
+        self.block_resources = block_resources
+        self.drivers = []
+        self.idle = queue.Queue()
+
+    def create_driver(self):
+        """Start one headless Chrome driver with heavy resources disabled"""
+        chrome_options = Options()
+        chrome_options.add_argument("--headless")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--window-size=1920,1080")
+        chrome_options.add_argument(f"--user-agent={USER_AGENT}")
+        # Return from driver.get() at DOMContentLoaded; readiness is checked explicitly
+        chrome_options.page_load_strategy = 'eager'
+
+        if self.block_resources:
+            chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+            chrome_options.add_experimental_option('prefs', {
+                'profile.managed_default_content_settings.images': 2,
+                'profile.managed_default_content_settings.stylesheets': 2,
+                'profile.managed_default_content_settings.fonts': 2
+            })
+
+        driver = webdriver.Chrome(options=chrome_options)
+        driver.set_page_load_timeout(self.timeout * 2)
+
+        if self.block_resources:
+            try:
+                driver.execute_cdp_cmd('Network.enable', {})
+                driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+            except WebDriverException as e:
+                logger.warning(f"Could not block resources via DevTools: {e}")
+
+        return driver
+
+    def start(self):
+        """Start the drivers; returns False if no driver could be started"""
+        for _ in range(self.size - len(self.drivers)):
+            try:
+                driver = self.create_driver()
+            except WebDriverException as e:
+                logger.error(f"Failed to initialize Chrome driver: {e}")
+                break
+            self.drivers.append(driver)
+            self.idle.put(driver)
+
+        if self.drivers:
+            logger.info(f"Browser pool started with {len(self.drivers)} drivers")
+        return bool(self.drivers)
+
+    def close(self):
+        """Quit every driver in the pool"""
+        for driver in self.drivers:
+            try:
+                driver.quit()
+            except WebDriverException:
+                pass
+        self.drivers = []
+        self.idle = queue.Queue()
+        logger.info("Browser pool closed")
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @contextmanager
+    def acquire(self):
+        """Borrow a warm driver and return it to the pool afterwards"""
+        driver = self.idle.get()
+        try:
+            yield driver
+        finally:
+            self.idle.put(driver)
+
+    def wait_until_ready(self, driver, ready_selector=None):
+        """Wait until the document is loaded and the ready selector is present"""
+        wait = WebDriverWait(driver, self.timeout)
+        wait.until(lambda d: d.execute_script('return document.readyState') != 'loading')
+        if ready_selector:
+            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ready_selector)))
+
+    def render(self, url, ready_selector=None):
+        """Render a page and return its HTML, or None if it never became ready"""
+        with self.acquire() as driver:
+            try:
+                driver.get(url)
+                self.wait_until_ready(driver, ready_selector)
+                return driver.page_source
+            except TimeoutException:
+                logger.warning(f"Timed out waiting for {ready_selector or 'page'} on {url}")
+                return driver.page_source
+            except WebDriverException as e:
+                logger.error(f"Error rendering {url}: {e}")
+                return None
+
+    def render_all(self, urls, ready_selector=None):
+        """Render several pages in parallel, returning HTML in input order"""
+        with ThreadPoolExecutor(max_workers=max(len(self.drivers), 1)) as executor:
+            return list(executor.map(lambda url: self.render(url, ready_selector), urls))
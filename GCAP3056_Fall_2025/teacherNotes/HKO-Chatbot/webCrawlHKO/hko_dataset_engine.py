@@ -0,0 +1,770 @@
+#!/usr/bin/env python3
+"""
+HKO Dataset Engine
+Shared scraping pipeline for the hko_dataset_scraper_* scripts.
+Discovery strategies (CKAN API, provider pagination, RSS, search, manual list,
+browser) are pluggable sources that can run together. Their results are
+deduplicated and fed into one concurrent detail-fetch and report pipeline.
+"""
+
+import requests
+from bs4 import BeautifulSoup
+import argparse
+import json
+import time
+import csv
+from datetime import datetime
+from urllib.parse import urljoin, urlparse, quote_plus
+import logging
+import xml.etree.ElementTree as ET
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from hko_paginator import ParallelPaginator
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'crawl_common'))
+from columnar_export import write_records
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://data.gov.hk"
+HKO_PROVIDER_URL = "https://data.gov.hk/en-datasets/provider/hk-hko"
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+DATASET_FIELDS = [
+    'url', 'name', 'title', 'description', 'organization', 'tags', 'formats',
+    'last_updated', 'created', 'license', 'author', 'maintainer', 'resources', 'sources'
+]
+
+# Typed columns for the Parquet report
+DATASET_COLUMNS = [
+    ('url', 'string'), ('name', 'string'), ('title', 'string'), ('description', 'string'),
+    ('organization', 'category'), ('tags', 'list'), ('formats', 'list'),
+    ('last_updated', 'string'), ('created', 'string'), ('license', 'category'),
+    ('author', 'category'), ('maintainer', 'category'), ('resources', 'json'), ('sources', 'list')
+]
+
+SEARCH_TERMS = [
+    "weather", "climate", "meteorological", "temperature", "rainfall",
+    "wind", "humidity", "pressure", "forecast", "observation"
+]
+
+
+def dataset_key(url):
+    """Canonical key for a dataset URL, so /en-dataset/x and /en-data/dataset/x match"""
+    parts = [part for part in urlparse(url).path.split('/') if part]
+    for marker in ('dataset', 'en-dataset', 'tc-dataset', 'sc-dataset'):
+        if marker in parts and parts.index(marker) + 1 < len(parts):
+            return parts[parts.index(marker) + 1]
+    return parts[-1] if parts else url
+
+
+def empty_dataset_info(dataset_url):
+    """Blank dataset record with every report field present"""
+    return {
+        'url': dataset_url,
+        'name': dataset_key(dataset_url),
+        'title': '',
+        'description': '',
+        'organization': 'Hong Kong Observatory',
+        'tags': [],
+        'formats': [],
+        'last_updated': '',
+        'created': '',
+        'license': '',
+        'author': '',
+        'maintainer': '',
+        'resources': []
+    }
+
+
+class DatasetSource(ABC):
+    """Base class for a dataset discovery strategy"""
+
+    name = 'source'
+
+    @abstractmethod
+    def discover(self, engine):
+        """Return a list of dataset URLs, or dataset records that already carry details"""
+
+
+class CKANApiSource(DatasetSource):
+    """Discover datasets (with full details) through the data.gov.hk CKAN API"""
+
+    name = 'ckan'
+
+    def __init__(self, organization='hk-hko', rows=100):
+        self.organization = organization
+        self.rows = rows
+
+    def discover(self, engine):
+        api_url = f"{engine.base_url}/api/3/action/package_search"
+        datasets = []
+        start = 0
+
+        while True:
+            params = {'fq': f"organization:{self.organization}", 'rows': self.rows, 'start': start}
+            try:
+                response = engine.session.get(api_url, params=params, timeout=30)
+                response.raise_for_status()
+                data = response.json()
+            except (requests.RequestException, ValueError) as e:
+                logger.error(f"CKAN API request failed: {e}")
+                break
+
+            if not data.get('success'):
+                logger.error(f"CKAN API error: {data.get('error', 'Unknown error')}")
+                break
+
+            results = data['result'].get('results', [])
+            datasets.extend(self.to_dataset_info(engine, package) for package in results)
+            start += len(results)
+            if not results or start >= data['result'].get('count', 0):
+                break
+
+        logger.info(f"CKAN API returned {len(datasets)} datasets")
+        return datasets
+
+    def to_dataset_info(self, engine, package):
+        """Convert a CKAN package into a dataset record"""
+        dataset_info = empty_dataset_info(f"{engine.base_url}/en-data/dataset/{package.get('name', '')}")
+        dataset_info.update({
+            'name': package.get('name', ''),
+            'title': package.get('title', ''),
+            'description': package.get('notes', '') or '',
+            'organization': (package.get('organization') or {}).get('title', 'Hong Kong Observatory'),
+            'tags': [tag.get('name', '') for tag in package.get('tags', [])],
+            'last_updated': package.get('metadata_modified', ''),
+            'created': package.get('metadata_created', ''),
+            'license': package.get('license_title', '') or '',
+            'author': package.get('author', '') or '',
+            'maintainer': package.get('maintainer', '') or ''
+        })
+
+        for resource in package.get('resources', []):
+            resource_format = (resource.get('format') or 'unknown').lower()
+            dataset_info['resources'].append({
+                'name': resource.get('name', ''),
+                'url': resource.get('url', ''),
+                'format': resource_format.upper(),
+                'size': resource.get('size', ''),
+                'last_modified': resource.get('last_modified', ''),
+                'hash': resource.get('hash', '')
+            })
+            if resource_format not in dataset_info['formats']:
+                dataset_info['formats'].append(resource_format)
+
+        return dataset_info
+
+
+class ProviderPaginationSource(DatasetSource):
+    """Discover datasets from the paginated HKO provider listing"""
+
+    name = 'pagination'
+
+    def __init__(self, page_url_templates=None, link_patterns=None):
+        self.page_url_templates = page_url_templates or [
+            f"{HKO_PROVIDER_URL}?page={{page}}",
+            f"{BASE_URL}/en-datasets?organization=hk-hko&page={{page}}"
+        ]
+        self.link_patterns = link_patterns
+
+    def discover(self, engine):
+        # Try different URL patterns for pagination until one returns a listing
+        for template in self.page_url_templates:
+            paginator = ParallelPaginator(
+                engine.get_page_content, engine.base_url, template,
+                max_workers=engine.max_workers, link_patterns=self.link_patterns
+            )
+            links = paginator.collect()
+            if links:
+                return links
+            logger.warning(f"No datasets found with URL pattern: {template}")
+        return []
+
+
+class ListingPageSource(DatasetSource):
+    """Discover datasets linked from fixed listing pages such as the provider page"""
+
+    name = 'listing'
+
+    def __init__(self, urls=None, link_patterns=None):
+        self.urls = urls or [HKO_PROVIDER_URL]
+        self.link_patterns = link_patterns or [
+            'a[href*="/dataset/"]',
+            'a[href*="/en-dataset/"]',
+            '.dataset-item a',
+            '.result-item a',
+            '.search-result a',
+            'a[href*="hk-hko"]'
+        ]
+
+    def discover(self, engine):
+        links = []
+        for soup in engine.fetch_soups(self.urls):
+            if soup is None:
+                continue
+            for pattern in self.link_patterns:
+                for link in soup.select(pattern):
+                    href = link.get('href')
+                    if href and ('dataset' in href or 'hk-hko' in href):
+                        links.append(urljoin(engine.base_url, href))
+        return links
+
+
+class SearchSource(DatasetSource):
+    """Discover datasets through the data.gov.hk search page"""
+
+    name = 'search'
+
+    def __init__(self, search_terms=None, url_templates=None):
+        self.search_terms = search_terms or SEARCH_TERMS
+        self.url_templates = url_templates or [f"{BASE_URL}/en-datasets?q={{term}}&organization=hk-hko"]
+
+    def discover(self, engine):
+        search_urls = [
+            template.format(term=quote_plus(term))
+            for term in self.search_terms
+            for template in self.url_templates
+        ]
+        links = []
+        for soup in engine.fetch_soups(search_urls):
+            if soup is None:
+                continue
+            for link in soup.select('a[href*="/dataset/"]'):
+                href = link.get('href')
+                if href:
+                    links.append(urljoin(engine.base_url, href))
+        return links
+
+
+class RSSFeedSource(DatasetSource):
+    """Discover HKO datasets listed in the data.gov.hk RSS feed"""
+
+    name = 'rss'
+
+    def __init__(self, rss_url="https://data.gov.hk/filestore/feeds/data_rss_en.xml",
+                 keywords=None):
+        self.rss_url = rss_url
+        self.keywords = keywords or ['hko', 'observatory', 'weather', 'climate', 'meteorological']
+
+    def discover(self, engine):
+        response = engine.get_page_content(self.rss_url)
+        if not response:
+            logger.error("Failed to fetch RSS feed")
+            return []
+
+        try:
+            root = ET.fromstring(response.content)
+        except ET.ParseError as e:
+            logger.error(f"Failed to parse RSS feed: {e}")
+            return []
+
+        links = []
+        for item in root.findall('.//item'):
+            link = item.find('link')
+            if link is not None and link.text:
+                # Check if this is an HKO dataset
+                if any(keyword in link.text.lower() for keyword in self.keywords):
+                    links.append(link.text.strip())
+
+        logger.info(f"Found {len(links)} HKO datasets in RSS feed")
+        return links
+
+
+class ManualListSource(DatasetSource):
+    """Candidate dataset names to try directly; missing pages drop out at detail fetch"""
+
+    name = 'manual'
+
+    def __init__(self, dataset_names):
+        self.dataset_names = dataset_names
+
+    def discover(self, engine):
+        return [f"{engine.base_url}/en-dataset/{name}" for name in self.dataset_names]
+
+
+class BrowserSource(DatasetSource):
+    """Discover datasets from JavaScript-rendered listing pages"""
+
+    name = 'browser'
+
+    def __init__(self, urls=None, pool=None, pool_size=3,
+                 ready_selector='.dataset-listing__item, .dataset-listing a[href*="/dataset/"]'):
+        self.urls = urls or [HKO_PROVIDER_URL, f"{BASE_URL}/en-datasets?organization=hk-hko"]
+        # A started pool shared with the caller, otherwise a temporary one is used
+        self.pool = pool
+        self.pool_size = pool_size
+        self.ready_selector = ready_selector
+
+    def discover(self, engine):
+        if self.pool is not None:
+            pages = self.pool.render_all(self.urls, self.ready_selector)
+        else:
+            # Imported here so the other sources work without Selenium installed
+            from hko_browser_pool import BrowserPool
+
+            with BrowserPool(size=self.pool_size) as pool:
+                if not pool.drivers:
+                    logger.error("Browser pool could not start, skipping browser source")
+                    return []
+                pages = pool.render_all(self.urls, self.ready_selector)
+
+        links = []
+        for html in pages:
+            if html:
+                soup = BeautifulSoup(html, 'html.parser')
+                for link in soup.select('a[href*="/dataset/"], .dataset-listing__item a'):
+                    href = link.get('href')
+                    if href and 'dataset' in href:
+                        links.append(urljoin(engine.base_url, href))
+        return links
+
+
+SOURCE_FACTORIES = {
+    'ckan': CKANApiSource,
+    'pagination': ProviderPaginationSource,
+    'listing': ListingPageSource,
+    'search': SearchSource,
+    'rss': RSSFeedSource,
+    'browser': BrowserSource
+}
+
+
+class HKODatasetEngine:
+    """Run discovery sources together and scrape every unique dataset once"""
+
+    report_prefix = "hko_datasets_engine_report"
+    report_title = "Hong Kong Observatory Datasets - Combined Report"
+
+    def __init__(self, sources=None, fallback_sources=None, max_workers=5):
+        self.base_url = BASE_URL
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': USER_AGENT})
+        self.sources = sources if sources is not None else [CKANApiSource(), ProviderPaginationSource()]
+        # Only tried when the primary sources find nothing
+        self.fallback_sources = fallback_sources or []
+        self.max_workers = max_workers
+        self.datasets = []
+
+    def get_page_content(self, url, max_retries=3):
+        """Get page content with retry logic"""
+        for attempt in range(max_retries):
+            try:
+                logger.info(f"Fetching: {url} (attempt {attempt + 1})")
+                response = self.session.get(url, timeout=30)
+                response.raise_for_status()
+                return response
+            except requests.RequestException as e:
+                logger.warning(f"Attempt {attempt + 1} failed: {e}")
+                if attempt < max_retries - 1:
+                    time.sleep(2 ** attempt)  # Exponential backoff
+                else:
+                    logger.error(f"Failed to fetch {url} after {max_retries} attempts")
+                    return None
+
+    def get_dataset_soup(self, dataset_url):
+        """Get the parsed dataset page; subclasses may render JavaScript here"""
+        response = self.get_page_content(dataset_url)
+        if not response:
+            return None
+        return BeautifulSoup(response.content, 'html.parser')
+
+    def fetch_soups(self, urls):
+        """Fetch and parse several pages concurrently, in input order"""
+        def fetch(url):
+            response = self.get_page_content(url)
+            return BeautifulSoup(response.content, 'html.parser') if response else None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(fetch, urls))
+
+    def run_source(self, source):
+        """Run one discovery source, isolating its failures from the others"""
+        logger.info(f"Running discovery source: {source.name}")
+        try:
+            return source.discover(self)
+        except Exception as e:
+            logger.error(f"Discovery source {source.name} failed: {e}")
+            return []
+
+    def discover(self, sources):
+        """Run sources concurrently and merge their results by dataset key"""
+        found = {}
+
+        with ThreadPoolExecutor(max_workers=max(len(sources), 1)) as executor:
+            for source, results in zip(sources, executor.map(self.run_source, sources)):
+                logger.info(f"Source {source.name} found {len(results)} datasets")
+                for result in results:
+                    url = result['url'] if isinstance(result, dict) else result
+                    entry = found.setdefault(dataset_key(url), {'url': url, 'details': None, 'sources': []})
+                    if isinstance(result, dict) and entry['details'] is None:
+                        entry['details'] = result
+                    if source.name not in entry['sources']:
+                        entry['sources'].append(source.name)
+
+        return found
+
+    def discover_all(self):
+        """Run the primary sources, then the fallbacks if nothing was found"""
+        found = self.discover(self.sources)
+        if not found and self.fallback_sources:
+            logger.warning("No dataset URLs found. Trying alternative approach...")
+            found = self.discover(self.fallback_sources)
+        logger.info(f"Found {len(found)} unique datasets")
+        return found
+
+    def scrape_dataset_details(self, dataset_url):
+        """Scrape detailed information from a single dataset page"""
+        logger.info(f"Scraping dataset: {dataset_url}")
+
+        soup = self.get_dataset_soup(dataset_url)
+        if soup is None:
+            return None
+
+        dataset_info = empty_dataset_info(dataset_url)
+
+        # Extract title
+        title_selectors = [
+            'h1', '.page-header h1', '.dataset-title', 'title',
+            '.dataset-header h1', '.content-header h1', '.page-title'
+        ]
+        for selector in title_selectors:
+            title_elem = soup.select_one(selector)
+            if title_elem and title_elem.get_text().strip():
+                dataset_info['title'] = title_elem.get_text().strip()
+                break
+
+        # Extract description
+        desc_selectors = [
+            '.notes', '.description', '.dataset-description',
+            'meta[name="description"]', '.dataset-notes',
+            '.content-description'
+        ]
+        for selector in desc_selectors:
+            desc_elem = soup.select_one(selector)
+            if desc_elem:
+                if selector.startswith('meta'):
+                    dataset_info['description'] = desc_elem.get('content', '').strip()
+                else:
+                    dataset_info['description'] = desc_elem.get_text().strip()
+                if dataset_info['description']:
+                    break
+
+        # Extract tags/keywords
+        tag_selectors = [
+            '.tag', '.keyword', '.tag-list a', '.tags a',
+            '.dataset-tags a', '.keyword-list a'
+        ]
+        for selector in tag_selectors:
+            for tag in soup.select(selector):
+                tag_text = tag.get_text().strip()
+                if tag_text and tag_text not in dataset_info['tags']:
+                    dataset_info['tags'].append(tag_text)
+
+        # Extract author information
+        author_selectors = [
+            '.author', '.dataset-author', '.content-author',
+            'meta[name="author"]'
+        ]
+        for selector in author_selectors:
+            author_elem = soup.select_one(selector)
+            if author_elem:
+                if selector.startswith('meta'):
+                    dataset_info['author'] = author_elem.get('content', '').strip()
+                else:
+                    dataset_info['author'] = author_elem.get_text().strip()
+                if dataset_info['author']:
+                    break
+
+        # Extract resources (downloadable files)
+        resource_selectors = [
+            'a[href*=".csv"]', 'a[href*=".json"]', 'a[href*=".xml"]',
+            'a[href*=".xlsx"]', 'a[href*=".pdf"]', '.resource-item a',
+            'a[href*="download"]', 'a[href*="api"]', '.resource a',
+            '.download-link', '.file-link'
+        ]
+        seen_resources = set()
+        for selector in resource_selectors:
+            for resource in soup.select(selector):
+                href = resource.get('href')
+                if not href:
+                    continue
+                full_url = urljoin(self.base_url, href)
+                if full_url in seen_resources:
+                    continue
+                seen_resources.add(full_url)
+
+                resource_name = resource.get_text().strip() or urlparse(href).path.split('/')[-1]
+                resource_format = urlparse(href).path.split('.')[-1].lower() if '.' in href else 'unknown'
+
+                dataset_info['resources'].append({
+                    'name': resource_name,
+                    'url': full_url,
+                    'format': resource_format.upper()
+                })
+
+                if resource_format not in dataset_info['formats']:
+                    dataset_info['formats'].append(resource_format)
+
+        # Extract dates
+        date_selectors = [
+            '.date', '.last-updated', '.modified', 'time',
+            '.dataset-date', '.content-date'
+        ]
+        for selector in date_selectors:
+            date_elem = soup.select_one(selector)
+            if date_elem:
+                date_text = date_elem.get_text().strip() or date_elem.get('datetime', '').strip()
+                if date_text:
+                    if 'created' in date_text.lower():
+                        dataset_info['created'] = date_text
+                    else:
+                        dataset_info['last_updated'] = date_text
+                    break
+
+        # Extract license information
+        license_selectors = [
+            '.license', '.rights', '.terms', '.dataset-license'
+        ]
+        for selector in license_selectors:
+            license_elem = soup.select_one(selector)
+            if license_elem:
+                dataset_info['license'] = license_elem.get_text().strip()
+                break
+
+        return dataset_info
+
+    def scrape_entry(self, entry):
+        """Return details for a discovered dataset, scraping only if a source gave none"""
+        dataset_info = entry['details'] or self.scrape_dataset_details(entry['url'])
+        if dataset_info:
+            dataset_info['sources'] = entry['sources']
+        return dataset_info
+
+    def scrape_all_datasets(self):
+        """Main method to scrape all HKO datasets"""
+        logger.info("Starting comprehensive HKO dataset scraping...")
+
+        entries = list(self.discover_all().values())
+        to_fetch = sum(1 for entry in entries if entry['details'] is None)
+        logger.info(f"Processing {len(entries)} datasets ({to_fetch} need a detail fetch)...")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for i, (entry, dataset_info) in enumerate(zip(entries, executor.map(self.scrape_entry, entries)), 1):
+                logger.info(f"Processed dataset {i}/{len(entries)}")
+                if dataset_info:
+                    self.datasets.append(dataset_info)
+                    logger.info(f"Successfully scraped: {dataset_info['title']}")
+                else:
+                    logger.warning(f"Failed to scrape dataset: {entry['url']}")
+
+        logger.info(f"Scraping completed. Found {len(self.datasets)} datasets.")
+        return self.datasets
+
+    def generate_report(self, output_format='both'):
+        """Generate comprehensive report of all datasets
+
+        output_format is 'json', 'csv', 'parquet', 'both' (JSON and CSV) or 'all'.
+        """
+        logger.info("Generating comprehensive dataset report...")
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        if output_format in ['json', 'both', 'all']:
+            json_file = f"{self.report_prefix}_{timestamp}.json"
+            with open(json_file, 'w', encoding='utf-8') as f:
+                json.dump(self.datasets, f, indent=2, ensure_ascii=False)
+            logger.info(f"JSON report saved: {json_file}")
+
+        if output_format in ['csv', 'both', 'all']:
+            csv_file = f"{self.report_prefix}_{timestamp}.csv"
+            with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=DATASET_FIELDS, extrasaction='ignore')
+                writer.writeheader()
+                for dataset in self.datasets:
+                    # Flatten nested structures for CSV
+                    flat_dataset = dataset.copy()
+                    flat_dataset['tags'] = '; '.join(dataset['tags'])
+                    flat_dataset['formats'] = '; '.join(dataset['formats'])
+                    flat_dataset['resources'] = '; '.join([f"{r['name']} ({r['format']})" for r in dataset['resources']])
+                    flat_dataset['sources'] = '; '.join(dataset.get('sources', []))
+                    writer.writerow(flat_dataset)
+            logger.info(f"CSV report saved: {csv_file}")
+
+        if output_format in ['parquet', 'all']:
+            parquet_file = write_records(self.datasets, f"{self.report_prefix}_{timestamp}.parquet", DATASET_COLUMNS)
+            logger.info(f"Parquet report saved: {parquet_file}")
+
+        # Generate markdown report
+        md_file = f"{self.report_prefix}_{timestamp}.md"
+        self.generate_markdown_report(md_file)
+        logger.info(f"Markdown report saved: {md_file}")
+
+        return {
+            'total_datasets': len(self.datasets),
+            'json_file': json_file if output_format in ['json', 'both', 'all'] else None,
+            'csv_file': csv_file if output_format in ['csv', 'both', 'all'] else None,
+            'parquet_file': str(parquet_file) if output_format in ['parquet', 'all'] else None,
+            'markdown_file': md_file
+        }
+
+    def generate_markdown_report(self, filename):
+        """Generate a detailed markdown report"""
+        source_names = sorted({name for dataset in self.datasets for name in dataset.get('sources', [])})
+
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(f"# {self.report_title}\n\n")
+            f.write(f"**Generated on:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            f.write(f"**Total Datasets:** {len(self.datasets)}\n")
+            f.write("**Organization:** Hong Kong Observatory (hk-hko)\n")
+            f.write(f"**Discovery Sources:** {', '.join(source_names)}\n\n")
+
+            f.write("## Executive Summary\n\n")
+            f.write(f"This report provides a comprehensive overview of all {len(self.datasets)} datasets ")
+            f.write("available from the Hong Kong Observatory through the data.gov.hk portal.\n\n")
+
+            # Dataset statistics
+            total_resources = sum(len(dataset['resources']) for dataset in self.datasets)
+            f.write(f"**Total Resources:** {total_resources}\n\n")
+
+            # Format analysis
+            format_counts = {}
+            for dataset in self.datasets:
+                for fmt in dataset['formats']:
+                    format_counts[fmt] = format_counts.get(fmt, 0) + 1
+
+            if format_counts:
+                f.write("## Data Formats Available\n\n")
+                for fmt, count in sorted(format_counts.items(), key=lambda x: x[1], reverse=True):
+                    f.write(f"- **{fmt.upper()}**: {count} datasets\n")
+                f.write("\n")
+
+            # Tag analysis
+            tag_counts = {}
+            for dataset in self.datasets:
+                for tag in dataset['tags']:
+                    if tag:
+                        tag_counts[tag] = tag_counts.get(tag, 0) + 1
+
+            if tag_counts:
+                f.write("## Dataset Categories (Tags)\n\n")
+                for tag, count in sorted(tag_counts.items(), key=lambda x: x[1], reverse=True):
+                    f.write(f"- **{tag}**: {count} datasets\n")
+                f.write("\n")
+
+            # Source coverage
+            source_counts = {}
+            for dataset in self.datasets:
+                for name in dataset.get('sources', []):
+                    source_counts[name] = source_counts.get(name, 0) + 1
+
+            if len(source_counts) > 1:
+                f.write("## Discovery Source Coverage\n\n")
+                for name, count in sorted(source_counts.items(), key=lambda x: x[1], reverse=True):
+                    f.write(f"- **{name}**: {count} datasets\n")
+                f.write("\n")
+
+            # Detailed dataset information
+            f.write("## Detailed Dataset Information\n\n")
+            for i, dataset in enumerate(self.datasets, 1):
+                f.write(f"### {i}. {dataset['title']}\n\n")
+                f.write(f"**Dataset Name:** `{dataset['name']}`\n\n")
+                f.write(f"**URL:** {dataset['url']}\n\n")
+
+                if dataset['description']:
+                    f.write(f"**Description:** {dataset['description']}\n\n")
+
+                if dataset['tags']:
+                    f.write(f"**Tags:** {', '.join(dataset['tags'])}\n\n")
+
+                if dataset['author']:
+                    f.write(f"**Author:** {dataset['author']}\n\n")
+
+                if dataset['license']:
+                    f.write(f"**License:** {dataset['license']}\n\n")
+
+                if dataset['created']:
+                    f.write(f"**Created:** {dataset['created']}\n\n")
+
+                if dataset['last_updated']:
+                    f.write(f"**Last Updated:** {dataset['last_updated']}\n\n")
+
+                if dataset['resources']:
+                    f.write(f"**Available Resources ({len(dataset['resources'])}):**\n\n")
+                    for j, resource in enumerate(dataset['resources'], 1):
+                        f.write(f"{j}. **{resource['name']}**\n")
+                        f.write(f"   - Format: {resource['format']}\n")
+                        f.write(f"   - URL: [{resource['url']}]({resource['url']})\n")
+                        f.write("\n")
+
+                f.write("---\n\n")
+
+    def run_full_scrape(self, output_format='both'):
+        """Run the complete scraping process"""
+        logger.info("Starting full HKO dataset scraping process...")
+
+        try:
+            # Scrape all datasets
+            datasets = self.scrape_all_datasets()
+
+            if not datasets:
+                logger.error("No datasets found. Please check the website structure.")
+                return None
+
+            # Generate reports
+            report_files = self.generate_report(output_format)
+
+            logger.info("Scraping process completed successfully!")
+            logger.info(f"Found {len(datasets)} datasets")
+            logger.info(f"Report files generated: {report_files}")
+
+            return {
+                'datasets': datasets,
+                'report_files': report_files,
+                'total_count': len(datasets)
+            }
+
+        except Exception as e:
+            logger.error(f"Error during scraping process: {e}")
+            return None
+
+
+def print_result(result):
+    """Print the outcome of run_full_scrape for the command-line scripts"""
+    if result:
+        print("\n✅ Scraping completed successfully!")
+        print(f"📊 Total datasets found: {result['total_count']}")
+        print("📁 Report files generated:")
+        for file_type, file_path in result['report_files'].items():
+            if file_path and file_type != 'total_datasets':
+                print(f"   - {file_type}: {file_path}")
+    else:
+        print("❌ Scraping failed. Check the logs for details.")
+
+
+def main():
+    """Main function to run the combined scraper"""
+    parser = argparse.ArgumentParser(description="Scrape HKO datasets from several discovery sources at once")
+    parser.add_argument('--sources', default='ckan,pagination,rss',
+                        help=f"Comma-separated sources to run together ({', '.join(SOURCE_FACTORIES)})")
+    parser.add_argument('--workers', type=int, default=5, help="Concurrent detail fetches")
+    parser.add_argument('--format', default='both', choices=['json', 'csv', 'parquet', 'both', 'all'],
+                        help="Report formats; 'both' is JSON and CSV, 'all' adds Parquet")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.sources.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SOURCE_FACTORIES]
+    if unknown or not names:
+        problem = f"unknown source {', '.join(unknown)}" if unknown else "no source given"
+        parser.error(f"--sources: {problem}; choose from {', '.join(SOURCE_FACTORIES)}")
+
+    sources = [SOURCE_FACTORIES[name]() for name in names]
+    engine = HKODatasetEngine(sources, fallback_sources=[SearchSource()], max_workers=args.workers)
+    print_result(engine.run_full_scrape(args.format))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+HKO Provider Paginator
+Works out the last page from the first listing page (the highest page number
+in its pager, or the total result count over the number of result items on
+the page), then fetches the remaining ?page=N pages concurrently and stops
+exactly at the last page
+"""
+
+import math
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+DATASET_LINK_PATTERNS = [
+    'a[href*="/dataset/"]',
+    'a[href*="/en-dataset/"]',
+    '.dataset-listing__item a',
+    '.dataset-item a',
+    '.result-item a',
+    'a[href*="hk-hko"]'
+]
+
+# One element per result on a listing page; the page size is their count on page 1
+RESULT_ITEM_PATTERNS = [
+    '.dataset-listing__item',
+    '.dataset-item',
+    '.result-item'
+]
+
+PAGER_PATTERNS = [
+    '.pagination a[href]',
+    '.pager a[href]',
+    'nav a[href*="page="]'
+]
+PAGE_NUMBER_PATTERN = re.compile(r'[?&]page=(\d+)')
+
+TOTAL_COUNT_PATTERNS = [
+    re.compile(r'total\s+(\d[\d,]*)\s+results?', re.IGNORECASE),
+    re.compile(r'(\d[\d,]*)\s+(?:results?|datasets?)\s+found', re.IGNORECASE),
+    re.compile(r'showing\s+\d+\s*(?:-|to)\s*\d+\s+of\s+(\d[\d,]*)', re.IGNORECASE)
+]
+
+NO_RESULTS_MARKERS = ['no results found', 'total 0 results']
+
+
+class ParallelPaginator:
+    """Fetch every page of a paginated dataset listing with one parallel batch"""
+
+    def __init__(self, fetch, base_url, page_url_template, max_workers=5,
+                 link_patterns=None, max_pages=100):
+        # fetch(url) -> response or None; usually the scraper's get_page_content
+        self.fetch = fetch
+        self.base_url = base_url
+        self.page_url_template = page_url_template
+        self.max_workers = max_workers
+        self.link_patterns = link_patterns or DATASET_LINK_PATTERNS
+        self.max_pages = max_pages
+        self.failed_pages = []
+
+    def page_url(self, page):
+        """Build the listing URL for a page number"""
+        return self.page_url_template.format(page=page)
+
+    def extract_links(self, soup):
+        """Extract dataset links from a listing page, keeping page order"""
+        links = {}
+        for pattern in self.link_patterns:
+            for link in soup.select(pattern):
+                href = link.get('href')
+                if href and ('dataset' in href or 'hk-hko' in href):
+                    links.setdefault(urljoin(self.base_url, href), None)
+        return list(links)
+
+    def read_total_count(self, soup):
+        """Read the total result count shown on a listing page, if any"""
+        page_text = soup.get_text(' ')
+        for pattern in TOTAL_COUNT_PATTERNS:
+            match = pattern.search(page_text)
+            if match:
+                return int(match.group(1).replace(',', ''))
+        return None
+
+    def count_result_items(self, soup):
+        """Number of results listed on a page, or None if the listing markup is not recognised"""
+        for pattern in RESULT_ITEM_PATTERNS:
+            items = soup.select(pattern)
+            if items:
+                return len(items)
+        return None
+
+    def read_pager_last_page(self, soup):
+        """Highest page number linked from the page's pager, if it has one"""
+        pages = []
+        for pattern in PAGER_PATTERNS:
+            for link in soup.select(pattern):
+                match = PAGE_NUMBER_PATTERN.search(link['href'])
+                if match:
+                    pages.append(int(match.group(1)))
+        return max(pages) if pages else None
+
+    def find_last_page(self, soup):
+        """(last page, exact) for the listing, or (None, False) if page 1 does not tell.
+
+        The count over the number of result items gives the exact last page.
+        Dataset links are not used as the page size: the link patterns also
+        match pager, filter and facet links, which would make the last page
+        too small and drop the final pages. A pager alone may only show a
+        window of pages, so its highest page is a lower bound.
+        """
+        total = self.read_total_count(soup)
+        page_size = self.count_result_items(soup)
+        pager_last = self.read_pager_last_page(soup)
+        logger.info(f"Listing reports {total if total is not None else 'an unknown number of'} results, "
+                    f"{page_size or 'unknown'} per page, pager up to page {pager_last or 'unknown'}")
+        if total is not None and page_size:
+            return min(max(math.ceil(total / page_size), 1), self.max_pages), True
+        if pager_last:
+            return min(pager_last, self.max_pages), False
+        return None, False
+
+    def is_empty_page(self, soup, links):
+        """Check whether a listing page has no results"""
+        if not links:
+            return True
+        page_text = soup.get_text().lower()
+        return any(marker in page_text for marker in NO_RESULTS_MARKERS)
+
+    def fetch_page(self, page):
+        """Fetch and parse one listing page, returning (soup, links)"""
+        response = self.fetch(self.page_url(page))
+        if not response:
+            self.failed_pages.append(page)
+            return None, []
+        soup = BeautifulSoup(response.content, 'html.parser')
+        return soup, self.extract_links(soup)
+
+    def fetch_pages(self, pages):
+        """Fetch a batch of pages concurrently, returning links per page in order"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(self.fetch_page, pages))
+
+    def probe_pages(self, page, all_links):
+        """Fetch batches of pages from `page` on, adding their links, until a page is empty"""
+        while page <= self.max_pages:
+            batch = range(page, min(page + self.max_workers, self.max_pages + 1))
+            for number, (page_soup, links) in zip(batch, self.fetch_pages(batch)):
+                if page_soup is None:
+                    # Past the last page some sites answer with an error, so this may be the end
+                    logger.warning(f"Stopped probing at page {number}: it failed to fetch ({self.page_url(number)})")
+                    return
+                if self.is_empty_page(page_soup, links):
+                    return
+                all_links.update(dict.fromkeys(links))
+            page += self.max_workers
+
+    def collect(self):
+        """Return all unique dataset links across every listing page"""
+        self.failed_pages = []
+        soup, first_links = self.fetch_page(1)
+        if soup is None or self.is_empty_page(soup, first_links):
+            logger.info("First listing page has no results")
+            return []
+
+        all_links = dict.fromkeys(first_links)
+        last_page, exact = self.find_last_page(soup)
+
+        if last_page is not None:
+            logger.info(f"Fetching pages 2-{last_page}")
+            for _, links in self.fetch_pages(range(2, last_page + 1)):
+                all_links.update(dict.fromkeys(links))
+            if self.failed_pages:
+                logger.warning(f"{len(self.failed_pages)} listing page(s) failed to fetch and were skipped: "
+                               f"{', '.join(self.page_url(page) for page in sorted(self.failed_pages))}")
+        if not exact:
+            # No result count: probe in parallel batches until an empty page
+            logger.info("No total count found, probing further pages in parallel batches")
+            self.probe_pages((last_page or 1) + 1, all_links)
+
+        logger.info(f"Collected {len(all_links)} unique dataset links")
+        return list(all_links)
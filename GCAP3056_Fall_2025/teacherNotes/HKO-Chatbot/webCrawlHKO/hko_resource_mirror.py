@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+HKO Resource Mirror
+Downloads the CSV/JSON/XML files behind the dataset `resources` entries and
+keeps a local mirror fresh. Files are streamed to disk in chunks, interrupted
+transfers resume with HTTP Range, unchanged files are skipped with
+ETag/Last-Modified, and sizes and SHA-256 checksums are verified.
+
+A partial download `<file>.part` has a sidecar `<file>.part.json` holding the
+ETag/Last-Modified of the response it came from, written before its first
+byte. A resume sends it as If-Range, so a file that changed in the meantime
+is downloaded again from the start instead of appended to the old prefix.
+"""
+
+import requests
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import logging
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+CHUNK_SIZE = 64 * 1024
+DEFAULT_FORMATS = ['csv', 'json', 'xml']
+
+
+def safe_name(text):
+    """Make a string safe to use as a file or folder name"""
+    return re.sub(r'[^\w.\-]+', '_', text).strip('_') or 'resource'
+
+
+class ResourceMirror:
+    """Mirror dataset resources to a local folder with resumable, conditional downloads"""
+
+    def __init__(self, output_dir="dataset_mirror", max_workers=4, formats=None, max_retries=3):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max_workers
+        self.formats = [fmt.lower() for fmt in (formats or DEFAULT_FORMATS)]
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': USER_AGENT})
+
+        self.manifest_file = self.output_dir / "manifest.json"
+        self.manifest = self.load_manifest()
+        self.manifest_lock = threading.Lock()
+
+    def load_manifest(self):
+        """Load the manifest of previously mirrored files"""
+        if self.manifest_file.exists():
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+
+    def save_manifest(self):
+        """Write the manifest atomically so an interrupted run cannot corrupt it"""
+        with self.manifest_lock:
+            tmp_file = self.manifest_file.with_suffix('.json.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.manifest, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_file, self.manifest_file)
+
+    def select_resources(self, datasets):
+        """Yield (dataset, resource) pairs whose format should be mirrored"""
+        seen = set()
+        for dataset in datasets:
+            for resource in dataset.get('resources', []):
+                url = resource.get('url')
+                resource_format = (resource.get('format') or '').lower()
+                if not url or url in seen or resource_format not in self.formats:
+                    continue
+                seen.add(url)
+                yield dataset, resource
+
+    def local_path(self, dataset, resource):
+        """Where a resource is stored in the mirror"""
+        parsed = urlparse(resource['url'])
+        filename = Path(parsed.path).name or safe_name(resource.get('name', ''))
+        if not filename.lower().endswith(f".{resource.get('format', '').lower()}"):
+            filename = f"{filename}.{resource.get('format', 'dat').lower()}"
+        if parsed.query:
+            # weather.php?dataType=rhrread&lang=en and &lang=tc are different files
+            digest = hashlib.sha256(parsed.query.encode('utf-8')).hexdigest()[:8]
+            filename = f"{Path(filename).stem}_{digest}{Path(filename).suffix}"
+        return self.output_dir / safe_name(dataset.get('name') or 'dataset') / safe_name(filename)
+
+    def conditional_headers(self, entry, path):
+        """If-None-Match/If-Modified-Since headers for a file we already have"""
+        headers = {}
+        if entry and path.exists():
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def download(self, dataset, resource):
+        """Download one resource, resuming a partial file if there is one"""
+        url = resource['url']
+        path = self.local_path(dataset, resource)
+        part_path = path.with_name(path.name + '.part')
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        for attempt in range(self.max_retries):
+            # Read on every attempt: an earlier attempt may have started a partial file
+            entry = self.manifest.get(url)
+            headers = self.conditional_headers(entry, path)
+            offset = part_path.stat().st_size if part_path.exists() else 0
+            if offset:
+                # Only resume if the file has not changed since the partial download
+                validator = self.read_partial_validator(part_path, url)
+                if validator:
+                    headers['Range'] = f"bytes={offset}-"
+                    headers['If-Range'] = validator
+                else:
+                    # Nothing to check the partial file against, so it cannot be trusted
+                    self.discard_partial(part_path)
+                    offset = 0
+
+            try:
+                with self.session.get(url, headers=headers, stream=True, timeout=60) as response:
+                    if response.status_code == 304:
+                        logger.info(f"Unchanged, skipped: {url}")
+                        return {'url': url, 'status': 'unchanged', 'path': str(path)}
+
+                    if response.status_code == 416:
+                        # The partial file is not a valid prefix any more
+                        self.discard_partial(part_path)
+                        continue
+
+                    response.raise_for_status()
+                    etag = response.headers.get('ETag', '')
+                    last_modified = response.headers.get('Last-Modified', '')
+
+                    if response.status_code == 206:
+                        start = self.range_start(response)
+                        if start != offset:
+                            # Appending bytes from anywhere else would corrupt the file
+                            logger.warning(f"Content-Range starts at {start}, not {offset}; restarting {url}")
+                            self.discard_partial(part_path)
+                            continue
+                        mode = 'ab'
+                        digest = self.resume_digest(part_path)
+                        logger.info(f"Resuming {url} from byte {offset}")
+                    else:
+                        # Server ignored the range or the file changed: start over
+                        mode, offset = 'wb', 0
+                        digest = hashlib.sha256()
+                        self.write_partial_validator(part_path, url, etag or last_modified)
+
+                    expected_size = self.expected_size(response, offset)
+
+                    with open(part_path, mode) as f:
+                        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                            if chunk:
+                                f.write(chunk)
+                                digest.update(chunk)
+
+                size = part_path.stat().st_size
+                if expected_size is not None and size != expected_size:
+                    raise IOError(f"size mismatch: expected {expected_size} bytes, got {size}")
+
+                sha256 = digest.hexdigest()
+                expected_hash = (resource.get('hash') or '').lower()
+                if expected_hash and len(expected_hash) == 64 and expected_hash != sha256:
+                    self.discard_partial(part_path)
+                    raise IOError(f"checksum mismatch: expected {expected_hash}, got {sha256}")
+
+                os.replace(part_path, path)
+                self.sidecar_path(part_path).unlink(missing_ok=True)
+                with self.manifest_lock:
+                    self.manifest[url] = {
+                        'path': str(path.relative_to(self.output_dir)),
+                        'dataset': dataset.get('name', ''),
+                        'format': resource.get('format', ''),
+                        'size': size,
+                        'sha256': sha256,
+                        'etag': etag,
+                        'last_modified': last_modified,
+                        'downloaded': datetime.now().isoformat()
+                    }
+                logger.info(f"Saved: {path} ({size} bytes)")
+                return {'url': url, 'status': 'downloaded', 'path': str(path), 'size': size}
+
+            except (requests.RequestException, IOError) as e:
+                logger.warning(f"Attempt {attempt + 1} failed for {url}: {e}")
+
+        logger.error(f"Failed to download {url} after {self.max_retries} attempts")
+        return {'url': url, 'status': 'failed', 'path': str(path)}
+
+    def sidecar_path(self, part_path):
+        return part_path.with_name(part_path.name + '.json')
+
+    def write_partial_validator(self, part_path, url, validator):
+        """Record the validator for If-Range before the partial file gets its first byte"""
+        sidecar = self.sidecar_path(part_path)
+        tmp_file = sidecar.with_suffix('.json.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'url': url, 'validator': validator}, f)
+        os.replace(tmp_file, sidecar)
+
+    def read_partial_validator(self, part_path, url):
+        """Validator of the response a partial file came from, or '' if unknown"""
+        try:
+            with open(self.sidecar_path(part_path), 'r', encoding='utf-8') as f:
+                sidecar = json.load(f)
+        except (OSError, ValueError):
+            return ''
+        return sidecar.get('validator', '') if sidecar.get('url') == url else ''
+
+    def discard_partial(self, part_path):
+        part_path.unlink(missing_ok=True)
+        self.sidecar_path(part_path).unlink(missing_ok=True)
+
+    def range_start(self, response):
+        """First byte of a 206 response from its Content-Range, or None"""
+        match = re.match(r'bytes\s+(\d+)-', response.headers.get('Content-Range', ''))
+        return int(match.group(1)) if match else None
+
+    def resume_digest(self, part_path):
+        """Start a SHA-256 digest from the bytes already on disk"""
+        digest = hashlib.sha256()
+        with open(part_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest
+
+    def expected_size(self, response, offset):
+        """Total file size implied by Content-Range or Content-Length"""
+        content_range = response.headers.get('Content-Range', '')
+        match = re.search(r'/(\d+)$', content_range)
+        if match:
+            return int(match.group(1))
+        content_length = response.headers.get('Content-Length')
+        # Content-Length is meaningless for compressed transfers
+        if content_length and not response.headers.get('Content-Encoding'):
+            return offset + int(content_length)
+        return None
+
+    def mirror(self, datasets):
+        """Download every selected resource concurrently"""
+        jobs = []
+        results = []
+        owners = {}
+        for dataset, resource in self.select_resources(datasets):
+            # Two downloads into one file would overwrite each other's data and partial file
+            path = self.local_path(dataset, resource)
+            owner = owners.setdefault(path, resource['url'])
+            if owner != resource['url']:
+                logger.error(f"Skipped {resource['url']}: same local file {path} as {owner}")
+                results.append({'url': resource['url'], 'status': 'failed', 'path': str(path)})
+                continue
+            jobs.append((dataset, resource))
+        logger.info(f"Mirroring {len(jobs)} resources with {self.max_workers} workers...")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for result in executor.map(lambda job: self.download(*job), jobs):
+                results.append(result)
+                if len(results) % 20 == 0:
+                    self.save_manifest()
+
+        self.save_manifest()
+
+        summary = {}
+        for result in results:
+            summary[result['status']] = summary.get(result['status'], 0) + 1
+        logger.info(f"Mirror complete: {summary}")
+        return results
+
+
+def main():
+    """Mirror the resources listed in a dataset report JSON file"""
+    parser = argparse.ArgumentParser(description="Download and keep fresh the files behind HKO dataset resources")
+    parser.add_argument('report', help="Dataset report JSON written by one of the hko_dataset_scraper scripts")
+    parser.add_argument('--output-dir', default="dataset_mirror", help="Mirror folder")
+    parser.add_argument('--formats', default=','.join(DEFAULT_FORMATS), help="Comma-separated formats to download")
+    parser.add_argument('--workers', type=int, default=4, help="Concurrent downloads")
+    args = parser.parse_args()
+
+    with open(args.report, 'r', encoding='utf-8') as f:
+        datasets = json.load(f)
+
+    mirror = ResourceMirror(args.output_dir, max_workers=args.workers, formats=args.formats.split(','))
+    results = mirror.mirror(datasets)
+
+    downloaded = sum(1 for r in results if r['status'] == 'downloaded')
+    unchanged = sum(1 for r in results if r['status'] == 'unchanged')
+    failed = sum(1 for r in results if r['status'] == 'failed')
+    print(f"\n✅ Mirror updated: {downloaded} downloaded, {unchanged} unchanged, {failed} failed")
+    print(f"📁 Mirror folder: {mirror.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,6 @@ Web Crawler for Hong Kong Observatory (HKO)
 Downloads all pages from https://www.hko.gov.hk/en/index.html and searches for "Dr Tin chatbot" mentions
 """
 
-import requests
 from bs4 import BeautifulSoup
 import os
 import time
@@ -15,10 +14,20 @@ import re
 from datetime import datetime
 import csv
 import json
+import sys
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'crawl_common'))
+from columnar_export import write_records
+from crawl_metrics import CrawlMetrics
+from crawl_logging import setup_crawl_logging, log_event, log_progress
+from crawl_report import CrawlAggregates, ReportSection, write_markdown, REPORT_EVERY
+from near_duplicates import NearDuplicateIndex, page_blocks
+from page_index import PageIndex
+from page_text import PageText
 
 class HKOWebCrawler:
     def __init__(self, base_url="https://www.hko.gov.hk/en/index.html", 
-                 output_dir="C:\\Users\\simonwang\\Documents\\Vault4sync\\01-Courses\\GCAP3056\\HKO-Chatbot\\webCrawlHKO"):
+                 output_dir="C:\\Users\\simonwang\\Documents\\Vault4sync\\01-Courses\\GCAP3056\\HKO-Chatbot\\webCrawlHKO",
+                 metrics_port=None):
         self.base_url = base_url
         self.domain = urlparse(base_url).netloc
         self.output_dir = Path(output_dir)
@@ -31,6 +40,19 @@ class HKOWebCrawler:
         self.url_normalization_cache = {}
         self.dr_tin_mentions = []  # Store pages that mention Dr Tin chatbot
         
+        # Running totals and pre-rendered report entries, updated page by page
+        self.stats = CrawlAggregates()
+        self.mention_entries = ReportSection()   # dr_tin_mentions_report.md
+        self.mention_links = ReportSection()     # link list in webCrawllog_HKO.md
+        
+        # Pages already seen under another URL variant are not analyzed or expanded
+        self.duplicate_index = NearDuplicateIndex()
+        
+        # Per-stage timings and counters; served on metrics_port if given
+        self.metrics = CrawlMetrics()
+        self.metrics_port = metrics_port
+        self.session = self.metrics.session()
+        
         # Create output directory if it doesn't exist
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
@@ -42,20 +64,16 @@ class HKOWebCrawler:
         for dir_path in [self.pages_dir, self.dr_tin_pages_dir, self.reports_dir]:
             dir_path.mkdir(parents=True, exist_ok=True)
         
+        # Full-text index of the stored pages, searchable with page_index.py
+        self.page_index = PageIndex(self.output_dir / "page_index.sqlite")
+        
         # Setup logging
         self.setup_logging()
         
     def setup_logging(self):
         """Setup logging configuration"""
         log_file = self.output_dir / "hko_crawler.log"
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file, encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
+        setup_crawl_logging(log_file, events_file=self.output_dir / "hko_crawler.events.jsonl")
         self.logger = logging.getLogger(__name__)
         
     def normalize_url(self, url):
@@ -105,7 +123,7 @@ class HKOWebCrawler:
         return filename
     
     def check_dr_tin_mention(self, content, url):
-        """Check if content mentions Dr Tin chatbot"""
+        """Check if content (a PageText or plain text) mentions Dr Tin chatbot"""
         # Search for various forms of Dr Tin chatbot mentions
         patterns = [
             r'dr\s+tin\s+chatbot',
@@ -118,73 +136,96 @@ class HKOWebCrawler:
             r'dr\s+tin.*bot'
         ]
         
-        content_lower = content.lower()
+        page = content if isinstance(content, PageText) else PageText.from_text(content)
         mentions = []
         
-        for pattern in patterns:
-            matches = re.finditer(pattern, content_lower, re.IGNORECASE)
-            for match in matches:
-                # Get context around the match
-                start = max(0, match.start() - 100)
-                end = min(len(content), match.end() + 100)
-                context = content[start:end]
-                mentions.append({
-                    'pattern': pattern,
-                    'match': match.group(),
-                    'context': context.strip(),
-                    'position': match.start()
-                })
+        for number, match, index, offset in page.finditer([re.compile(p) for p in patterns]):
+            mentions.append({
+                'pattern': patterns[number],
+                'match': match.group(),
+                'context': page.context(index, match.start(), match.end(), 100),
+                'position': offset + match.start()
+            })
         
         if mentions:
-            self.dr_tin_mentions.append({
+            mention = {
                 'url': url,
                 'mentions': mentions,
                 'timestamp': datetime.now().isoformat()
-            })
+            }
+            self.dr_tin_mentions.append(mention)
+            self.add_mention_entries(mention)
             return True
         
         return False
     
+    def add_mention_entries(self, mention):
+        """Render the report entries for a page with Dr Tin mentions when it is found"""
+        url = mention['url']
+        number = self.mention_entries.next_number()
+        lines = [f"## {number}. {url}\n\n", f"**Found at:** {mention['timestamp']}\n\n", "**Mentions:**\n"]
+        for j, match in enumerate(mention['mentions'], 1):
+            lines.append(f"{j}. **Pattern:** `{match['pattern']}`\n")
+            lines.append(f"   **Match:** `{match['match']}`\n")
+            lines.append(f"   **Context:** {match['context']}\n\n")
+        lines.append("---\n\n")
+        self.stats.add_mentions(url, mention['mentions'])
+        self.mention_entries.add(''.join(lines))
+        self.mention_links.add(f"{number}. [{url}]({url})\n")
+    
     def download_page(self, url):
         """Download a single page"""
         try:
-            self.logger.info(f"Downloading: {url}")
+            self.logger.debug(f"Downloading: {url}")
             
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
             }
             
-            response = requests.get(url, headers=headers, timeout=30)
+            response = self.metrics.fetch(self.session, url, headers=headers, timeout=30)
             response.raise_for_status()
             
             # Parse content
-            soup = BeautifulSoup(response.content, 'html.parser')
-            content = soup.get_text()
+            with self.metrics.stage('parse'):
+                soup = BeautifulSoup(response.content, 'html.parser')
+                content = PageText.from_soup(soup)
+            
+            # Same page under another URL
+            with self.metrics.stage('dedup'):
+                duplicate_of = self.duplicate_index.check(page_blocks(soup), url)
+            if duplicate_of:
+                return self.record_duplicate(url, duplicate_of)
             
             # Check for Dr Tin chatbot mentions
-            has_dr_tin_mention = self.check_dr_tin_mention(content, url)
+            with self.metrics.stage('analysis'):
+                has_dr_tin_mention = self.check_dr_tin_mention(content, url)
             
             # Save the page
             filename = self.sanitize_filename(url)
             file_path = self.pages_dir / filename
             
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(response.text)
-            
-            # If it mentions Dr Tin, also save to special directory
-            if has_dr_tin_mention:
-                dr_tin_file_path = self.dr_tin_pages_dir / filename
-                with open(dr_tin_file_path, 'w', encoding='utf-8') as f:
+            with self.metrics.stage('disk_write'):
+                with open(file_path, 'w', encoding='utf-8') as f:
                     f.write(response.text)
+                
+                # If it mentions Dr Tin, also save to special directory
+                if has_dr_tin_mention:
+                    dr_tin_file_path = self.dr_tin_pages_dir / filename
+                    with open(dr_tin_file_path, 'w', encoding='utf-8') as f:
+                        f.write(response.text)
+            with self.metrics.stage('indexing'):
+                self.page_index.add(url, content.text(), soup.title.get_text().strip() if soup.title else '')
+            if has_dr_tin_mention:
                 self.logger.info(f"Dr Tin mention found in: {url}")
             
             # Extract links
             links = []
-            for link in soup.find_all('a', href=True):
-                href = link['href']
-                full_url = urljoin(url, href)
-                if self.is_valid_url(full_url):
-                    links.append(full_url)
+            with self.metrics.stage('link_extraction'):
+                for link in soup.find_all('a', href=True):
+                    href = link['href']
+                    full_url = urljoin(url, href)
+                    if self.is_valid_url(full_url):
+                        links.append(full_url)
             
             # Store page information
             page_info = {
@@ -199,12 +240,18 @@ class HKOWebCrawler:
             
             self.site_map.append(page_info)
             self.downloaded_files.append(str(file_path))
+            self.metrics.inc('pages', status='success')
+            self.stats.add_page(url, 'success', dr_tin=has_dr_tin_mention)
+            log_event(self.logger, 'page_saved', url=url, status=response.status_code, bytes=len(response.content),
+                      links=len(links), dr_tin=has_dr_tin_mention)
             
             return page_info
             
         except Exception as e:
-            self.logger.error(f"Failed to download {url}: {str(e)}")
+            log_event(self.logger, 'page_failed', logging.ERROR, url=url, error=str(e))
             self.failed_urls.append(url)
+            self.metrics.inc('pages', status='failed')
+            self.stats.add_page(url, 'failed')
             
             page_info = {
                 'url': url,
@@ -215,6 +262,20 @@ class HKOWebCrawler:
             self.site_map.append(page_info)
             return None
     
+    def record_duplicate(self, url, duplicate_of):
+        """Record a page already seen under another URL; it is not analyzed, saved or expanded"""
+        page_info = {
+            'url': url,
+            'status': 'duplicate',
+            'duplicate_of': duplicate_of,
+            'timestamp': datetime.now().isoformat()
+        }
+        self.site_map.append(page_info)
+        self.metrics.inc('pages', status='duplicate')
+        self.stats.add_page(url, 'duplicate')
+        log_event(self.logger, 'page_duplicate', url=url, duplicate_of=duplicate_of)
+        return page_info
+    
     def is_valid_url(self, url):
         """Check if URL is valid for crawling"""
         try:
@@ -235,11 +296,15 @@ class HKOWebCrawler:
         self.logger.info(f"Base URL: {self.base_url}")
         self.logger.info(f"Max pages: {max_pages}")
         self.logger.info(f"Output directory: {self.output_dir}")
+        if self.metrics_port:
+            self.logger.info(f"Metrics: {self.metrics.serve(self.metrics_port)}")
+        metrics_file = self.reports_dir / "crawl_metrics.json"
         
         urls_to_visit = [self.base_url]
         pages_crawled = 0
         
         while urls_to_visit and pages_crawled < max_pages:
+            self.metrics.set_gauge('queue_depth', len(urls_to_visit))
             current_url = urls_to_visit.pop(0)
             
             # Normalize URL
@@ -262,16 +327,29 @@ class HKOWebCrawler:
                         self.all_discovered_urls.add(normalized_link)
             
             pages_crawled += 1
+            self.metrics.set_gauge('pages_crawled', pages_crawled)
             
             # Progress update
             if pages_crawled % 10 == 0:
-                self.logger.info(f"Progress: {pages_crawled} pages crawled, {len(self.dr_tin_mentions)} Dr Tin mentions found")
+                log_progress(self.logger, f"Progress: {pages_crawled} pages crawled, {len(self.dr_tin_mentions)} Dr Tin mentions found")
+                self.metrics.write_snapshot(metrics_file)
+            
+            # Keep the Markdown reports current during long crawls
+            if pages_crawled % REPORT_EVERY == 0:
+                with self.metrics.stage('reports'):
+                    self.write_markdown_reports()
             
             # Delay between requests
-            time.sleep(delay)
+            with self.metrics.stage('sleep'):
+                time.sleep(delay)
         
         # Generate reports
-        self.generate_reports()
+        with self.metrics.stage('reports'):
+            self.generate_reports()
+        self.page_index.close()
+        self.metrics.set_gauge('queue_depth', len(urls_to_visit))
+        self.metrics.write_snapshot(metrics_file)
+        self.metrics.shutdown()
         
         self.logger.info("=" * 60)
         self.logger.info("HKO CRAWL COMPLETED")
@@ -279,6 +357,11 @@ class HKOWebCrawler:
         self.logger.info(f"Total pages crawled: {pages_crawled}")
         self.logger.info(f"Dr Tin mentions found: {len(self.dr_tin_mentions)}")
         self.logger.info(f"Failed downloads: {len(self.failed_urls)}")
+        self.logger.info(f"Near-duplicates skipped: {self.duplicate_index.duplicates}")
+        self.logger.info("Time by stage:")
+        for line in self.metrics.summary_lines():
+            self.logger.info(f"  {line}")
+        self.logger.info(f"Metrics snapshot: {metrics_file}")
     
     def generate_reports(self):
         """Generate comprehensive reports"""
@@ -286,7 +369,7 @@ class HKOWebCrawler:
         sitemap_file = self.reports_dir / "hko_sitemap.csv"
         with open(sitemap_file, 'w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
-            writer.writerow(['URL', 'Filename', 'Status', 'Links Found', 'Has Dr Tin Mention', 'Timestamp'])
+            writer.writerow(['URL', 'Filename', 'Status', 'Links Found', 'Has Dr Tin Mention', 'Timestamp', 'Duplicate Of'])
             for page in self.site_map:
                 writer.writerow([
                     page['url'],
@@ -294,77 +377,90 @@ class HKOWebCrawler:
                     page['status'],
                     page.get('links_found', 0),
                     page.get('has_dr_tin_mention', False),
-                    page.get('timestamp', '')
+                    page.get('timestamp', ''),
+                    page.get('duplicate_of', '')
                 ])
         
-        # Generate Dr Tin mentions report
-        dr_tin_file = self.reports_dir / "dr_tin_mentions_report.md"
-        with open(dr_tin_file, 'w', encoding='utf-8') as f:
-            f.write("# Dr Tin Chatbot Mentions Report\n\n")
-            f.write(f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            f.write(f"**Total mentions found:** {len(self.dr_tin_mentions)}\n\n")
-            
-            for i, mention in enumerate(self.dr_tin_mentions, 1):
-                f.write(f"## {i}. {mention['url']}\n\n")
-                f.write(f"**Found at:** {mention['timestamp']}\n\n")
-                f.write("**Mentions:**\n")
-                for j, match in enumerate(mention['mentions'], 1):
-                    f.write(f"{j}. **Pattern:** `{match['pattern']}`\n")
-                    f.write(f"   **Match:** `{match['match']}`\n")
-                    f.write(f"   **Context:** {match['context']}\n\n")
-                f.write("---\n\n")
-        
-        # Generate comprehensive summary
-        summary_file = self.reports_dir / "hko_crawl_summary.md"
-        with open(summary_file, 'w', encoding='utf-8') as f:
-            f.write("# HKO Web Crawl Summary\n\n")
-            f.write(f"**Crawl Date:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            f.write(f"**Base URL:** {self.base_url}\n\n")
-            
-            f.write("## Summary Statistics\n\n")
-            f.write(f"- **Total Pages Crawled:** {len(self.visited_urls)}\n")
-            f.write(f"- **Successful Downloads:** {len([p for p in self.site_map if p['status'] == 'success'])}\n")
-            f.write(f"- **Failed Downloads:** {len([p for p in self.site_map if p['status'] == 'failed'])}\n")
-            f.write(f"- **Dr Tin Chatbot Mentions Found:** {len(self.dr_tin_mentions)}\n\n")
-            
-            f.write("## Files Generated\n\n")
-            f.write("- `downloaded_pages/` - All downloaded HTML pages\n")
-            f.write("- `dr_tin_mentions/` - Pages containing Dr Tin chatbot mentions\n")
-            f.write("- `reports/hko_sitemap.csv` - Complete sitemap in CSV format\n")
-            f.write("- `reports/dr_tin_mentions_report.md` - Detailed Dr Tin mentions report\n")
-            f.write("- `reports/hko_crawl_summary.md` - This summary\n")
-            f.write("- `hko_crawler.log` - Detailed logs\n")
+        # Typed copy of the sitemap for fast loading in pandas
+        write_records(self.site_map, self.reports_dir / "hko_sitemap.parquet", [
+            ('url', 'string'), ('filename', 'string'), ('status', 'category'),
+            ('links_found', 'int'), ('has_dr_tin_mention', 'bool'), ('timestamp', 'timestamp'),
+            ('error', 'string'), ('duplicate_of', 'string')
+        ])
         
-        # Update the main log file
-        self.update_main_log()
+        # Markdown reports from the running aggregates
+        self.write_markdown_reports()
         
         self.logger.info(f"Reports generated in: {self.reports_dir}")
     
+    def write_markdown_reports(self):
+        """Write the Markdown reports from the running aggregates; no pass over site_map"""
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
+        # Dr Tin mentions report
+        write_markdown(self.reports_dir / "dr_tin_mentions_report.md", [
+            "# Dr Tin Chatbot Mentions Report\n\n",
+            f"**Generated:** {now}\n\n",
+            f"**Total mentions found:** {len(self.dr_tin_mentions)}\n\n",
+            self.mention_entries
+        ])
+        
+        # Comprehensive summary
+        summary = [
+            "# HKO Web Crawl Summary\n\n",
+            f"**Crawl Date:** {now}\n\n",
+            f"**Base URL:** {self.base_url}\n\n",
+            "## Summary Statistics\n\n",
+            f"- **Total Pages Crawled:** {len(self.visited_urls)}\n",
+            f"- **Successful Downloads:** {self.stats.status['success']}\n",
+            f"- **Failed Downloads:** {self.stats.status['failed']}\n",
+            f"- **Near-Duplicates Skipped:** {self.stats.status['duplicate']}\n",
+            f"- **Dr Tin Chatbot Mentions Found:** {len(self.dr_tin_mentions)}\n\n"
+        ]
+        if self.stats.snippets:
+            summary += ["## Top Mention Snippets\n\n", *self.stats.snippet_lines(), "\n"]
+        summary += [
+            "## Files Generated\n\n",
+            "- `downloaded_pages/` - All downloaded HTML pages\n",
+            "- `dr_tin_mentions/` - Pages containing Dr Tin chatbot mentions\n",
+            "- `reports/hko_sitemap.csv` - Complete sitemap in CSV format\n",
+            "- `reports/hko_sitemap.parquet` - Typed sitemap for pandas/Arrow\n",
+            "- `reports/dr_tin_mentions_report.md` - Detailed Dr Tin mentions report\n",
+            "- `reports/hko_crawl_summary.md` - This summary\n",
+            "- `reports/crawl_metrics.json` - Per-stage timings and counters\n",
+            "- `page_index.sqlite` - Full-text index (`python ../../crawl_common/page_index.py search <words>`)\n",
+            "- `hko_crawler.log` - Detailed logs\n"
+        ]
+        write_markdown(self.reports_dir / "hko_crawl_summary.md", summary)
+        
+        # Update the main log file
+        self.update_main_log()
+    
     def update_main_log(self):
         """Update the main log file with crawl results"""
         log_file = self.output_dir / "webCrawllog_HKO.md"
         
-        with open(log_file, 'w', encoding='utf-8') as f:
-            f.write("# HKO Web Crawl Log\n\n")
-            f.write(f"**Last Updated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            f.write("## Crawl Summary\n\n")
-            f.write(f"- **Total Pages Crawled:** {len(self.visited_urls)}\n")
-            f.write(f"- **Dr Tin Chatbot Mentions Found:** {len(self.dr_tin_mentions)}\n")
-            f.write(f"- **Failed Downloads:** {len(self.failed_urls)}\n\n")
-            
-            if self.dr_tin_mentions:
-                f.write("## Dr Tin Chatbot Mentions Found\n\n")
-                for i, mention in enumerate(self.dr_tin_mentions, 1):
-                    f.write(f"{i}. [{mention['url']}]({mention['url']})\n")
-            else:
-                f.write("## No Dr Tin Chatbot Mentions Found\n\n")
-                f.write("The crawler did not find any pages mentioning 'Dr Tin chatbot' on the HKO website.\n")
-            
-            f.write(f"\n## Files Generated\n\n")
-            f.write(f"- Downloaded pages: `downloaded_pages/`\n")
-            f.write(f"- Dr Tin mentions: `dr_tin_mentions/`\n")
-            f.write(f"- Reports: `reports/`\n")
-            f.write(f"- Detailed logs: `hko_crawler.log`\n")
+        parts = [
+            "# HKO Web Crawl Log\n\n",
+            f"**Last Updated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n",
+            "## Crawl Summary\n\n",
+            f"- **Total Pages Crawled:** {len(self.visited_urls)}\n",
+            f"- **Dr Tin Chatbot Mentions Found:** {len(self.dr_tin_mentions)}\n",
+            f"- **Failed Downloads:** {len(self.failed_urls)}\n\n"
+        ]
+        if self.mention_links:
+            parts += ["## Dr Tin Chatbot Mentions Found\n\n", self.mention_links]
+        else:
+            parts += ["## No Dr Tin Chatbot Mentions Found\n\n",
+                      "The crawler did not find any pages mentioning 'Dr Tin chatbot' on the HKO website.\n"]
+        parts += [
+            "\n## Files Generated\n\n",
+            "- Downloaded pages: `downloaded_pages/`\n",
+            "- Dr Tin mentions: `dr_tin_mentions/`\n",
+            "- Reports: `reports/`\n",
+            "- Detailed logs: `hko_crawler.log`\n"
+        ]
+        write_markdown(log_file, parts)
 
 def main():
     """Main function to run the HKO crawler"""
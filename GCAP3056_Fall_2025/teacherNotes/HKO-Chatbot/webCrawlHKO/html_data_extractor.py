@@ -2,15 +2,17 @@
 """
 HTML Data Extractor
 Extracts and analyzes data from the data.gov.hk HTML file
+The page is traversed once with the compiled rules in extraction_rules.py;
+each extract_* method then reads its section from those matches.
 """
 
 import json
 import csv
 from datetime import datetime
 from bs4 import BeautifulSoup
-import re
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin
 import logging
+from extraction_rules import DATA_GOV_HK, first, nodes
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -29,6 +31,8 @@ class HTMLDataExtractor:
                 html_content = f.read()
             
             self.soup = BeautifulSoup(html_content, 'html.parser')
+            # One traversal collects every node the extractors need
+            self.matches = DATA_GOV_HK.match(self.soup)
             logger.info("HTML file loaded and parsed successfully")
             return True
         except Exception as e:
@@ -47,27 +51,27 @@ class HTMLDataExtractor:
         }
         
         # Extract title
-        title_tag = self.soup.find('title')
+        title_tag = first(self.matches, 'title')
         if title_tag:
             metadata['title'] = title_tag.get_text().strip()
         
         # Extract description
-        desc_meta = self.soup.find('meta', attrs={'name': 'description'})
+        desc_meta = first(self.matches, 'meta_description')
         if desc_meta:
             metadata['description'] = desc_meta.get('content', '').strip()
         
         # Extract language
-        html_tag = self.soup.find('html')
+        html_tag = first(self.matches, 'html')
         if html_tag:
             metadata['language'] = html_tag.get('lang', '')
         
         # Extract charset
-        charset_meta = self.soup.find('meta', attrs={'charset': True})
+        charset_meta = first(self.matches, 'meta_charset')
         if charset_meta:
             metadata['charset'] = charset_meta.get('charset', '')
         
         # Extract viewport
-        viewport_meta = self.soup.find('meta', attrs={'name': 'viewport'})
+        viewport_meta = first(self.matches, 'meta_viewport')
         if viewport_meta:
             metadata['viewport'] = viewport_meta.get('content', '')
         
@@ -85,9 +89,9 @@ class HTMLDataExtractor:
         }
         
         # Extract main menu links
-        main_menu = self.soup.find('nav', class_='menu')
+        main_menu = first(self.matches, 'main_menu')
         if main_menu:
-            menu_items = main_menu.find_all('a', class_='menu__link')
+            menu_items = nodes(self.matches, 'main_menu_link', main_menu)
             for item in menu_items:
                 link_data = {
                     'text': item.get_text().strip(),
@@ -97,7 +101,7 @@ class HTMLDataExtractor:
                 nav_links['main_menu'].append(link_data)
         
         # Extract category links
-        category_links = self.soup.find_all('a', href=re.compile(r'/en-datasets/category/'))
+        category_links = nodes(self.matches, 'category_link')
         for link in category_links:
             link_data = {
                 'text': link.get_text().strip(),
@@ -107,7 +111,7 @@ class HTMLDataExtractor:
             nav_links['category_links'].append(link_data)
         
         # Extract provider links
-        provider_links = self.soup.find_all('a', href=re.compile(r'/en/providers'))
+        provider_links = nodes(self.matches, 'provider_link')
         for link in provider_links:
             link_data = {
                 'text': link.get_text().strip(),
@@ -129,7 +133,7 @@ class HTMLDataExtractor:
         }
         
         # Extract search form
-        search_form = self.soup.find('form', id='form-dataset-search')
+        search_form = first(self.matches, 'dataset_search_form')
         if search_form:
             search_info['search_form'] = {
                 'id': search_form.get('id', ''),
@@ -138,7 +142,7 @@ class HTMLDataExtractor:
             }
         
         # Extract filter options
-        filter_selects = self.soup.find_all('select', class_='dataset-search__select')
+        filter_selects = nodes(self.matches, 'filter_select')
         for select in filter_selects:
             select_id = select.get('id', '')
             select_name = select.get('name', '')
@@ -152,7 +156,7 @@ class HTMLDataExtractor:
                 }
                 
                 # Extract options
-                options = select.find_all('option')
+                options = nodes(self.matches, 'filter_option', select)
                 for option in options:
                     option_data = {
                         'value': option.get('value', ''),
@@ -162,9 +166,9 @@ class HTMLDataExtractor:
                     search_info['filters'][select_id]['options'].append(option_data)
         
         # Extract sorting options
-        sort_select = self.soup.find('select', id='dataset-search-sort')
+        sort_select = first(self.matches, 'sort_select')
         if sort_select:
-            sort_options = sort_select.find_all('option')
+            sort_options = nodes(self.matches, 'sort_option', sort_select)
             for option in sort_options:
                 sort_data = {
                     'value': option.get('value', ''),
@@ -174,7 +178,7 @@ class HTMLDataExtractor:
                 search_info['sorting_options'].append(sort_data)
         
         # Extract API endpoints
-        api_links = self.soup.find_all('a', href=re.compile(r'/api/'))
+        api_links = nodes(self.matches, 'api_link')
         for link in api_links:
             api_data = {
                 'text': link.get_text().strip(),
@@ -197,7 +201,7 @@ class HTMLDataExtractor:
         }
         
         # Extract total results
-        total_span = self.soup.find('span', class_='dataset-listing__total-num')
+        total_span = first(self.matches, 'total_num')
         if total_span:
             try:
                 listing_info['total_results'] = int(total_span.get_text().strip())
@@ -205,14 +209,14 @@ class HTMLDataExtractor:
                 listing_info['total_results'] = 0
         
         # Extract API endpoint
-        dataset_listing = self.soup.find('div', id='dataset-listing')
+        dataset_listing = first(self.matches, 'dataset_listing')
         if dataset_listing:
             data_url = dataset_listing.get('data-url', '')
             if data_url:
                 listing_info['api_endpoint'] = urljoin(self.base_url, data_url)
         
         # Extract templates
-        templates = self.soup.find_all('template')
+        templates = nodes(self.matches, 'template')
         for template in templates:
             template_id = template.get('id', '')
             if template_id:
@@ -222,14 +226,15 @@ class HTMLDataExtractor:
                 })
         
         # Extract pagination info
-        pagination = self.soup.find('div', class_='dataset-listing__pagination')
+        pagination = first(self.matches, 'pagination')
         if pagination:
-            range_span = pagination.find('span', class_='dataset-listing__range')
-            if range_span:
-                listing_info['pagination']['current_range'] = range_span.get_text().strip()
+            range_spans = nodes(self.matches, 'pagination_range', pagination)
+            if range_spans:
+                listing_info['pagination']['current_range'] = range_spans[0].get_text().strip()
             
-            total_span = pagination.find('span', class_='dataset-listing__total-num')
-            if total_span:
+            total_spans = nodes(self.matches, 'pagination_total', pagination)
+            if total_spans:
+                total_span = total_spans[0]
                 listing_info['pagination']['total'] = total_span.get_text().strip()
         
         self.extracted_data['dataset_listing'] = listing_info
@@ -244,17 +249,17 @@ class HTMLDataExtractor:
         }
         
         # Extract RSS URL
-        rss_link = self.soup.find('a', href=re.compile(r'data_rss_en\.xml'))
+        rss_link = first(self.matches, 'rss_link')
         if rss_link:
             rss_info['rss_url'] = rss_link.get('href', '')
         
         # Extract RSS description
-        rss_desc = self.soup.find('p', string=re.compile(r'This daily updated RSS feed'))
+        rss_desc = first(self.matches, 'rss_description')
         if rss_desc:
             rss_info['description'] = rss_desc.get_text().strip()
         
         # Extract RSS about section
-        rss_about = self.soup.find('p', string=re.compile(r'Really Simple Syndication'))
+        rss_about = first(self.matches, 'rss_about')
         if rss_about:
             rss_info['about'] = rss_about.get_text().strip()
         
@@ -271,22 +276,22 @@ class HTMLDataExtractor:
         }
         
         # Extract email
-        email_link = self.soup.find('a', href=re.compile(r'mailto:'))
+        email_link = first(self.matches, 'mailto_link')
         if email_link:
             contact_info['email'] = email_link.get('href', '').replace('mailto:', '')
         
         # Extract phone
-        phone_span = self.soup.find('span', string=re.compile(r'183 5500'))
+        phone_span = first(self.matches, 'hotline')
         if phone_span:
             contact_info['phone'] = phone_span.get_text().strip()
         
         # Extract organization
-        org_span = self.soup.find('p', string=re.compile(r'Developed and Supported by'))
+        org_span = first(self.matches, 'organization')
         if org_span:
             contact_info['organization'] = org_span.get_text().strip()
         
         # Extract footer links
-        footer_links = self.soup.find('div', class_='foot-row').find_all('a')
+        footer_links = nodes(self.matches, 'footer_link', first(self.matches, 'footer_row'))
         for link in footer_links:
             link_data = {
                 'text': link.get_text().strip(),
@@ -75,14 +75,16 @@ class NASAExplorer:
         for link in soup.find_all('a', href=True):
             href = link['href']
             full_url = urljoin(base_url, href)
-            parsed_url = urlparse(full_url)
             
-            # Only follow links within the same domain
-            if parsed_url.netloc == self.domain:
+            if self.is_valid_url(full_url):
                 links.append(full_url)
         
         return links
 
+    def is_valid_url(self, url):
+        # Only follow links within the same domain
+        return urlparse(url).netloc == self.domain
+
     def analyze_content(self, url, content):
         if not content:
             return None
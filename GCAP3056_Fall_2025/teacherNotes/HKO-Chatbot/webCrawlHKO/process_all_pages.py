@@ -1,23 +1,37 @@
 #!/usr/bin/env python3
 """
-Process all 5 HTML pages from data.gov.hk and generate a comprehensive CSV report
+Process saved HTML pages from data.gov.hk and generate a comprehensive CSV report
 listing all available data items, navigation links, API endpoints, and metadata.
+Any directory tree of saved pages can be processed; files are extracted in
+parallel by a process pool and the results are streamed to a fixed-schema
+CSV or JSONL report. Each page is traversed once with the shared rules in
+extraction_rules.py and the extractors read their sections from the matches.
 """
 
 import os
-import re
 import json
 import csv
+import argparse
+from collections import Counter
 from datetime import datetime
+from multiprocessing import Pool
+from pathlib import Path
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin
+import sys
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'crawl_common'))
+from columnar_export import ColumnarWriter, write_records
+from extraction_rules import DATA_GOV_HK, first, nodes
 
-def extract_navigation_links(soup):
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def extract_navigation_links(soup, matches=None):
     """Extract navigation links and categories from the HTML"""
+    matches = matches or DATA_GOV_HK.match(soup)
     navigation_data = []
     
     # Extract main navigation menu items
-    menu_items = soup.find_all('a', class_='menu__link')
+    menu_items = nodes(matches, 'menu_link')
     for item in menu_items:
         href = item.get('href', '')
         text = item.get_text(strip=True)
@@ -30,7 +44,7 @@ def extract_navigation_links(soup):
             })
     
     # Extract category links
-    category_links = soup.find_all('a', href=re.compile(r'/en-datasets/category/'))
+    category_links = nodes(matches, 'category_link')
     for link in category_links:
         href = link.get('href', '')
         text = link.get_text(strip=True)
@@ -44,12 +58,13 @@ def extract_navigation_links(soup):
     
     return navigation_data
 
-def extract_api_endpoints(soup):
+def extract_api_endpoints(soup, matches=None):
     """Extract API endpoints and JSON data sources from the HTML"""
+    matches = matches or DATA_GOV_HK.match(soup)
     api_data = []
     
     # Look for data-url attributes in select elements
-    select_elements = soup.find_all('select', {'data-url': True})
+    select_elements = nodes(matches, 'data_url_select')
     for select in select_elements:
         data_url = select.get('data-url', '')
         if data_url:
@@ -61,8 +76,8 @@ def extract_api_endpoints(soup):
             })
     
     # Look for dataset listing API
-    dataset_listing = soup.find('div', {'data-url': True, 'id': 'dataset-listing'})
-    if dataset_listing:
+    dataset_listing = first(matches, 'dataset_listing')
+    if dataset_listing and dataset_listing.has_attr('data-url'):
         api_url = dataset_listing.get('data-url', '')
         if api_url:
             api_data.append({
@@ -73,7 +88,7 @@ def extract_api_endpoints(soup):
             })
     
     # Look for RSS feed
-    rss_links = soup.find_all('a', href=re.compile(r'\.xml$'))
+    rss_links = nodes(matches, 'xml_link')
     for link in rss_links:
         href = link.get('href', '')
         if 'rss' in href.lower() or 'feed' in href.lower():
@@ -86,15 +101,16 @@ def extract_api_endpoints(soup):
     
     return api_data
 
-def extract_search_functionality(soup):
+def extract_search_functionality(soup, matches=None):
     """Extract search functionality details"""
+    matches = matches or DATA_GOV_HK.match(soup)
     search_data = []
     
     # Extract search form elements
-    search_forms = soup.find_all('form', class_=re.compile(r'search'))
+    search_forms = nodes(matches, 'search_form')
     for form in search_forms:
         form_id = form.get('id', 'unknown')
-        search_inputs = form.find_all('input', {'type': 'search'})
+        search_inputs = nodes(matches, 'search_input', form)
         for input_elem in search_inputs:
             placeholder = input_elem.get('placeholder', '')
             input_id = input_elem.get('id', '')
@@ -107,7 +123,7 @@ def extract_search_functionality(soup):
             })
     
     # Extract filter options
-    filter_selects = soup.find_all('select', {'name': re.compile(r'\[\]$')})
+    filter_selects = nodes(matches, 'array_select')
     for select in filter_selects:
         name = select.get('name', '')
         select_id = select.get('id', '')
@@ -122,12 +138,13 @@ def extract_search_functionality(soup):
     
     return search_data
 
-def extract_metadata(soup):
+def extract_metadata(soup, matches=None):
     """Extract page metadata"""
+    matches = matches or DATA_GOV_HK.match(soup)
     metadata = []
     
     # Extract title
-    title = soup.find('title')
+    title = first(matches, 'title')
     if title:
         metadata.append({
             'type': 'page_title',
@@ -136,7 +153,7 @@ def extract_metadata(soup):
         })
     
     # Extract meta description
-    meta_desc = soup.find('meta', {'name': 'description'})
+    meta_desc = first(matches, 'meta_description')
     if meta_desc:
         metadata.append({
             'type': 'meta_description',
@@ -145,7 +162,7 @@ def extract_metadata(soup):
         })
     
     # Extract breadcrumb
-    breadcrumbs = soup.find_all('a', class_='breadcrumb__link')
+    breadcrumbs = nodes(matches, 'breadcrumb_link')
     for i, breadcrumb in enumerate(breadcrumbs):
         metadata.append({
             'type': 'breadcrumb',
@@ -154,7 +171,7 @@ def extract_metadata(soup):
         })
     
     # Extract page heading
-    page_title = soup.find('h1', class_='page-title')
+    page_title = first(matches, 'page_heading')
     if page_title:
         metadata.append({
             'type': 'page_heading',
@@ -164,12 +181,13 @@ def extract_metadata(soup):
     
     return metadata
 
-def extract_contact_info(soup):
+def extract_contact_info(soup, matches=None):
     """Extract contact information"""
+    matches = matches or DATA_GOV_HK.match(soup)
     contact_data = []
     
     # Extract email addresses
-    email_links = soup.find_all('a', href=re.compile(r'^mailto:'))
+    email_links = [link for link in nodes(matches, 'mailto_link') if link['href'].startswith('mailto:')]
     for link in email_links:
         email = link.get('href', '').replace('mailto:', '')
         contact_data.append({
@@ -179,7 +197,7 @@ def extract_contact_info(soup):
         })
     
     # Extract phone numbers
-    phone_elements = soup.find_all(text=re.compile(r'\d{3}\s?\d{4}'))
+    phone_elements = nodes(matches, 'phone_text')
     for phone in phone_elements:
         contact_data.append({
             'type': 'phone',
@@ -189,22 +207,23 @@ def extract_contact_info(soup):
     
     return contact_data
 
-def process_html_file(file_path):
+def process_html_file(file_path, root_dir=None):
     """Process a single HTML file and extract all data"""
     print(f"Processing {file_path}...")
     
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
             content = f.read()
         
         soup = BeautifulSoup(content, 'html.parser')
+        matches = DATA_GOV_HK.match(soup)
         
         # Extract all types of data
-        navigation_links = extract_navigation_links(soup)
-        api_endpoints = extract_api_endpoints(soup)
-        search_functionality = extract_search_functionality(soup)
-        metadata = extract_metadata(soup)
-        contact_info = extract_contact_info(soup)
+        navigation_links = extract_navigation_links(soup, matches)
+        api_endpoints = extract_api_endpoints(soup, matches)
+        search_functionality = extract_search_functionality(soup, matches)
+        metadata = extract_metadata(soup, matches)
+        contact_info = extract_contact_info(soup, matches)
         
         # Combine all data
         all_data = []
@@ -214,8 +233,9 @@ def process_html_file(file_path):
         all_data.extend(metadata)
         all_data.extend(contact_info)
         
-        # Add page identifier to each item
-        page_name = os.path.basename(file_path)
+        # Add page identifier to each item; relative to the corpus root so
+        # pages with the same name in different folders stay distinct
+        page_name = os.path.relpath(file_path, root_dir) if root_dir else os.path.basename(file_path)
         for item in all_data:
             item['source_page'] = page_name
         
@@ -225,81 +245,146 @@ def process_html_file(file_path):
         print(f"Error processing {file_path}: {e}")
         return []
 
+def process_html_job(job):
+    """Pool entry point: process one (file_path, root_dir) job"""
+    return process_html_file(*job)
+
+def find_html_files(root_dir, patterns=('*.html', '*.htm')):
+    """Find saved pages anywhere under a directory tree, in a stable order"""
+    root = Path(root_dir)
+    files = set()
+    for pattern in patterns:
+        files.update(root.rglob(pattern))
+    return sorted(str(path) for path in files if path.is_file())
+
+# Every field the extractors can emit, with its column type
+EXTRACTION_COLUMNS = [
+    ('type', 'category'), ('source_page', 'category'), ('text', 'string'),
+    ('url', 'string'), ('full_url', 'string'), ('value', 'string'),
+    ('description', 'string'), ('form_id', 'category'), ('input_id', 'category'),
+    ('placeholder', 'string'), ('name', 'category'), ('select_id', 'category'),
+    ('data_url', 'string')
+]
+
+# Fixed CSV/JSONL column order, so rows can be written as soon as they arrive
+EXTRACTION_FIELDS = sorted(name for name, _ in EXTRACTION_COLUMNS)
+
+class ReportWriter:
+    """Stream extracted items into a fixed-schema CSV or JSONL report"""
+
+    def __init__(self, output_file, fields=EXTRACTION_FIELDS):
+        self.output_file = output_file
+        self.fields = fields
+        self.jsonl = output_file.endswith('.jsonl')
+        self.file = open(output_file, 'w', newline='', encoding='utf-8')
+        self.items_written = 0
+        if not self.jsonl:
+            self.writer = csv.DictWriter(self.file, fieldnames=fields, extrasaction='ignore')
+            self.writer.writeheader()
+
+    def write_items(self, items):
+        """Write a batch of extracted items"""
+        for item in items:
+            if self.jsonl:
+                record = {field: item.get(field, '') for field in self.fields}
+                self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            else:
+                self.writer.writerow(item)
+        self.items_written += len(items)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def generate_columnar_report(all_data, output_file):
+    """Generate a typed Parquet report from all extracted data"""
+    write_records(all_data, output_file, EXTRACTION_COLUMNS)
+    print(f"Parquet report generated: {output_file}")
+
 def generate_csv_report(all_data, output_file):
     """Generate CSV report from all extracted data"""
     if not all_data:
         print("No data to write to CSV")
         return
     
-    # Get all unique field names
-    fieldnames = set()
-    for item in all_data:
-        fieldnames.update(item.keys())
-    fieldnames = sorted(list(fieldnames))
-    
-    # Write CSV file
-    with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(all_data)
+    with ReportWriter(output_file) as writer:
+        writer.write_items(all_data)
     
     print(f"CSV report generated: {output_file}")
     print(f"Total items extracted: {len(all_data)}")
 
+def extract_corpus(html_files, root_dir, output_file, workers=None, columnar_file=None):
+    """Extract every file across a process pool, streaming items to the report.
+
+    Items are written in file order as soon as each file's turn comes up;
+    returns (type_counts, page_counts).
+    """
+    type_counts = Counter()
+    page_counts = Counter()
+    workers = workers or os.cpu_count() or 1
+    columnar = ColumnarWriter(columnar_file, EXTRACTION_COLUMNS) if columnar_file else None
+    
+    try:
+        with ReportWriter(output_file) as writer, Pool(workers) as pool:
+            jobs = [(file_path, root_dir) for file_path in html_files]
+            for items in pool.imap(process_html_job, jobs, chunksize=4):
+                writer.write_items(items)
+                if columnar:
+                    columnar.write_many(items)
+                for item in items:
+                    type_counts[item.get('type', 'unknown')] += 1
+                    page_counts[item.get('source_page', 'unknown')] += 1
+    finally:
+        if columnar:
+            columnar.close()
+    
+    return type_counts, page_counts
+
 def main():
     """Main function to process all HTML pages and generate report"""
+    parser = argparse.ArgumentParser(description="Extract data items from a tree of saved data.gov.hk pages")
+    parser.add_argument('root', nargs='?', default=os.path.join(BASE_DIR, 'data.gov.hk'),
+                        help="Directory searched recursively for .html/.htm files")
+    parser.add_argument('--output', help="Report file, .csv or .jsonl (default: timestamped CSV next to this script)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes (default: all cores)")
+    parser.add_argument('--no-parquet', action='store_true', help="Skip the typed Parquet copy")
+    args = parser.parse_args()
+
     print("=== Processing All HTML Pages from data.gov.hk ===")
     
-    # Define the directory containing HTML files
-    html_dir = "/Users/simonwang/Documents/Usage/GCAP3056/gcap3056/GCAP3056_Fall_2025/HKO-Chatbot/webCrawlHKO/data.gov.hk"
-    
     # Get all HTML files
-    html_files = []
-    for i in range(1, 6):  # pages 1-5
-        file_path = os.path.join(html_dir, f"page{i}.html")
-        if os.path.exists(file_path):
-            html_files.append(file_path)
-    
+    html_files = find_html_files(args.root)
     print(f"Found {len(html_files)} HTML files to process")
     
-    # Process all files
-    all_extracted_data = []
-    for file_path in html_files:
-        data = process_html_file(file_path)
-        all_extracted_data.extend(data)
-    
     # Generate timestamp for output file
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_file = f"/Users/simonwang/Documents/Usage/GCAP3056/gcap3056/GCAP3056_Fall_2025/HKO-Chatbot/webCrawlHKO/data_gov_hk_comprehensive_report_{timestamp}.csv"
+    output_file = args.output or os.path.join(BASE_DIR, f"data_gov_hk_comprehensive_report_{timestamp}.csv")
+    columnar_file = None if args.no_parquet else os.path.splitext(output_file)[0] + '.parquet'
     
-    # Generate CSV report
-    generate_csv_report(all_extracted_data, output_file)
+    # Process all files, streaming the report plus the typed columnar copy
+    type_counts, page_counts = extract_corpus(html_files, args.root, output_file,
+                                              workers=args.workers, columnar_file=columnar_file)
     
     # Print summary statistics
     print("\n=== EXTRACTION SUMMARY ===")
-    print(f"Total items extracted: {len(all_extracted_data)}")
-    
-    # Count by type
-    type_counts = {}
-    for item in all_extracted_data:
-        item_type = item.get('type', 'unknown')
-        type_counts[item_type] = type_counts.get(item_type, 0) + 1
+    print(f"Total items extracted: {sum(type_counts.values())}")
     
     print("\nItems by type:")
     for item_type, count in sorted(type_counts.items()):
         print(f"  {item_type}: {count}")
     
-    # Count by source page
-    page_counts = {}
-    for item in all_extracted_data:
-        page = item.get('source_page', 'unknown')
-        page_counts[page] = page_counts.get(page, 0) + 1
-    
     print("\nItems by source page:")
     for page, count in sorted(page_counts.items()):
         print(f"  {page}: {count}")
     
     print(f"\nDetailed report saved to: {output_file}")
+    if columnar_file:
+        print(f"Parquet report saved to: {columnar_file}")
 
 if __name__ == "__main__":
     main()
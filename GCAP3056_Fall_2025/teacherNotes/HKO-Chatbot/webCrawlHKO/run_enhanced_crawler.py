@@ -6,24 +6,114 @@ Runs the advanced crawler with content analysis for Dr Tin chatbot mentions
 
 import sys
 import os
+import argparse
+import multiprocessing
+import socket
 from pathlib import Path
 
 # Add the current directory to Python path
 sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'crawl_common'))
 
 from enhanced_hko_crawler import EnhancedHKOWebCrawler
+from crawl_profiler import add_profile_arguments, run_profiled
+from crawl_frontier import PATIENCE
+from shared_frontier import HOST_SLOTS, open_frontier
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--max-pages', type=int, default=500)
+    parser.add_argument('--delay', type=float, default=1, help="Seconds between requests")
+    parser.add_argument('--metrics-port', type=int,
+                        help="Serve OpenMetrics on this local port (e.g. 9108); with --workers, "
+                             "worker N serves on this port + N - 1")
+    parser.add_argument('--focused', action='store_true',
+                        help="Crawl the links most likely to lead to Dr Tin / chatbot pages first and stop early")
+    parser.add_argument('--patience', type=int, default=PATIENCE,
+                        help="With --focused, pages without a new Dr Tin mention before the crawl may stop")
+    parser.add_argument('--output-dir', help="Where pages and reports go (default: the crawler's own)")
+    parser.add_argument('--base-url', help="Page the crawl starts from (default: the HKO English home page)")
+    parser.add_argument('--frontier',
+                        help="Share the crawl with other workers through this frontier: a SQLite file, "
+                             "or redis://host:6379/0 for workers on several machines")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes to start on this machine, sharing one frontier "
+                             "(default file: frontier.sqlite in the output directory)")
+    parser.add_argument('--host-slots', type=int, default=HOST_SLOTS,
+                        help="With a shared frontier, requests to one host in flight at once")
+    add_profile_arguments(parser)
+    return parser.parse_args()
+
+def crawler_options(args):
+    """EnhancedHKOWebCrawler keyword arguments for the options given on the command line"""
+    options = {}
+    if args.base_url:
+        options['base_url'] = args.base_url
+    if args.output_dir:
+        options['output_dir'] = args.output_dir
+    return options
+
+def run_worker(args, worker, max_pages, output_dir, metrics_port=None):
+    """One worker of a shared-frontier crawl, writing to its own output directory"""
+    frontier = open_frontier(args.frontier, delay=args.delay, host_slots=args.host_slots)
+    crawler = EnhancedHKOWebCrawler(**{**crawler_options(args), 'output_dir': Path(output_dir) / 'workers' / worker},
+                                    metrics_port=metrics_port)
+    try:
+        crawler.crawl_shared(frontier, worker, max_pages=max_pages, focused=args.focused)
+    finally:
+        frontier.close()
+
+def run_shared(args):
+    """Run --workers processes against the shared frontier and report its totals"""
+    output_dir = Path(args.output_dir) if args.output_dir else Path(__file__).parent
+    args.frontier = args.frontier or str(output_dir / 'frontier.sqlite')
+    name = f"{socket.gethostname()}-{os.getpid()}"
+    print(f"Shared frontier: {args.frontier}")
+    print(f"Workers on this machine: {args.workers} (output in {output_dir / 'workers'})")
+    
+    try:
+        if args.workers == 1:
+            run_profiled(args, lambda: run_worker(args, name, args.max_pages, output_dir, args.metrics_port),
+                         output_dir)
+        else:
+            pages_each = -(-args.max_pages // args.workers)
+            if args.metrics_port:
+                print(f"Metrics: ports {args.metrics_port}-{args.metrics_port + args.workers - 1}, one per worker")
+            workers = [multiprocessing.Process(target=run_worker,
+                                               args=(args, f"{name}-{i}", pages_each, output_dir,
+                                                     args.metrics_port and args.metrics_port + i - 1))
+                       for i in range(1, args.workers + 1)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+    except KeyboardInterrupt:
+        print("\nCrawling interrupted by user.")
+        print("Claimed pages go back on the queue when their lease runs out; run again to continue.")
+    
+    frontier = open_frontier(args.frontier)
+    counts = frontier.counts()
+    frontier.close()
+    print(f"\nFrontier: {counts['done']} pages done, {counts['queued']} queued, {counts['leased']} in progress, "
+          f"{counts['failed']} failed")
+    return 0
 
 def main():
+    args = parse_args()
     print("Starting Enhanced HKO Web Crawler...")
     print("Performing advanced content analysis for Dr Tin chatbot mentions")
     print("=" * 60)
     
+    if args.frontier or args.workers > 1:
+        return run_shared(args)
+    
     # Initialize enhanced crawler
-    crawler = EnhancedHKOWebCrawler()
+    crawler = EnhancedHKOWebCrawler(metrics_port=args.metrics_port, **crawler_options(args))
     
     # Run the enhanced crawler
     try:
-        crawler.crawl(max_pages=500, delay=1)
+        run_profiled(args, lambda: crawler.crawl(max_pages=args.max_pages, delay=args.delay,
+                                                  focused=args.focused, patience=args.patience), crawler.output_dir)
         print("\nEnhanced crawling completed successfully!")
         print(f"Check the output directory for downloaded files:")
         print(f"  {crawler.output_dir}")
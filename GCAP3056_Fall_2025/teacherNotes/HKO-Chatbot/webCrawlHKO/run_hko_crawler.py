@@ -6,24 +6,36 @@ Searches for 'Dr Tin chatbot' mentions on the HKO website
 
 import sys
 import os
+import argparse
 from pathlib import Path
 
 # Add the current directory to Python path
 sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'crawl_common'))
 
 from hko_web_crawler import HKOWebCrawler
+from crawl_profiler import add_profile_arguments, run_profiled
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--max-pages', type=int, default=500)
+    parser.add_argument('--delay', type=float, default=1, help="Seconds between requests")
+    parser.add_argument('--metrics-port', type=int, help="Serve OpenMetrics on this local port (e.g. 9108)")
+    add_profile_arguments(parser)
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
     print("Starting HKO Web Crawler...")
     print("Searching for 'Dr Tin chatbot' mentions on HKO website")
     print("=" * 60)
     
     # Initialize crawler
-    crawler = HKOWebCrawler()
+    crawler = HKOWebCrawler(metrics_port=args.metrics_port)
     
     # Run the crawler
     try:
-        crawler.crawl(max_pages=500, delay=1)
+        run_profiled(args, lambda: crawler.crawl(max_pages=args.max_pages, delay=args.delay), crawler.output_dir)
         print("\nCrawling completed successfully!")
         print(f"Check the output directory for downloaded files:")
         print(f"  {crawler.output_dir}")
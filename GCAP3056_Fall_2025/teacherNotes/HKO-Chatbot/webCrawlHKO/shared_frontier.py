@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Shared Frontier
+Crawl frontier and seen-set shared by several crawler processes, on one
+machine or on many, so one crawl can be split across workers. Two backends
+have the same interface: SQLiteFrontier keeps everything in a SQLite file
+(workers on one machine), RedisFrontier in a Redis server or anything that
+speaks its protocol (Valkey, KeyDB, fakeredis), for workers on several
+machines. open_frontier() picks one from a location string.
+
+Work is handed out host by host. A worker can only claim a URL of a host that
+has fewer than host_slots URLs being fetched and was last claimed from at
+least `delay` seconds ago, so each site sees the same politeness however many
+workers there are. A claim is a lease: if the worker does not complete the
+URL within lease_seconds (it crashed or hung), the URL goes back on the queue
+for another worker, up to max_attempts times. Pages are fetched at least
+once and, after a crash, occasionally twice.
+
+Within a host, URLs are claimed highest priority first and first-come first
+among equals, like CrawlFrontier; with every priority at 0 that is
+breadth-first.
+"""
+
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import urlparse
+
+LEASE_SECONDS = 120    # a claimed URL goes back on the queue if not completed in this time
+MAX_ATTEMPTS = 3       # claims of one URL before it is given up as failed
+HOST_SLOTS = 1         # URLs of one host being fetched at once
+POLL_SECONDS = 0.2     # how long a worker waits when no host is ready
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    priority REAL NOT NULL,
+    state TEXT NOT NULL,        -- queued, leased, done or failed
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS urls_queue ON urls (host, state, priority DESC);
+CREATE INDEX IF NOT EXISTS urls_leases ON urls (state, lease_until);
+CREATE TABLE IF NOT EXISTS hosts (
+    host TEXT PRIMARY KEY,
+    next_claim REAL NOT NULL DEFAULT 0,
+    queued INTEGER NOT NULL DEFAULT 0,
+    leased INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def url_host(url):
+    return urlparse(url).netloc
+
+
+class SQLiteFrontier:
+    """Shared frontier in a SQLite file, for worker processes on one machine.
+
+    Every operation is one IMMEDIATE transaction, so claims from different
+    processes never overlap. SQLite's locking is unreliable on network file
+    systems; use RedisFrontier for workers on several machines.
+    """
+
+    def __init__(self, path, delay=1, host_slots=HOST_SLOTS, lease_seconds=LEASE_SECONDS,
+                 max_attempts=MAX_ATTEMPTS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self.delay = delay
+        self.host_slots = host_slots
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    @contextmanager
+    def transaction(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        self.conn.execute('COMMIT')
+
+    def add(self, links):
+        """Queue (url, priority) pairs not seen before; returns how many were new"""
+        with self.transaction() as conn:
+            return self._add(conn, links)
+
+    def _add(self, conn, links):
+        new = {}
+        for url, priority in links:
+            host = url_host(url)
+            if conn.execute("INSERT OR IGNORE INTO urls (url, host, priority, state) VALUES (?, ?, ?, 'queued')",
+                            (url, host, priority)).rowcount:
+                new[host] = new.get(host, 0) + 1
+            else:
+                conn.execute("UPDATE urls SET priority = ? WHERE url = ? AND state = 'queued' AND priority < ?",
+                             (priority, url, priority))
+        conn.executemany('INSERT INTO hosts (host, queued) VALUES (?, ?) '
+                         'ON CONFLICT (host) DO UPDATE SET queued = queued + excluded.queued', new.items())
+        return sum(new.values())
+
+    def _recover(self, conn, now):
+        """Put URLs whose lease ran out back on the queue, or fail them after max_attempts"""
+        expired = conn.execute("SELECT url, host, attempts FROM urls WHERE state = 'leased' AND lease_until < ?",
+                               (now,)).fetchall()
+        for url, host, attempts in expired:
+            state = 'failed' if attempts + 1 >= self.max_attempts else 'queued'
+            conn.execute('UPDATE urls SET state = ?, worker = NULL, lease_until = NULL, attempts = ? WHERE url = ?',
+                         (state, attempts + 1, url))
+            conn.execute('UPDATE hosts SET leased = leased - 1, queued = queued + ? WHERE host = ?',
+                         (1 if state == 'queued' else 0, host))
+
+    def claim(self, worker):
+        """(url, priority) leased to the worker, or None if no host is ready right now"""
+        now = time.time()
+        with self.transaction() as conn:
+            self._recover(conn, now)
+            row = conn.execute('SELECT host FROM hosts WHERE queued > 0 AND leased < ? AND next_claim <= ? '
+                               'ORDER BY next_claim LIMIT 1', (self.host_slots, now)).fetchone()
+            if row is None:
+                return None
+            host = row[0]
+            url, priority = conn.execute("SELECT url, priority FROM urls WHERE host = ? AND state = 'queued' "
+                                         "ORDER BY priority DESC, rowid LIMIT 1", (host,)).fetchone()
+            conn.execute("UPDATE urls SET state = 'leased', worker = ?, lease_until = ? WHERE url = ?",
+                         (worker, now + self.lease_seconds, url))
+            conn.execute('UPDATE hosts SET queued = queued - 1, leased = leased + 1, next_claim = ? WHERE host = ?',
+                         (now + self.delay, host))
+            return url, priority
+
+    def complete(self, url, worker, links=()):
+        """Mark a claimed URL done and queue the links found on it.
+
+        Returns False if the lease had already run out and the URL went back
+        on the queue; the links are queued all the same.
+        """
+        with self.transaction() as conn:
+            held = conn.execute("UPDATE urls SET state = 'done', lease_until = NULL "
+                                "WHERE url = ? AND state = 'leased' AND worker = ?", (url, worker)).rowcount
+            if held:
+                conn.execute('UPDATE hosts SET leased = leased - 1 WHERE host = ?', (url_host(url),))
+            self._add(conn, links)
+        return bool(held)
+
+    def pending(self):
+        """URLs queued or being fetched by some worker"""
+        return self.conn.execute('SELECT COALESCE(SUM(queued + leased), 0) FROM hosts').fetchone()[0]
+
+    def counts(self):
+        counts = dict.fromkeys(('queued', 'leased', 'done', 'failed'), 0)
+        counts.update(self.conn.execute('SELECT state, COUNT(*) FROM urls GROUP BY state'))
+        counts['seen'] = sum(counts.values())
+        return counts
+
+    def close(self):
+        self.conn.close()
+
+
+class RedisFrontier:
+    """Shared frontier in Redis, for workers on several machines.
+
+    client is a redis.Redis (or compatible) client created with
+    decode_responses=True. Only plain commands are used, no Lua scripts, so
+    stand-ins such as fakeredis work too. Keys start with "<name>:":
+
+        seen            set of every URL ever queued
+        queue:<host>    sorted set of the host's queued URLs, best first
+        ready           sorted set of hosts by the time they may next be claimed
+        polite:<host>   exists for `delay` seconds after a claim from the host
+        inflight        hash of URLs being fetched per host
+        leases          sorted set of claims by lease expiry
+        done, failed    sets of finished URLs
+
+    A URL is pending until it is done or failed, so workers never see an
+    empty frontier while another worker is still queueing links.
+    """
+
+    PRIORITY_STEP = 1000   # priorities are kept to three decimals in the queue score
+    SEQ_RANGE = 2 ** 32    # arrival order within one priority
+
+    def __init__(self, client, name='hko_crawl', delay=1, host_slots=HOST_SLOTS, lease_seconds=LEASE_SECONDS,
+                 max_attempts=MAX_ATTEMPTS):
+        self.client = client
+        self.prefix = f'{name}:'
+        self.delay = delay
+        self.host_slots = host_slots
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.claimed = {}   # url -> lease member, for this worker's open claims
+
+    def key(self, *parts):
+        return self.prefix + ':'.join(parts)
+
+    def score(self, priority, seq):
+        return -round(priority * self.PRIORITY_STEP) * self.SEQ_RANGE + seq
+
+    def priority(self, score):
+        return -(int(score) // self.SEQ_RANGE) / self.PRIORITY_STEP
+
+    def add(self, links):
+        """Queue (url, priority) pairs not seen before; returns how many were new"""
+        links = list(links)
+        if not links:
+            return 0
+        pipe = self.client.pipeline()
+        for url, _ in links:
+            pipe.sadd(self.key('seen'), url)
+        added = pipe.execute()
+        first = self.client.incr(self.key('seq'), len(links)) - len(links)
+
+        now = time.time()
+        pipe = self.client.pipeline()
+        for i, ((url, priority), new) in enumerate(zip(links, added)):
+            host = url_host(url)
+            score = self.score(priority, first + i)
+            if new:
+                pipe.zadd(self.key('queue', host), {url: score})
+                pipe.sadd(self.key('hosts'), host)
+                pipe.zadd(self.key('ready'), {host: now}, nx=True)
+            else:
+                # Raise the priority of a URL that is still queued
+                pipe.zadd(self.key('queue', host), {url: score}, xx=True, lt=True)
+        pipe.execute()
+        return sum(1 for new in added if new)
+
+    def claim(self, worker):
+        """(url, priority) leased to the worker, or None if no host is ready right now"""
+        self.recover()
+        now = time.time()
+        for _ in range(self.host_slots + 8):
+            popped = self.client.zpopmin(self.key('ready'))
+            if not popped:
+                return None
+            host, ready_at = popped[0]
+            if ready_at > now:
+                # The earliest host is not ready yet, so none is
+                self.client.zadd(self.key('ready'), {host: ready_at})
+                return None
+            if self.delay > 0 and not self.client.set(self.key('polite', host), worker, nx=True,
+                                                      px=max(1, int(self.delay * 1000))):
+                wait = max(self.client.pttl(self.key('polite', host)), 0) / 1000
+                self.client.zadd(self.key('ready'), {host: now + wait})
+                continue
+            inflight = self.client.hincrby(self.key('inflight'), host, 1)
+            if inflight > self.host_slots:
+                # Busy; complete() makes it ready again
+                self.client.hincrby(self.key('inflight'), host, -1)
+                continue
+            head = self.client.zrange(self.key('queue', host), 0, 0, withscores=True)
+            if not head:
+                # Drained; add() makes it ready again
+                self.client.hincrby(self.key('inflight'), host, -1)
+                continue
+
+            url, score = head[0]
+            member = json.dumps([url, host, score, worker])
+            pipe = self.client.pipeline()
+            pipe.zadd(self.key('leases'), {member: now + self.lease_seconds})
+            pipe.zrem(self.key('queue', host), url)
+            pipe.zcard(self.key('queue', host))
+            remaining = pipe.execute()[2]
+            if remaining and inflight < self.host_slots:
+                self.client.zadd(self.key('ready'), {host: now + self.delay})
+            self.claimed[url] = member
+            return url, self.priority(score)
+        return None
+
+    def complete(self, url, worker, links=()):
+        """Mark a claimed URL done and queue the links found on it.
+
+        Returns False if the lease had already run out and the URL went back
+        on the queue; the links are queued all the same.
+        """
+        self.add(links)
+        member = self.claimed.pop(url, None)
+        held = bool(member) and self.client.zrem(self.key('leases'), member) == 1
+        if held:
+            host = json.loads(member)[1]
+            pipe = self.client.pipeline()
+            pipe.hincrby(self.key('inflight'), host, -1)
+            pipe.sadd(self.key('done'), url)
+            pipe.zadd(self.key('ready'), {host: time.time()}, nx=True)
+            pipe.execute()
+        return held
+
+    def recover(self):
+        """Requeue expired leases and repair the ready set; runs at most a few times per lease period"""
+        if not self.client.set(self.key('recovering'), 1, nx=True, ex=max(1, int(self.lease_seconds / 4))):
+            return
+        now = time.time()
+        for member in self.client.zrangebyscore(self.key('leases'), '-inf', now):
+            if self.client.zrem(self.key('leases'), member) != 1:
+                continue   # another worker completed or recovered it
+            url, host, score, _ = json.loads(member)
+            self.client.hincrby(self.key('inflight'), host, -1)
+            if self.client.hincrby(self.key('attempts'), url, 1) >= self.max_attempts:
+                self.client.sadd(self.key('failed'), url)
+            else:
+                self.client.zadd(self.key('queue', host), {url: score})
+
+        # A worker that died in the middle of a claim can leave a host out of
+        # the ready set or with a stale in-flight count; rebuild both
+        inflight = {}
+        leased = set()
+        for member in self.client.zrange(self.key('leases'), 0, -1):
+            url, host = json.loads(member)[:2]
+            inflight[host] = inflight.get(host, 0) + 1
+            leased.add(url)
+        queued = 0
+        for host in self.client.smembers(self.key('hosts')):
+            self.client.hset(self.key('inflight'), host, inflight.get(host, 0))
+            waiting = self.client.zcard(self.key('queue', host))
+            queued += waiting
+            if waiting and inflight.get(host, 0) < self.host_slots:
+                self.client.zadd(self.key('ready'), {host: now}, nx=True)
+
+        # One that died inside add() can leave URLs seen but never queued. They
+        # only show once nothing else is left, so look for them then.
+        if not queued and not leased and self.pending():
+            for url in self.client.sscan_iter(self.key('seen')):
+                if not self.client.sismember(self.key('done'), url) and not self.client.sismember(self.key('failed'), url):
+                    host = url_host(url)
+                    self.client.sadd(self.key('hosts'), host)
+                    self.client.zadd(self.key('queue', host), {url: self.score(0.0, 0)}, nx=True)
+                    self.client.zadd(self.key('ready'), {host: now}, nx=True)
+
+    def pending(self):
+        """URLs queued or being fetched by some worker"""
+        pipe = self.client.pipeline()
+        pipe.scard(self.key('seen'))
+        pipe.scard(self.key('done'))
+        pipe.scard(self.key('failed'))
+        seen, done, failed = pipe.execute()
+        return seen - done - failed
+
+    def counts(self):
+        pipe = self.client.pipeline()
+        for key in ('seen', 'done', 'failed'):
+            pipe.scard(self.key(key))
+        pipe.zcard(self.key('leases'))
+        seen, done, failed, leased = pipe.execute()
+        return {'queued': seen - done - failed - leased, 'leased': leased, 'done': done, 'failed': failed,
+                'seen': seen}
+
+    def close(self):
+        self.client.close()
+
+
+def open_frontier(location, **options):
+    """SQLiteFrontier for a file path, RedisFrontier for a redis:// (rediss://, unix://) URL"""
+    if location.split('://', 1)[0] in ('redis', 'rediss', 'unix'):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("A Redis frontier needs the redis package: pip install redis")
+        return RedisFrontier(redis.Redis.from_url(location, decode_responses=True), **options)
+    return SQLiteFrontier(location, **options)
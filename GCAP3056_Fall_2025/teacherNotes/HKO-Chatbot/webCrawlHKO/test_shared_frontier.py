@@ -0,0 +1,132 @@
+"""Tests for shared_frontier.py: python -m pytest test_shared_frontier.py
+
+Both backends go through the same claim / crash / recover / complete cases.
+Time is a fake clock that replaces time.time(), which fakeredis also uses for
+key expiry, so leases and politeness delays run out without sleeping.
+"""
+
+import time
+
+import pytest
+
+from shared_frontier import RedisFrontier, SQLiteFrontier
+
+LEASE = 10
+
+
+class Clock:
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, 'time', clock)
+    return clock
+
+
+@pytest.fixture(params=['sqlite', 'redis'])
+def workers(request, tmp_path):
+    """Factory of frontiers sharing one store, one per simulated worker process"""
+    opened = []
+    if request.param == 'redis':
+        fakeredis = pytest.importorskip('fakeredis')
+        server = fakeredis.FakeServer()
+
+        def open_worker(**options):
+            client = fakeredis.FakeRedis(server=server, decode_responses=True)
+            opened.append(RedisFrontier(client, name='test', lease_seconds=LEASE, **options))
+            return opened[-1]
+    else:
+        def open_worker(**options):
+            opened.append(SQLiteFrontier(tmp_path / 'frontier.sqlite', lease_seconds=LEASE, **options))
+            return opened[-1]
+
+    yield open_worker
+    for frontier in opened:
+        frontier.close()
+
+
+def test_claim_and_complete(clock, workers):
+    a = workers(delay=0)
+    # A URL queued again keeps its highest priority
+    assert a.add([('http://one/', 1.0), ('http://one/', 2.0)]) == 1
+    assert a.claim('a') == ('http://one/', 2.0)
+    assert a.claim('a') is None
+    assert a.complete('http://one/', 'a', [('http://one/next', 0.5), ('http://one/', 0)])
+    assert a.claim('a') == ('http://one/next', 0.5)
+    assert a.complete('http://one/next', 'a')
+    assert a.pending() == 0
+    assert a.counts()['done'] == 2
+
+
+def test_expired_lease_goes_to_another_worker(clock, workers):
+    a, b = workers(delay=0), workers(delay=0)
+    a.add([('http://one/page', 0)])
+    assert a.claim('a') == ('http://one/page', 0)
+
+    # Worker a hangs; the URL is not handed out again until its lease runs out
+    assert b.claim('b') is None
+    clock.advance(LEASE + 1)
+    assert b.claim('b') == ('http://one/page', 0)
+
+    # a's late complete() does not count, b's does
+    assert not a.complete('http://one/page', 'a', [('http://one/link', 0)])
+    assert b.complete('http://one/page', 'b')
+    assert b.counts()['done'] == 1
+    assert b.pending() == 1
+    assert b.claim('b') == ('http://one/link', 0)
+
+
+def test_url_fails_after_max_attempts(clock, workers):
+    a = workers(delay=0, max_attempts=2)
+    a.add([('http://one/crash', 0)])
+    assert a.claim('a') == ('http://one/crash', 0)
+    clock.advance(LEASE + 1)
+    assert a.claim('b') == ('http://one/crash', 0)
+    clock.advance(LEASE + 1)
+    assert a.claim('c') is None
+    assert a.counts()['failed'] == 1
+    assert a.pending() == 0
+
+
+def test_host_is_claimed_at_most_once_per_delay(clock, workers):
+    a, b = workers(delay=5, host_slots=2), workers(delay=5, host_slots=2)
+    a.add([('http://one/1', 0), ('http://one/2', 0), ('http://two/1', 0)])
+    first = a.claim('a')
+    second = b.claim('b')
+    assert {url.split('/')[2] for url, _ in (first, second)} == {'one', 'two'}
+
+    # Both hosts were just claimed from, so nothing is ready
+    assert b.claim('b') is None
+    clock.advance(4)
+    assert b.claim('b') is None
+    clock.advance(1.5)
+    assert b.claim('b') == ('http://one/2', 0)
+
+
+def test_workers_never_exceed_host_slots(clock, workers):
+    a, b, c = workers(delay=0, host_slots=2), workers(delay=0, host_slots=2), workers(delay=0, host_slots=2)
+    a.add([(f'http://one/{i}', 0) for i in range(4)])
+    held = {'a': a.claim('a'), 'b': b.claim('b')}
+    assert None not in held.values()
+    assert len({url for url, _ in held.values()}) == 2
+    assert c.claim('c') is None
+    assert a.claim('a') is None
+
+    assert a.complete(held['a'][0], 'a')
+    held['c'] = c.claim('c')
+    assert held['c'] is not None
+    assert b.claim('b') is None
+
+    assert b.complete(held['b'][0], 'b')
+    assert c.complete(held['c'][0], 'c')
+    assert a.claim('a') is not None
+    assert b.claim('b') is None
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Columnar Export
+Typed Parquet / Arrow IPC output for crawl and dataset reports.
+Keywords and links are stored as real list columns, repeated values such as
+status or category are dictionary-encoded, and timestamps are proper
+timestamp columns, so pandas can load and filter large tables quickly.
+Requires pyarrow (pip install pyarrow); the CSV reports remain available.
+"""
+
+import json
+from datetime import datetime
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Column kinds understood by ColumnarWriter
+COLUMN_TYPES = {
+    'string': pa.string(),
+    'category': pa.dictionary(pa.int32(), pa.string()),
+    'int': pa.int64(),
+    'float': pa.float64(),
+    'bool': pa.bool_(),
+    'timestamp': pa.timestamp('us'),
+    'list': pa.list_(pa.string()),
+    'json': pa.string()
+}
+
+# numpy dtype kind of a column that can be written without conversion
+NUMPY_KINDS = {'int': 'i', 'float': 'f', 'bool': 'b'}
+
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+ARROW_SUFFIXES = ('.arrows', '.arrow')
+
+
+def to_timestamp(value):
+    """Convert ISO strings and datetimes to datetime, or None"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+def to_list(value):
+    """Convert lists, tuples, sets and '; '-joined strings to a list of strings"""
+    if value is None or value == '':
+        return []
+    if isinstance(value, (list, tuple, set)):
+        return [str(item) for item in value]
+    return [item.strip() for item in str(value).split(';') if item.strip()]
+
+
+class ColumnarWriter:
+    """Stream records into a typed Parquet file or Arrow IPC stream in batches"""
+
+    def __init__(self, path, columns, batch_size=50000):
+        # columns: list of (name, kind) pairs, kind being a key of COLUMN_TYPES
+        self.path = Path(path)
+        self.columns = columns
+        self.batch_size = batch_size
+        self.schema = pa.schema([(name, COLUMN_TYPES[kind]) for name, kind in columns])
+        self.buffer = {name: [] for name, _ in columns}
+        self.buffered = 0
+        self.rows_written = 0
+        # Dictionaries grow across batches so every batch shares one encoding
+        self.dictionaries = {name: {} for name, kind in columns if kind == 'category'}
+        self.writer = None
+
+        if self.path.suffix not in PARQUET_SUFFIXES + ARROW_SUFFIXES:
+            raise ValueError(f"Unsupported columnar file type: {self.path.suffix}")
+
+    def open_writer(self):
+        """Open the underlying Parquet or Arrow writer on first flush"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.suffix in PARQUET_SUFFIXES:
+            return pq.ParquetWriter(self.path, self.schema, compression='zstd')
+        options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+        return pa.ipc.new_stream(str(self.path), self.schema, options=options)
+
+    def convert(self, kind, value):
+        """Convert one value to what its column expects"""
+        if isinstance(value, float) and value != value:
+            # NaN, as pandas uses for missing cells
+            value = None
+        if kind == 'list':
+            return to_list(value)
+        if kind == 'timestamp':
+            return to_timestamp(value)
+        if value is None or value == '':
+            return None
+        if kind == 'int':
+            return int(value)
+        if kind == 'float':
+            return float(value)
+        if kind == 'bool':
+            return value if isinstance(value, bool) else str(value).lower() in ('true', '1', 'yes')
+        if kind == 'json':
+            return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+        return str(value)
+
+    def write(self, record):
+        """Add one record (a dict); missing fields become nulls"""
+        for name, kind in self.columns:
+            self.buffer[name].append(self.convert(kind, record.get(name)))
+        self.buffered += 1
+        if self.buffered >= self.batch_size:
+            self.flush()
+
+    def write_many(self, records):
+        """Add several records"""
+        for record in records:
+            self.write(record)
+
+    def write_frame(self, df):
+        """Add every row of a pandas DataFrame, converting column by column"""
+        rows = len(df)
+        for name, kind in self.columns:
+            if name not in df.columns:
+                self.buffer[name].extend([None] * rows)
+            elif kind in NUMPY_KINDS and df[name].dtype.kind == NUMPY_KINDS[kind]:
+                # Already the right type with no missing values: no per-value conversion
+                self.buffer[name].extend(df[name].tolist())
+            else:
+                self.buffer[name].extend(self.convert(kind, value) for value in df[name].tolist())
+        self.buffered += rows
+        if self.buffered >= self.batch_size:
+            self.flush()
+
+    def build_array(self, name, kind, values):
+        """Build the Arrow array for one buffered column"""
+        if kind != 'category':
+            return pa.array(values, type=COLUMN_TYPES[kind])
+
+        dictionary = self.dictionaries[name]
+        indices = []
+        for value in values:
+            if value is None:
+                indices.append(None)
+            else:
+                indices.append(dictionary.setdefault(value, len(dictionary)))
+        return pa.DictionaryArray.from_arrays(
+            pa.array(indices, type=pa.int32()), pa.array(list(dictionary), type=pa.string())
+        )
+
+    def flush(self):
+        """Write the buffered records as one batch"""
+        if not self.buffered:
+            return
+        if self.writer is None:
+            self.writer = self.open_writer()
+
+        arrays = [self.build_array(name, kind, self.buffer[name]) for name, kind in self.columns]
+        self.writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+        self.rows_written += self.buffered
+        self.buffer = {name: [] for name, _ in self.columns}
+        self.buffered = 0
+
+    def close(self):
+        """Flush remaining records and close the file"""
+        self.flush()
+        if self.writer is None:
+            # No records: still write an empty, correctly typed file
+            self.writer = self.open_writer()
+        self.writer.close()
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def write_records(records, path, columns):
+    """Write a list of records to a Parquet or Arrow file in one call"""
+    with ColumnarWriter(path, columns) as writer:
+        writer.write_many(records)
+    return Path(path)
+
+
+def read_table(path, columns=None, filters=None):
+    """Load a Parquet or Arrow file into pandas, reading only what is needed.
+
+    filters uses the pyarrow form, e.g. [('status', '==', 'success')], and is
+    pushed down to the Parquet row groups.
+    """
+    path = Path(path)
+    if path.suffix in PARQUET_SUFFIXES:
+        table = pq.read_table(path, columns=columns, filters=filters)
+    else:
+        with pa.ipc.open_stream(str(path)) as reader:
+            table = reader.read_all()
+        if columns:
+            table = table.select(columns)
+        if filters:
+            table = table.filter(pq.filters_to_expression(filters))
+    return table.to_pandas()
+
+
+def iter_batches(path, batch_size=50000, columns=None):
+    """Yield a Parquet or Arrow file as pandas DataFrames of at most batch_size rows"""
+    path = Path(path)
+    if path.suffix in PARQUET_SUFFIXES:
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns):
+            yield batch.to_pandas()
+        return
+
+    with pa.ipc.open_stream(str(path)) as reader:
+        for batch in reader:
+            if columns:
+                batch = batch.select(columns)
+            for offset in range(0, batch.num_rows, batch_size):
+                yield batch.slice(offset, batch_size).to_pandas()
+
+
+def export_csv_view(path, csv_path):
+    """Write a CSV view of a columnar file; list columns are joined with '; '"""
+    df = read_table(path)
+    for name in df.columns:
+        if df[name].map(lambda value: hasattr(value, '__len__') and not isinstance(value, str)).any():
+            df[name] = df[name].map(lambda value: '; '.join(value) if value is not None else '')
+    df.to_csv(csv_path, index=False)
+    return Path(csv_path)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Crawl Logging
+Non-blocking logging for the crawlers. Log calls only put the record on a
+queue; a background listener thread formats it and writes it to the console,
+the log file (in batches) and optionally a JSON-lines event file. Progress
+lines are rate-limited before they are queued, and log_event() attaches
+structured fields that end up as JSON.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+PROGRESS_INTERVAL = 2.0   # seconds between progress lines from one call site
+FLUSH_INTERVAL = 1.0      # longest time a written line waits in the file buffer
+BATCH_SIZE = 200          # lines written between forced flushes
+BUFFER_BYTES = 1 << 16
+
+# One pipeline per logger name ('' is the root logger)
+_pipelines = {}
+
+
+class BatchingFileHandler(logging.FileHandler):
+    """File handler that writes through a large buffer and flushes in batches"""
+
+    def __init__(self, filename, mode='a', encoding='utf-8', batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = 0
+        self.last_flush = time.monotonic()
+        super().__init__(filename, mode, encoding)
+
+    def _open(self):
+        return open(self.baseFilename, self.mode, encoding=self.encoding, buffering=BUFFER_BYTES)
+
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            self.pending += 1
+            if self.pending >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        super().flush()
+        self.pending = 0
+        self.last_flush = time.monotonic()
+
+
+class BatchingQueueListener(QueueListener):
+    """Queue listener that flushes its handlers whenever the queue goes quiet"""
+
+    def dequeue(self, block):
+        while True:
+            try:
+                return self.queue.get(block, timeout=FLUSH_INTERVAL if block else None)
+            except queue.Empty:
+                if not block:
+                    raise
+                for handler in self.handlers:
+                    handler.flush()
+
+
+class ProgressFilter(logging.Filter):
+    """Let through at most one progress line per call site every `interval` seconds"""
+
+    def __init__(self, interval=PROGRESS_INTERVAL):
+        super().__init__()
+        self.interval = interval
+        self.last_seen = {}
+
+    def filter(self, record):
+        if not getattr(record, 'progress', False):
+            return True
+        site = (record.pathname, record.lineno)
+        now = time.monotonic()
+        if now - self.last_seen.get(site, float('-inf')) < self.interval:
+            return False
+        self.last_seen[site] = now
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the event name and fields of log_event()"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        if getattr(record, 'event', None):
+            entry['event'] = record.event
+            entry.update(getattr(record, 'fields', {}))
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def start_pipeline(logger, handlers, progress_interval):
+    """Attach a queue to the logger and start a listener that feeds the handlers"""
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(ProgressFilter(progress_interval))
+    logger.addHandler(queue_handler)
+    listener = BatchingQueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return {'queue_handler': queue_handler, 'listener': listener, 'handlers': list(handlers),
+            'files': {Path(h.baseFilename) for h in handlers if isinstance(h, logging.FileHandler)}}
+
+
+def setup_crawl_logging(log_file, events_file=None, level=logging.INFO, console=True,
+                        progress_interval=PROGRESS_INTERVAL):
+    """Send all logging through the background pipeline to the console, log_file and events_file.
+
+    Calling it again (e.g. from a helper class with its own log file) adds the
+    new files to the running pipeline instead of configuring logging twice.
+    """
+    root = logging.getLogger()
+    root.setLevel(level)
+    new_handlers = []
+
+    def add_file(path, formatter):
+        if path is None:
+            return
+        path = Path(path)
+        pipeline = _pipelines.get('')
+        if pipeline and path.resolve() in {p.resolve() for p in pipeline['files']}:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handler = BatchingFileHandler(path)
+        handler.setFormatter(formatter)
+        new_handlers.append(handler)
+
+    add_file(log_file, logging.Formatter(LOG_FORMAT))
+    add_file(events_file, JsonFormatter())
+
+    pipeline = _pipelines.get('')
+    if pipeline is None:
+        # Replace whatever basicConfig or an earlier import set up
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+            handler.close()
+        if console:
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            new_handlers.insert(0, console_handler)
+        _pipelines[''] = start_pipeline(root, new_handlers, progress_interval)
+    elif new_handlers:
+        # Restart the listener with the extra handlers; queued records are kept
+        pipeline['listener'].stop()
+        pipeline['handlers'].extend(new_handlers)
+        pipeline['files'].update(Path(h.baseFilename) for h in new_handlers)
+        pipeline['listener'] = BatchingQueueListener(pipeline['queue_handler'].queue, *pipeline['handlers'],
+                                                     respect_handler_level=True)
+        pipeline['listener'].start()
+    return root
+
+
+def markdown_log(name, path, line_format='\n%(asctime)s: %(message)s'):
+    """A separate logger that appends plain timestamped lines to a Markdown log file"""
+    logger = logging.getLogger(name)
+    if name in _pipelines:
+        return logger
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = BatchingFileHandler(path)
+    handler.terminator = ''
+    handler.setFormatter(logging.Formatter(line_format, '%Y-%m-%d %H:%M:%S'))
+    _pipelines[name] = start_pipeline(logger, [handler], PROGRESS_INTERVAL)
+    return logger
+
+
+def log_event(logger, event, level=logging.INFO, **fields):
+    """Log a structured event: readable text for the console, JSON in the events file"""
+    if logger.isEnabledFor(level):
+        text = ' '.join(f'{key}={value}' for key, value in fields.items())
+        logger.log(level, '%s %s', event, text, extra={'event': event, 'fields': fields}, stacklevel=2)
+
+
+def log_progress(logger, message, *args):
+    """Log a progress line, dropped if the same line was logged within PROGRESS_INTERVAL"""
+    logger.info(message, *args, extra={'progress': True}, stacklevel=2)
+
+
+def stop_crawl_logging():
+    """Drain the queues and flush every file; runs automatically at exit"""
+    for pipeline in _pipelines.values():
+        pipeline['listener'].stop()
+        for handler in pipeline['handlers']:
+            handler.flush()
+    _pipelines.clear()
+
+
+atexit.register(stop_crawl_logging)
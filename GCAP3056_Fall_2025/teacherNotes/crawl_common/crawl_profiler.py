@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Crawl Profiler
+Profile a crawl without editing the crawler: the runner scripts wrap crawl()
+in either a low-overhead sampling profiler (the default) or cProfile.
+Sampling mode writes collapsed stacks (for flamegraph.pl / speedscope) and a
+speedscope JSON profile; both modes write a top-N table of the hottest
+functions, e.g. analyze_content, normalize_url or BeautifulSoup.__init__.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+PROFILE_MODES = ('sample', 'cprofile')
+SAMPLE_INTERVAL = 0.01   # seconds between stack samples (100 Hz)
+TOP_N = 25
+
+
+class SamplingProfiler:
+    """Sample one thread's Python stack at a fixed interval from a background thread"""
+
+    def __init__(self, interval=SAMPLE_INTERVAL, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.raw_samples = Counter()  # stack of code objects (leaf first) -> number of samples
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.started = None
+        self.elapsed = 0.0
+        self.samples = Counter()
+
+    def sample(self):
+        # Keep the work done while holding the GIL to a bare stack walk;
+        # frames are labelled once, after the run
+        frame = sys._current_frames().get(self.thread_id)
+        stack = []
+        while frame is not None:
+            stack.append(frame.f_code)
+            frame = frame.f_back
+        if stack:
+            self.raw_samples[tuple(stack)] += 1
+
+    def run(self):
+        # wait() returns False on timeout, i.e. every interval until stopped
+        while not self.stop_event.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.thread = threading.Thread(target=self.run, name='crawl-profiler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        self.samples = Counter()   # stack of (function, file, line), root first -> number of samples
+        for stack, count in self.raw_samples.items():
+            labelled = tuple((getattr(code, 'co_qualname', code.co_name), code.co_filename, code.co_firstlineno)
+                             for code in reversed(stack))
+            self.samples[labelled] += count
+
+    def total_samples(self):
+        return sum(self.samples.values())
+
+    def write_collapsed(self, path):
+        """One line per distinct stack: 'root;caller;function count'"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                names = ';'.join(f"{name} ({os.path.basename(filename)}:{line})" for name, filename, line in stack)
+                f.write(f"{names} {count}\n")
+
+    def write_speedscope(self, path, name='crawl'):
+        """Sampled profile in the speedscope file format (https://www.speedscope.app)"""
+        frame_index = {}
+        frames = []
+        samples = []
+        weights = []
+        seconds_per_sample = self.elapsed / max(self.total_samples(), 1)
+
+        for stack, count in self.samples.items():
+            indices = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({'name': frame[0], 'file': frame[1], 'line': frame[2]})
+                indices.append(frame_index[frame])
+            samples.append(indices)
+            weights.append(count * seconds_per_sample)
+
+        profile = {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'crawl_profiler',
+            'activeProfileIndex': 0,
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': sum(weights),
+                'samples': samples,
+                'weights': weights
+            }]
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(profile, f)
+
+    def top(self, n=TOP_N):
+        """Functions ranked by inclusive samples, with their self samples"""
+        inclusive = Counter()
+        own = Counter()
+        for stack, count in self.samples.items():
+            for frame in set(stack):
+                inclusive[frame] += count
+            own[stack[-1]] += count
+
+        total = self.total_samples() or 1
+        lines = [f"{'total%':>7} {'self%':>7}  function",
+                 f"{'-' * 7} {'-' * 7}  {'-' * 50}"]
+        for frame, count in inclusive.most_common(n):
+            name, filename, line = frame
+            lines.append(f"{100 * count / total:6.1f}% {100 * own[frame] / total:6.1f}%  "
+                         f"{name} ({os.path.basename(filename)}:{line})")
+        lines.append(f"\n{self.total_samples()} samples over {self.elapsed:.1f}s "
+                     f"(every {self.interval * 1000:g}ms)")
+        return '\n'.join(lines)
+
+
+def output_file(output_prefix, suffix):
+    return output_prefix.parent / (output_prefix.name + suffix)
+
+
+def cprofile_top(profiler, n=TOP_N):
+    """Top-N tables from cProfile, by cumulative and by own time"""
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats('cumulative').print_stats(n)
+    stats.sort_stats('tottime').print_stats(n)
+    return out.getvalue()
+
+
+def profile_call(func, mode='sample', output_prefix='profile', top=TOP_N, interval=SAMPLE_INTERVAL):
+    """Run func() under the chosen profiler and write the results next to output_prefix.
+
+    The profile is written even if the run is interrupted with Ctrl+C.
+    Returns func's result.
+    """
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode: {mode} (choose from {', '.join(PROFILE_MODES)})")
+    output_prefix = Path(output_prefix)
+    output_prefix.parent.mkdir(parents=True, exist_ok=True)
+    written = []
+
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return func()
+        finally:
+            profiler.disable()
+            prof_file = output_file(output_prefix, '.prof')
+            profiler.dump_stats(prof_file)
+            summary = cprofile_top(profiler, top)
+            written.append(prof_file)
+            write_summary(output_prefix, summary, written)
+
+    profiler = SamplingProfiler(interval)
+    profiler.start()
+    try:
+        return func()
+    finally:
+        profiler.stop()
+        collapsed_file = output_file(output_prefix, '.collapsed.txt')
+        speedscope_file = output_file(output_prefix, '.speedscope.json')
+        profiler.write_collapsed(collapsed_file)
+        profiler.write_speedscope(speedscope_file, output_prefix.name)
+        written.extend([collapsed_file, speedscope_file])
+        write_summary(output_prefix, profiler.top(top), written)
+
+
+def write_summary(output_prefix, summary, written):
+    top_file = output_file(output_prefix, '.top.txt')
+    with open(top_file, 'w', encoding='utf-8') as f:
+        f.write(summary)
+    print("\n" + "=" * 60)
+    print("PROFILE (hottest functions)")
+    print("=" * 60)
+    print(summary)
+    print("Profile files:")
+    for path in written + [top_file]:
+        print(f"  {path}")
+
+
+def add_profile_arguments(parser):
+    """Add the --profile options to a runner's argument parser"""
+    parser.add_argument('--profile', nargs='?', const='sample', choices=PROFILE_MODES,
+                        help="Profile the crawl: 'sample' (default, low overhead) or 'cprofile'")
+    parser.add_argument('--profile-output', help="Path prefix for the profile files (default: <output dir>/profile)")
+    parser.add_argument('--profile-interval', type=float, default=SAMPLE_INTERVAL,
+                        help="Seconds between stack samples in sample mode")
+    parser.add_argument('--profile-top', type=int, default=TOP_N, help="Functions listed in the summary")
+
+
+def run_profiled(args, func, output_dir):
+    """Run func() under the profiler the arguments ask for, or plainly"""
+    if not args.profile:
+        return func()
+    output_prefix = args.profile_output or Path(output_dir) / 'profile'
+    return profile_call(func, args.profile, output_prefix, args.profile_top, args.profile_interval)
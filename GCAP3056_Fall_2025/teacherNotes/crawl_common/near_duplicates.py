@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Detection
+SimHash signatures of a page's visible text and an LSH index over them, so a
+crawler can recognise the same page reached through another URL variant
+(trailing underscore or slash, locale path, letter case, tracking parameters)
+and skip storing, analysing and expanding it.
+
+Identical page text is a duplicate whatever the URL, as long as the page has
+MIN_WORDS words of its own text. Pages with less (link hubs whose only text
+is in <nav>, empty shells) and pages with near-identical text are only
+duplicates when the two URLs are variants of each other
+(url_variant_key): distinct pages built from one layout, such as the 64 km
+and 256 km radar pages or two quarters of a climate table, differ in only a
+few words and must still be crawled.
+
+Government sites wrap every page in the same menus and footers, often in
+plain <div>s, and that shared text would make unrelated short pages look
+alike. The index therefore learns the site template as it goes: a text block
+seen on TEMPLATE_PAGES or more other pages is left out of the signature.
+Pages flagged as duplicates are not indexed, so the content of a page and
+its URL variants never becomes "template". Near-duplicates are only reported
+after WARMUP_PAGES distinct pages, once the template is known; identical
+page text is recognised from the start.
+
+A signature is a 64-bit SimHash of overlapping word shingles. Two pages are
+near-duplicates when their signatures differ in at most MAX_DISTANCE bits.
+The index splits each signature into MAX_DISTANCE + 1 bands; by the
+pigeonhole principle two such signatures agree exactly on at least one band,
+so a lookup only compares against pages sharing a band.
+"""
+
+import hashlib
+import re
+from collections import Counter
+from urllib.parse import urlparse
+
+from bs4 import NavigableString, Tag
+
+SIGNATURE_BITS = 64
+MAX_DISTANCE = 3       # differing bits still counted as the same page
+SHINGLE_WORDS = 3
+MIN_WORDS = 20         # pages with less own text than this are only matched to URL variants
+TEMPLATE_PAGES = 2     # a block on this many other pages is site template
+WARMUP_PAGES = 20      # distinct pages seen before near-duplicates are reported
+
+# Never page content, whatever the site template looks like
+BOILERPLATE_TAGS = {'script', 'style', 'noscript', 'template', 'nav', 'header', 'footer', 'aside', 'form'}
+
+WORD_PATTERN = re.compile(r'\w+')
+LOCALE_SEGMENT = re.compile(r'^(?:en|tc|sc|zh|en[-_][a-z]{2}|zh[-_][a-z]{2,4})$')
+TRAILING_UNDERSCORE = re.compile(r'_+(\.\w+)?$')
+
+LANE_BITS = 24         # per-bit counters packed into one integer, 2**24 shingles per page
+LANE_MASK = (1 << LANE_BITS) - 1
+
+# BYTE_LANES[b] places bit i of byte b at the bottom of counter lane i
+BYTE_LANES = [sum(1 << (LANE_BITS * i) for i in range(8) if b >> i & 1) for b in range(256)]
+
+
+def page_blocks(soup):
+    """Normalised text blocks of the page's main content, in document order"""
+    root = soup.find('main') or soup.find(attrs={'role': 'main'}) or soup.body or soup
+    blocks = []
+    for text in iter_strings(root):
+        block = ' '.join(text.split()).casefold()
+        if block:
+            blocks.append(block)
+    return blocks
+
+
+def iter_strings(tag):
+    for child in tag.children:
+        if isinstance(child, Tag):
+            if child.name not in BOILERPLATE_TAGS:
+                yield from iter_strings(child)
+        elif type(child) is NavigableString:   # skips comments, CDATA and doctype
+            yield child
+
+
+def url_variant_key(url):
+    """The URL without what differs between its variants: case, query, fragment,
+    locale path segments and a trailing underscore or slash"""
+    parsed = urlparse(url.lower())
+    segments = [segment for segment in parsed.path.split('/') if segment and not LOCALE_SEGMENT.match(segment)]
+    path = TRAILING_UNDERSCORE.sub(r'\1', '/'.join(segments))
+    return f"{parsed.netloc}/{path}"
+
+
+def hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def simhash(text, shingle_words=SHINGLE_WORDS, min_words=MIN_WORDS):
+    """64-bit SimHash of the text's word shingles, or None if the text is too short"""
+    words = WORD_PATTERN.findall(text.casefold())
+    if len(words) < min_words:
+        return None
+
+    # Sum, for every bit position, how many shingles have that bit set. The
+    # 64 counters live in lanes of one large integer so each shingle costs
+    # eight table lookups instead of a 64-step loop.
+    counts = 0
+    shingles = 0
+    for i in range(len(words) - shingle_words + 1):
+        value = hash64(' '.join(words[i:i + shingle_words]))
+        for byte_index in range(8):
+            counts += BYTE_LANES[value >> (8 * byte_index) & 0xFF] << (8 * LANE_BITS * byte_index)
+        shingles += 1
+
+    signature = 0
+    for bit in range(SIGNATURE_BITS):
+        if (counts >> (LANE_BITS * bit) & LANE_MASK) * 2 > shingles:
+            signature |= 1 << bit
+    return signature
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class NearDuplicateIndex:
+    """LSH index of page signatures; remembers the first URL seen for each page"""
+
+    def __init__(self, max_distance=MAX_DISTANCE, template_pages=TEMPLATE_PAGES, warmup=WARMUP_PAGES):
+        self.max_distance = max_distance
+        self.template_pages = template_pages
+        self.warmup = warmup
+        self.bands = max_distance + 1
+        self.band_bits = -(-SIGNATURE_BITS // self.bands)
+        self.buckets = [{} for _ in range(self.bands)]   # band value -> [(signature, url, variant key)]
+        self.exact = {}                 # hash of the full page text -> (url, variant key)
+        self.block_pages = Counter()    # block hash -> distinct pages containing it
+        self.pending = []               # (url, blocks) of warm-up pages, signed once it ends
+        self.pages = 0
+        self.duplicates = 0
+
+    def band_keys(self, signature):
+        mask = (1 << self.band_bits) - 1
+        return [signature >> (self.band_bits * i) & mask for i in range(self.bands)]
+
+    def find(self, signature, variant):
+        """URL of an indexed variant of the same URL within max_distance bits of the signature, or None"""
+        for buckets, key in zip(self.buckets, self.band_keys(signature)):
+            for other, url, other_variant in buckets.get(key, ()):
+                if other_variant == variant and hamming(signature, other) <= self.max_distance:
+                    return url
+        return None
+
+    def add(self, signature, url):
+        entry = (signature, url, url_variant_key(url))
+        for buckets, key in zip(self.buckets, self.band_keys(signature)):
+            buckets.setdefault(key, []).append(entry)
+
+    def sign(self, blocks, counted=False):
+        """Signature of the page's own text: its blocks that are not site template"""
+        own = 1 if counted else 0
+        text = ' '.join(block for block, key in blocks.items()
+                        if self.block_pages[key] - own < self.template_pages)
+        return simhash(text)
+
+    def own_words(self, blocks):
+        """Number of words in the page's blocks that are not site template"""
+        return sum(len(WORD_PATTERN.findall(block)) for block, key in blocks.items()
+                   if self.block_pages[key] < self.template_pages)
+
+    def check(self, blocks, url):
+        """Return the URL this page duplicates, or index it and return None.
+
+        blocks is the page's text as returned by page_blocks().
+        """
+        full_key = hash64('\n'.join(blocks))
+        blocks = {block: hash64(block) for block in blocks}
+        variant = url_variant_key(url)
+        original = self.exact.get(full_key)
+        if original and (original[1] == variant or self.own_words(blocks) >= MIN_WORDS):
+            self.duplicates += 1
+            return original[0]
+
+        if self.pages >= self.warmup:
+            signature = self.sign(blocks)
+            original = self.find(signature, variant) if signature is not None else None
+            if original:
+                self.duplicates += 1
+                return original
+            if signature is not None:
+                self.add(signature, url)
+        else:
+            self.pending.append((url, blocks))
+
+        self.exact.setdefault(full_key, (url, variant))
+        self.block_pages.update(set(blocks.values()))
+        self.pages += 1
+        if self.pages == self.warmup:
+            # The template is known now; sign the warm-up pages against it
+            for pending_url, pending_blocks in self.pending:
+                signature = self.sign(pending_blocks, counted=True)
+                if signature is not None:
+                    self.add(signature, pending_url)
+            self.pending = []
+        return None
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Page Index
+Local full-text index of crawled pages, so a question like "where does HKO
+mention 'chatbot'?" is answered from disk in milliseconds instead of by a new
+crawl or a re-read of every saved page. The crawlers add each page's visible
+text as they store it; the command line searches the index or builds one
+from pages that are already on disk.
+
+The index is a SQLite file with positional postings (term -> page, term
+frequency, word positions). Words come from page_text.tokenize(), so
+Chinese text is indexed as character bigrams and a Chinese query word of two
+or more characters is matched as a phrase. Queries are ranked with BM25; all
+words must occur unless --any is given, and "quoted phrases" must occur in order.
+
+    python ../../crawl_common/page_index.py search '"dr tin" chatbot' --index page_index.sqlite
+    python ../../crawl_common/page_index.py build downloaded_pages --sitemap reports/enhanced_hko_sitemap.csv
+    python ../../crawl_common/page_index.py stats
+"""
+
+import argparse
+import csv
+import heapq
+import math
+import re
+import sqlite3
+import sys
+import time
+from array import array
+from datetime import datetime
+from pathlib import Path
+
+from page_text import PageText, tokenize, token_groups, iter_tokens
+
+INDEX_FILE = 'page_index.sqlite'
+COMMIT_EVERY = 50      # pages added between commits while crawling
+BM25_K1 = 1.2
+BM25_B = 0.75
+SNIPPET_WORDS = 12     # words of context on each side of a match
+RESULT_LIMIT = 10
+SQL_CHUNK = 900        # ids per IN (...) query, below SQLite's variable limit
+
+QUERY_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    url TEXT UNIQUE NOT NULL,
+    title TEXT,
+    length INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    indexed_at TEXT
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    page_id INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    positions BLOB NOT NULL,
+    PRIMARY KEY (term, page_id)
+) WITHOUT ROWID;
+"""
+
+
+def parse_query(query):
+    """The query's phrases as lists of words: 'dr tin "weather bot"' -> [['dr'], ['tin'], ['weather', 'bot']]"""
+    phrases = []
+    for quoted, word in QUERY_PATTERN.findall(query):
+        if quoted:
+            words = tokenize(quoted)
+            if words:
+                phrases.append(words)
+        else:
+            phrases.extend(token_groups(word))   # a Chinese word is a phrase of its bigrams
+    return phrases
+
+
+def phrase_count(positions, offset_positions):
+    """How often the phrase occurs, given each word's positions in the page"""
+    later = [set(p) for p in offset_positions]
+    return sum(1 for start in positions
+               if all(start + i + 1 in word_positions for i, word_positions in enumerate(later)))
+
+
+class PageIndex:
+    """Positional inverted index of page text in a SQLite file"""
+
+    def __init__(self, path=INDEX_FILE, commit_every=COMMIT_EVERY):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self.commit_every = commit_every
+        self.uncommitted = 0
+
+    def add(self, url, text, title=''):
+        """Index a page's text, replacing what was indexed for the URL before"""
+        words = tokenize(text)
+        row = self.conn.execute('SELECT id, text FROM pages WHERE url = ?', (url,)).fetchone()
+        if row:
+            page_id, old_text = row
+            self.conn.executemany('DELETE FROM postings WHERE term = ? AND page_id = ?',
+                                  [(term, page_id) for term in set(tokenize(old_text))])
+            self.conn.execute('UPDATE pages SET title = ?, length = ?, text = ?, indexed_at = ? WHERE id = ?',
+                              (title, len(words), text, datetime.now().isoformat(), page_id))
+        else:
+            page_id = self.conn.execute(
+                'INSERT INTO pages (url, title, length, text, indexed_at) VALUES (?, ?, ?, ?, ?)',
+                (url, title, len(words), text, datetime.now().isoformat())).lastrowid
+
+        positions = {}
+        for position, word in enumerate(words):
+            positions.setdefault(word, []).append(position)
+        self.conn.executemany('INSERT INTO postings (term, page_id, tf, positions) VALUES (?, ?, ?, ?)',
+                              [(term, page_id, len(p), array('I', p).tobytes()) for term, p in positions.items()])
+
+        self.uncommitted += 1
+        if self.uncommitted >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        self.conn.commit()
+        self.uncommitted = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+    def stats(self):
+        pages, words = self.conn.execute('SELECT COUNT(*), COALESCE(SUM(length), 0) FROM pages').fetchone()
+        terms = self.conn.execute('SELECT COUNT(DISTINCT term) FROM postings').fetchone()[0]
+        return {'pages': pages, 'words': words, 'terms': terms}
+
+    def phrase_matches(self, phrase):
+        """{page_id: occurrences} for a word or a phrase"""
+        if len(phrase) == 1:
+            return dict(self.conn.execute('SELECT page_id, tf FROM postings WHERE term = ?', (phrase[0],)))
+
+        postings = []
+        for word in phrase:
+            rows = self.conn.execute('SELECT page_id, positions FROM postings WHERE term = ?', (word,))
+            postings.append({page_id: blob for page_id, blob in rows})
+        candidates = set.intersection(*(set(p) for p in postings))
+
+        matches = {}
+        for page_id in candidates:
+            word_positions = [array('I', postings[i][page_id]) for i in range(len(phrase))]
+            count = phrase_count(word_positions[0], word_positions[1:])
+            if count:
+                matches[page_id] = count
+        return matches
+
+    def page_lengths(self, page_ids):
+        lengths = {}
+        page_ids = list(page_ids)
+        for i in range(0, len(page_ids), SQL_CHUNK):
+            chunk = page_ids[i:i + SQL_CHUNK]
+            lengths.update(self.conn.execute(
+                f"SELECT id, length FROM pages WHERE id IN ({','.join('?' * len(chunk))})", chunk))
+        return lengths
+
+    def search(self, query, limit=RESULT_LIMIT, match_all=True):
+        """Best pages for the query as dicts with url, title, score and snippet"""
+        phrases = parse_query(query)
+        if not phrases:
+            return []
+        matches = [self.phrase_matches(phrase) for phrase in phrases]
+        if match_all:
+            page_ids = set.intersection(*(set(m) for m in matches))
+        else:
+            page_ids = set().union(*matches)
+        if not page_ids:
+            return []
+
+        pages, words = self.conn.execute('SELECT COUNT(*), SUM(length) FROM pages').fetchone()
+        avg_length = words / pages if pages else 0
+        lengths = self.page_lengths(page_ids)
+        idfs = [math.log(1 + (pages - len(m) + 0.5) / (len(m) + 0.5)) for m in matches]
+
+        def bm25(page_id):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[page_id] / avg_length) if avg_length else BM25_K1
+            score = 0.0
+            for idf, m in zip(idfs, matches):
+                tf = m.get(page_id, 0)
+                score += idf * tf * (BM25_K1 + 1) / (tf + norm)
+            return score
+
+        top = heapq.nlargest(limit, ((bm25(page_id), page_id) for page_id in page_ids))
+        results = []
+        for score, page_id in top:
+            url, title, text = self.conn.execute('SELECT url, title, text FROM pages WHERE id = ?',
+                                                 (page_id,)).fetchone()
+            results.append({'url': url, 'title': title, 'score': score, 'snippet': snippet(text, phrases)})
+        return results
+
+
+def snippet(text, phrases, words=SNIPPET_WORDS):
+    """The text around the first match of any phrase, with the matches in **bold**"""
+    tokens = list(iter_tokens(text))
+    terms = [t for t, _, _ in tokens]
+    hits = []
+    for phrase in phrases:
+        n = len(phrase)
+        hits.extend((i, i + n) for i in range(len(terms) - n + 1) if terms[i:i + n] == phrase)
+    if not hits:
+        return ' '.join(text.split()[:2 * words])
+
+    first = min(hits)[0]
+    lo, hi = max(0, first - words), min(len(tokens), first + words + 1)
+    bold = sorted((s, e) for s, e in hits if s >= lo and e <= hi)
+    parts = []
+    cursor = tokens[lo][1]
+    for s, e in bold:
+        if tokens[s][1] < cursor:
+            continue   # overlaps a match already in bold
+        parts.append(text[cursor:tokens[s][1]])
+        parts.append(f"**{text[tokens[s][1]:tokens[e - 1][2]]}**")
+        cursor = tokens[e - 1][2]
+    parts.append(text[cursor:tokens[hi - 1][2]])
+    prefix = '... ' if lo > 0 else ''
+    suffix = ' ...' if hi < len(tokens) else ''
+    return prefix + ' '.join(''.join(parts).split()) + suffix
+
+
+def build_from_files(index, pages_dir, sitemap=None):
+    """Index saved HTML pages; URLs come from the sitemap's URL/Filename columns if given"""
+    from bs4 import BeautifulSoup
+
+    urls = {}
+    if sitemap:
+        with open(sitemap, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                if row.get('Filename') and row.get('URL'):
+                    urls[row['Filename']] = row['URL']
+
+    count = 0
+    for path in sorted(Path(pages_dir).glob('*.htm*')):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            soup = BeautifulSoup(f.read(), 'html.parser')
+        title = soup.title.get_text().strip() if soup.title else ''
+        index.add(urls.get(path.name, str(path)), PageText.from_soup(soup).text(), title)
+        count += 1
+    index.commit()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--index', default=INDEX_FILE, help=f"Index file (default: {INDEX_FILE})")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    search = commands.add_parser('search', parents=[common], help="Search the index")
+    search.add_argument('query', nargs='+', help='Words and "quoted phrases"')
+    search.add_argument('--limit', type=int, default=RESULT_LIMIT)
+    search.add_argument('--any', action='store_true', help="Match pages with any of the words, not all")
+
+    build = commands.add_parser('build', parents=[common], help="Index HTML pages already on disk")
+    build.add_argument('pages_dir')
+    build.add_argument('--sitemap', help="Sitemap CSV with URL and Filename columns")
+
+    commands.add_parser('stats', parents=[common], help="Show the size of the index")
+    args = parser.parse_args()
+
+    if args.command != 'build' and not Path(args.index).exists():
+        print(f"No index at {args.index}; run a crawl or 'build' first")
+        return 1
+
+    index = PageIndex(args.index)
+    try:
+        if args.command == 'build':
+            started = time.perf_counter()
+            count = build_from_files(index, args.pages_dir, args.sitemap)
+            print(f"Indexed {count} pages into {args.index} in {time.perf_counter() - started:.1f}s")
+        elif args.command == 'stats':
+            stats = index.stats()
+            print(f"{stats['pages']} pages, {stats['words']} words, {stats['terms']} distinct terms")
+        else:
+            query = ' '.join(args.query)
+            started = time.perf_counter()
+            results = index.search(query, args.limit, match_all=not args.any)
+            elapsed = (time.perf_counter() - started) * 1000
+            for i, result in enumerate(results, 1):
+                print(f"{i}. {result['url']} ({result['score']:.2f})")
+                if result['title']:
+                    print(f"   {result['title']}")
+                print(f"   {result['snippet']}\n")
+            print(f"{len(results)} results for {query!r} in {elapsed:.1f} ms")
+    finally:
+        index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Page Text
+Visible text of a page as one segment per block element (paragraph, heading,
+list item, table cell, ...), for sites that serve English and Traditional
+Chinese pages. Segments are NFKC-normalised (full-width letters, digits and
+punctuation become their ASCII forms) and whitespace-collapsed as they are
+emitted. Keyword matching casefolds one segment at a time, so no lowercase
+copy of the whole page is ever built.
+
+Chinese has no spaces between words, so tokenize() splits CJK text into
+overlapping character bigrams ("天文台" -> "天文", "文台") and everything
+else into casefolded words. A keyword or query in Chinese then matches as a
+run of consecutive bigrams.
+
+Keywords match anywhere in the text, as `keyword in text.lower()` did, so
+'warning' also counts inside 'warnings'. Pass whole_words=True for matches
+on word boundaries only.
+"""
+
+import re
+import unicodedata
+
+from bs4 import NavigableString, Tag
+
+SKIP_TAGS = {'script', 'style', 'noscript', 'template'}
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'body', 'br', 'caption', 'dd', 'details', 'div', 'dl', 'dt',
+    'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'head', 'header',
+    'hr', 'li', 'main', 'nav', 'ol', 'option', 'p', 'pre', 'section', 'summary', 'table', 'td', 'th', 'title',
+    'tr', 'ul'
+}
+
+# Han ideographs (with extension A and compatibility forms), kana and hangul
+CJK = '぀-ヿ㐀-䶿一-鿿가-힯豈-﫿'
+TOKEN_PATTERN = re.compile(rf'[{CJK}]+|[^\W{CJK}]+')
+CJK_CHAR = re.compile(rf'[{CJK}]')
+
+_BLOCK_END = object()
+
+
+def normalize(text):
+    """NFKC form of the text with runs of whitespace collapsed to one space"""
+    return unicodedata.normalize('NFKC', ' '.join(text.split()))
+
+
+def fold(text):
+    """Casefolded NFKC form, for matching"""
+    return unicodedata.normalize('NFKC', text.casefold())
+
+
+def iter_segments(root):
+    """Normalised text of each block element under root, in document order"""
+    parts = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node is _BLOCK_END or (isinstance(node, Tag) and node.name in BLOCK_TAGS):
+            if parts:
+                segment = normalize(''.join(parts))
+                parts = []
+                if segment:
+                    yield segment
+            if node is _BLOCK_END:
+                continue
+        if isinstance(node, Tag):
+            if node.name in SKIP_TAGS:
+                continue
+            if node.name in BLOCK_TAGS:
+                stack.append(_BLOCK_END)
+            stack.extend(reversed(node.contents))
+        elif type(node) is NavigableString:   # skips comments, CDATA and doctype
+            parts.append(node)
+    if parts:
+        segment = normalize(''.join(parts))
+        if segment:
+            yield segment
+
+
+class PageText:
+    """A page's visible text, kept as block segments"""
+
+    def __init__(self, segments):
+        self.segments = list(segments)
+
+    @classmethod
+    def from_soup(cls, soup):
+        return cls(iter_segments(soup))
+
+    @classmethod
+    def from_text(cls, text):
+        """Segments from plain text, one per line"""
+        return cls(segment for segment in (normalize(line) for line in text.splitlines()) if segment)
+
+    def text(self):
+        """The segments as one string, a line each"""
+        return '\n'.join(self.segments)
+
+    def folded(self):
+        """(index, casefolded segment) pairs, folded one at a time"""
+        for i, segment in enumerate(self.segments):
+            yield i, fold(segment)
+
+    def finditer(self, patterns):
+        """(pattern number, match, segment index, offset of the segment in text()) for each match.
+
+        The patterns run over the casefolded segments, so they should be lowercase.
+        Most segments match none of them, which one combined search finds out.
+        """
+        screen = re.compile('|'.join(f'(?:{pattern.pattern})' for pattern in patterns))
+        offset = 0
+        for index, segment in self.folded():
+            if screen.search(segment):
+                for number, pattern in enumerate(patterns):
+                    for match in pattern.finditer(segment):
+                        yield number, match, index, offset
+            offset += len(self.segments[index]) + 1
+
+    def context(self, index, start, end, chars):
+        """About `chars` characters either side of a match in segment `index`, crossing into neighbouring segments"""
+        segment = self.segments[index]
+        if len(fold(segment)) != len(segment):
+            segment = fold(segment)   # casefolding changed the length; offsets only hold in the folded text
+        before = segment[:start]
+        after = segment[end:]
+        i = index
+        while len(before) < chars and i > 0:
+            i -= 1
+            before = self.segments[i] + ' ' + before
+        i = index
+        while len(after) < chars and i + 1 < len(self.segments):
+            i += 1
+            after = after + ' ' + self.segments[i]
+        return (before[-chars:] + segment[start:end] + after[:chars]).strip()
+
+
+def keyword_pattern(keyword, whole_words=False):
+    """Regex for a keyword in folded text; with whole_words, Latin-script keywords only match whole words"""
+    words = fold(keyword).split()
+    pattern = r'\s+'.join(re.escape(word) for word in words)
+    if not whole_words:
+        return re.compile(pattern)
+    if not CJK_CHAR.match(words[0][0]):
+        pattern = r'(?<!\w)' + pattern
+    if not CJK_CHAR.match(words[-1][-1]):
+        pattern = pattern + r'(?!\w)'
+    return re.compile(pattern)
+
+
+class KeywordMatcher:
+    """Find keywords in a PageText, segment by segment"""
+
+    def __init__(self, keywords, whole_words=False):
+        self.keywords = list(dict.fromkeys(keywords))
+        self.patterns = [keyword_pattern(keyword, whole_words) for keyword in self.keywords]
+
+    def positions(self, page):
+        """{keyword: [offsets in page.text()]} for the keywords found, in keyword order"""
+        found = {}
+        for number, match, _, offset in page.finditer(self.patterns):
+            found.setdefault(number, []).append(offset + match.start())
+        return {self.keywords[number]: found[number] for number in sorted(found)}
+
+
+def token_groups(text):
+    """Tokens of the text grouped by run: a Latin word alone, a CJK run as its bigrams"""
+    for match in TOKEN_PATTERN.finditer(text):
+        run = fold(match.group())
+        if CJK_CHAR.match(run):
+            yield [run] if len(run) == 1 else [run[i:i + 2] for i in range(len(run) - 1)]
+        else:
+            yield [run]
+
+
+def tokenize(text):
+    """Casefolded words, with CJK text as overlapping character bigrams"""
+    return [token for group in token_groups(text) for token in group]
+
+
+def iter_tokens(text):
+    """(token, start, end) for each token, with offsets into the original text"""
+    for match in TOKEN_PATTERN.finditer(text):
+        run, offset = match.group(), match.start()
+        if CJK_CHAR.match(run) and len(run) > 1:
+            for i in range(len(run) - 1):
+                yield fold(run[i:i + 2]), offset + i, offset + i + 2
+        else:
+            yield fold(run), offset, match.end()
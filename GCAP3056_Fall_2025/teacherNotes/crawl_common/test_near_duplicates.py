@@ -0,0 +1,55 @@
+"""Tests for near_duplicates.py: python -m pytest test_near_duplicates.py"""
+
+from bs4 import BeautifulSoup
+
+from near_duplicates import NearDuplicateIndex, page_blocks, url_variant_key
+
+ARTICLE = ' '.join(f'word{i}' for i in range(200))
+
+
+def blocks(html):
+    return page_blocks(BeautifulSoup(html, 'html.parser'))
+
+
+def test_nav_only_pages_are_not_duplicates():
+    index = NearDuplicateIndex()
+    a = blocks('<html><body><nav><a href="/x">x</a></nav></body></html>')
+    b = blocks('<html><body><nav><a href="/y.z">y</a></nav></body></html>')
+    assert index.check(a, 'http://site/a.htm') is None
+    assert index.check(b, 'http://site/b.htm') is None
+
+
+def test_empty_pages_are_not_duplicates():
+    index = NearDuplicateIndex()
+    assert index.check(blocks('<html><body></body></html>'), 'http://site/a.htm') is None
+    assert index.check(blocks('<html><body> </body></html>'), 'http://site/b.htm') is None
+
+
+def test_short_page_is_duplicate_of_its_url_variant():
+    index = NearDuplicateIndex()
+    page = blocks('<html><body><p>Short notice</p></body></html>')
+    assert index.check(page, 'http://site/en/notice.htm') is None
+    assert index.check(page, 'http://site/notice_.htm') == 'http://site/en/notice.htm'
+
+
+def test_identical_text_is_duplicate_whatever_the_url():
+    index = NearDuplicateIndex()
+    page = blocks(f'<html><body><main><p>{ARTICLE}</p></main></body></html>')
+    assert index.check(page, 'http://site/a.htm') is None
+    assert index.check(page, 'http://site/other/b.htm') == 'http://site/a.htm'
+    assert index.duplicates == 1
+
+
+def test_near_identical_text_needs_url_variant():
+    index = NearDuplicateIndex(warmup=0)
+    page = blocks(f'<html><body><p>{ARTICLE}</p></body></html>')
+    edited = blocks(f'<html><body><p>{ARTICLE.replace("word100", "256")}</p></body></html>')
+    variant = blocks(f'<html><body><p>{ARTICLE} updated</p></body></html>')
+    assert index.check(page, 'http://site/en/radar.htm') is None
+    assert index.check(edited, 'http://site/radar256.htm') is None
+    assert index.check(variant, 'http://site/tc/radar.htm') == 'http://site/en/radar.htm'
+
+
+def test_url_variant_key():
+    assert url_variant_key('http://Site/en/Page_.htm?lang=1#top') == url_variant_key('http://site/page.htm')
+    assert url_variant_key('http://site/a/') == url_variant_key('http://site/a')
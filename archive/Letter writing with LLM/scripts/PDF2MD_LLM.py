@@ -1,10 +1,19 @@
 import os
-import requests
-import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from PyPDF2 import PdfReader
+from llm_client import LLMClient, API_URL, replay_only_enabled
 
-def read_api_key():
-    api_path = "/Applications/renpy-8.0.3-sdk/projects/LetterWriting/scripts/API.txt"
+# Configuration
+API_KEY_PATH = "/Applications/renpy-8.0.3-sdk/projects/LetterWriting/scripts/API.txt"
+PDF_DIR = "/Applications/renpy-8.0.3-sdk/projects/LetterWriting/JREinfo/Re_ request info about JRE"
+MODEL = "x-ai/grok-beta"
+MAX_PROMPT_TOKENS = 24000  # token budget for the document text in one request
+CHARS_PER_TOKEN = 4        # rough estimate, good enough for budgeting
+
+def read_api_key(api_path=API_KEY_PATH):
+    if os.environ.get("OPENROUTER_API_KEY"):
+        return os.environ["OPENROUTER_API_KEY"]
     try:
         with open(api_path, 'r') as f:
             return f.read().strip()
@@ -12,91 +21,195 @@ def read_api_key():
         print(f"API key file not found at {api_path}")
         return None
 
-def pdf_to_text(pdf_path):
-    text = ""
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def iter_page_text(pdf_path):
+    """Yield the text of each page, one page at a time"""
     reader = PdfReader(pdf_path)
     for page in reader.pages:
-        text += page.extract_text() + "\n"
-    return text
+        yield (page.extract_text() or "") + "\n"
 
-def process_pdf(api_key, pdf_path, md_path):
-    text = pdf_to_text(pdf_path)
-    if not text.strip():
-        print(f"Warning: No text extracted from {pdf_path}")
-        return False
-    
-    prompt = f"""Convert this PDF content into markdown format. Keep the structure similar to the original document. 
-At the end, add a '## Summary and Action Items' section with: 
+def pdf_to_text(pdf_path):
+    return "".join(iter_page_text(pdf_path))
+
+def split_text(text, max_tokens):
+    """Split one over-long piece of text at paragraph, then line, boundaries"""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    pieces = []
+    while len(text) > max_chars:
+        cut = text.rfind("\n\n", 0, max_chars)
+        if cut <= 0:
+            cut = text.rfind("\n", 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        pieces.append(text[:cut])
+        text = text[cut:]
+    pieces.append(text)
+    return pieces
+
+def chunk_pages(pages, max_tokens=MAX_PROMPT_TOKENS):
+    """Group streamed page texts into chunks that each fit the token budget"""
+    chunk, chunk_tokens = [], 0
+    for page_text in pages:
+        for piece in split_text(page_text, max_tokens):
+            piece_tokens = estimate_tokens(piece)
+            if chunk and chunk_tokens + piece_tokens > max_tokens:
+                yield "".join(chunk)
+                chunk, chunk_tokens = [], 0
+            chunk.append(piece)
+            chunk_tokens += piece_tokens
+    if chunk:
+        yield "".join(chunk)
+
+class LLMPool:
+    """Bounded pool of cached chat-completion requests (retries are handled by LLMClient)"""
+
+    def __init__(self, client, model=MODEL, max_workers=4):
+        self.client = client
+        self.model = model
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def complete(self, prompt):
+        return self.client.complete(prompt, self.model)
+
+    def submit(self, prompt):
+        return self.executor.submit(self.complete, prompt)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+def full_prompt(text):
+    return f"""Convert this PDF content into markdown format. Keep the structure similar to the original document.
+At the end, add a '## Summary and Action Items' section with:
 1. A brief summary of the document
 2. Clear actionable steps a new candidate can take based on the information
 Here's the PDF content:\n\n{text}"""
 
+def part_prompt(text, part, total):
+    return f"""Convert part {part} of {total} of this PDF content into markdown format. Keep the structure similar to the original document.
+Do not add a summary; only convert this part.
+Here's the PDF content:\n\n{text}"""
+
+def summary_prompt(markdown):
+    return f"""Here is a document converted to markdown. Write a '## Summary and Action Items' section with:
+1. A brief summary of the document
+2. Clear actionable steps a new candidate can take based on the information
+Only output that section.\n\n{markdown}"""
+
+def is_up_to_date(pdf_path, md_path):
+    return os.path.exists(md_path) and os.path.getmtime(md_path) >= os.path.getmtime(pdf_path)
+
+def write_markdown(md_path, md_content):
+    # Write to a temporary file first so a failed run never looks up to date
+    tmp_path = md_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(md_content)
+    os.replace(tmp_path, md_path)
+
+def process_pdf(pool, pdf_path, md_path, max_tokens=MAX_PROMPT_TOKENS):
+    """Convert one PDF; any failure is reported and returns False so the rest of the batch goes on"""
     try:
-        response = requests.post(
-            url="https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            },
-            data=json.dumps({
-                "model": "x-ai/grok-beta",
-                "messages": [{"role": "user", "content": prompt}]
-            })
-        )
-
-        if response.status_code == 200:
-            result = response.json()
-            md_content = result['choices'][0]['message']['content']
-            
-            with open(md_path, 'w') as f:
-                f.write(md_content)
-            return True
-        else:
-            print(f"API Error ({response.status_code}): {response.text}")
-            return False
-            
+        chunks = list(chunk_pages(iter_page_text(pdf_path), max_tokens))
+    except Exception as e:
+        print(f"Error reading {pdf_path}: {str(e)}")
+        return False
+
+    try:
+        return convert_chunks(pool, chunks, pdf_path, md_path, max_tokens)
     except Exception as e:
         print(f"Error processing {pdf_path}: {str(e)}")
         return False
 
+def convert_chunks(pool, chunks, pdf_path, md_path, max_tokens):
+    if not "".join(chunks).strip():
+        print(f"Warning: No text extracted from {pdf_path}")
+        return False
+
+    if len(chunks) == 1:
+        md_content = pool.submit(full_prompt(chunks[0])).result()
+    else:
+        # Long document: convert the parts concurrently, then summarize the result
+        futures = [pool.submit(part_prompt(chunk, i, len(chunks))) for i, chunk in enumerate(chunks, 1)]
+        parts = [future.result() for future in futures]
+        if None in parts:
+            return False
+        body = "\n\n".join(parts)
+        # The summary request sees as much of the converted text as fits the budget
+        summary = pool.submit(summary_prompt(body[:max_tokens * CHARS_PER_TOKEN])).result()
+        md_content = body + "\n\n" + summary if summary else None
+
+    if not md_content:
+        return False
+    write_markdown(md_path, md_content)
+    return True
+
 def main():
-    api_key = read_api_key()
-    if not api_key:
+    parser = argparse.ArgumentParser(description="Convert a folder of PDFs to Markdown with an LLM")
+    parser.add_argument('--pdf-dir', default=PDF_DIR, help="Folder containing the PDFs")
+    parser.add_argument('--out-dir', help="Folder for the Markdown files (default: same as the PDFs)")
+    parser.add_argument('--api-key-file', default=API_KEY_PATH, help="File holding the API key (or set OPENROUTER_API_KEY)")
+    parser.add_argument('--api-url', default=API_URL, help="Chat-completions endpoint, e.g. a local stub for testing")
+    parser.add_argument('--model', default=MODEL)
+    parser.add_argument('--workers', type=int, default=4, help="Concurrent LLM requests")
+    parser.add_argument('--max-prompt-tokens', type=int, default=MAX_PROMPT_TOKENS, help="Token budget per request")
+    parser.add_argument('--force', action='store_true', help="Convert even if the Markdown is newer than the PDF")
+    parser.add_argument('--pause-every', type=int, default=0, help="Ask before continuing after every N files (0 = never)")
+    parser.add_argument('--replay-only', action='store_true', help="Use only cached LLM responses (offline run)")
+    args = parser.parse_args()
+
+    replay_only = args.replay_only or replay_only_enabled()
+    api_key = read_api_key(args.api_key_file)
+    if not api_key and not replay_only:
         return
 
-    pdf_dir = "/Applications/renpy-8.0.3-sdk/projects/LetterWriting/JREinfo/Re_ request info about JRE"
-    posts_dir = pdf_dir  # Save MD files in same directory
-    
-    pdf_files = [f for f in os.listdir(pdf_dir) if f.lower().endswith('.pdf')]
+    pdf_dir = args.pdf_dir
+    posts_dir = args.out_dir or pdf_dir  # Save MD files in same directory by default
+    os.makedirs(posts_dir, exist_ok=True)
+
+    pdf_files = sorted(f for f in os.listdir(pdf_dir) if f.lower().endswith('.pdf'))
     if not pdf_files:
         print("No PDF files found in directory")
         return
 
-    total = len(pdf_files)
-    processed = 0
-    
-    for i, pdf_file in enumerate(pdf_files, 1):
+    jobs = []
+    for pdf_file in pdf_files:
         pdf_path = os.path.join(pdf_dir, pdf_file)
-        md_file = os.path.splitext(pdf_file)[0] + ".md"
-        md_path = os.path.join(posts_dir, md_file)
-        
-        print(f"Processing file {i}/{total}: {pdf_file}...", end=' ', flush=True)
-        
-        if process_pdf(api_key, pdf_path, md_path):
-            print("✅")
-        else:
-            print("❌")
-        
-        processed += 1
-        
-        if processed % 10 == 0 and i != total:
-            print(f"\nProcessed {processed} files. Continue?")
-            choice = input("Enter 'y' to continue, any other key to exit: ").strip().lower()
-            if choice != 'y':
-                print("Exiting...")
-                break
-
-    print(f"\nProcessing complete. Total files processed: {processed}/{total}")
+        md_path = os.path.join(posts_dir, os.path.splitext(pdf_file)[0] + ".md")
+        if not args.force and is_up_to_date(pdf_path, md_path):
+            print(f"Skipping {pdf_file} (Markdown is up to date)")
+            continue
+        jobs.append((pdf_file, pdf_path, md_path))
+
+    total = len(jobs)
+    processed = 0
+    succeeded = 0
+    client = LLMClient(api_key, args.api_url, replay_only=replay_only)
+    pool = LLMPool(client, args.model, max_workers=args.workers)
+
+    try:
+        # Files are handled concurrently too; the pool bounds the number of live requests
+        with ThreadPoolExecutor(max_workers=args.workers) as file_pool:
+            batch_size = args.pause_every or total or 1
+            for start in range(0, total, batch_size):
+                batch = jobs[start:start + batch_size]
+                results = file_pool.map(lambda job: process_pdf(pool, job[1], job[2], args.max_prompt_tokens), batch)
+                for (pdf_file, _, _), ok in zip(batch, results):
+                    processed += 1
+                    succeeded += ok
+                    print(f"Processed file {processed}/{total}: {pdf_file} {'✅' if ok else '❌'}", flush=True)
+
+                if args.pause_every and processed < total:
+                    print(f"\nProcessed {processed} files. Continue?")
+                    choice = input("Enter 'y' to continue, any other key to exit: ").strip().lower()
+                    if choice != 'y':
+                        print("Exiting...")
+                        break
+    finally:
+        pool.shutdown()
+
+    print(f"\nProcessing complete. Converted {succeeded} of {processed} files processed ({total} needed conversion)")
+    client.print_stats()
 
 if __name__ == "__main__":
     main()
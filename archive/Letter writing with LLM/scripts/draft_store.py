@@ -0,0 +1,137 @@
+import os
+import sys
+import zlib
+import sqlite3
+import difflib
+import argparse
+from datetime import datetime
+
+# Versioned draft history for the drafting scripts.
+# Every revision is kept as its own row in a small SQLite file next to the
+# draft; only the newest one is stored as plain text, older ones are
+# zlib-compressed. The draft file itself holds just the latest revision, so
+# the text sent back to the model for the next revision stays the same size
+# however long the writing session runs.
+#
+# Usage:
+#   python draft_store.py drafts/draft.history.sqlite3 --list
+#   python draft_store.py drafts/draft.history.sqlite3 --show 3
+#   python draft_store.py drafts/draft.history.sqlite3 --diff 2 3
+#   python draft_store.py drafts/draft.history.sqlite3 --export all_versions.md
+
+COMPRESSION_LEVEL = 9
+
+def history_path(draft_path):
+    """History file kept next to a draft file, e.g. draft.md -> draft.history.sqlite3"""
+    return os.path.splitext(draft_path)[0] + ".history.sqlite3"
+
+def split_legacy_draft(content, marker):
+    """Split an old-style draft file into (latest revision, previous versions)"""
+    head, found, rest = content.partition(marker)
+    if not found:
+        return content, ""
+    return head.strip(), rest.strip()
+
+class DraftStore:
+    """Append-only store of draft revisions in SQLite"""
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS revisions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created TEXT, words INTEGER, compressed INTEGER, content BLOB)""")
+        self.db.commit()
+
+    def add(self, content, created=None):
+        """Store a new revision and compress the ones before it; returns its id"""
+        created = created or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        cursor = self.db.execute(
+            "INSERT INTO revisions (created, words, compressed, content) VALUES (?, ?, 0, ?)",
+            (created, len(content.split()), content))
+        revision_id = cursor.lastrowid
+
+        # Only the latest revision is read regularly; keep the rest compressed
+        older = self.db.execute(
+            "SELECT id, content FROM revisions WHERE compressed = 0 AND id < ?", (revision_id,)).fetchall()
+        for old_id, old_content in older:
+            self.db.execute(
+                "UPDATE revisions SET compressed = 1, content = ? WHERE id = ?",
+                (zlib.compress(old_content.encode('utf-8'), COMPRESSION_LEVEL), old_id))
+        self.db.commit()
+        return revision_id
+
+    def decode(self, compressed, content):
+        return zlib.decompress(content).decode('utf-8') if compressed else content
+
+    def get(self, revision_id):
+        row = self.db.execute("SELECT compressed, content FROM revisions WHERE id = ?", (revision_id,)).fetchone()
+        return self.decode(*row) if row else None
+
+    def latest(self):
+        """Text of the newest revision, or an empty string"""
+        row = self.db.execute("SELECT compressed, content FROM revisions ORDER BY id DESC LIMIT 1").fetchone()
+        return self.decode(*row) if row else ""
+
+    def revisions(self):
+        """(id, created, words) of every revision, oldest first"""
+        return self.db.execute("SELECT id, created, words FROM revisions ORDER BY id").fetchall()
+
+    def iter_contents(self, newest_first=True):
+        """Yield (id, created, text) one revision at a time"""
+        order = "DESC" if newest_first else "ASC"
+        for revision_id, created, compressed, content in self.db.execute(
+                f"SELECT id, created, compressed, content FROM revisions ORDER BY id {order}"):
+            yield revision_id, created, self.decode(compressed, content)
+
+    def diff(self, old_id, new_id):
+        """Unified diff between two revisions"""
+        old, new = self.get(old_id) or "", self.get(new_id) or ""
+        return "".join(difflib.unified_diff(
+            old.splitlines(keepends=True), new.splitlines(keepends=True),
+            fromfile=f"revision {old_id}", tofile=f"revision {new_id}"))
+
+    def export(self, out):
+        """Write every revision, newest first, to an open file"""
+        for revision_id, created, content in self.iter_contents():
+            out.write(f"<!-- revision {revision_id} ({created}) -->\n\n{content}\n\n")
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM revisions").fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the revision history of a draft")
+    parser.add_argument('history', help="History file, e.g. drafts/draft.history.sqlite3")
+    parser.add_argument('--list', action='store_true', help="List the revisions")
+    parser.add_argument('--show', type=int, metavar='ID', help="Print one revision")
+    parser.add_argument('--diff', type=int, nargs=2, metavar=('OLD', 'NEW'), help="Diff two revisions")
+    parser.add_argument('--export', metavar='FILE', help="Write all revisions, newest first, to FILE ('-' for stdout)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.history):
+        print(f"History file not found: {args.history}")
+        return
+    store = DraftStore(args.history)
+
+    if args.show is not None:
+        content = store.get(args.show)
+        print(content if content is not None else f"No revision {args.show}")
+    elif args.diff:
+        print(store.diff(*args.diff) or "No differences")
+    elif args.export:
+        if args.export == '-':
+            store.export(sys.stdout)
+        else:
+            with open(args.export, 'w') as f:
+                store.export(f)
+            print(f"Exported {len(store)} revisions to {args.export}")
+    else:
+        for revision_id, created, words in store.revisions():
+            print(f"{revision_id:4d}  {created}  {words} words")
+    store.close()
+
+if __name__ == "__main__":
+    main()
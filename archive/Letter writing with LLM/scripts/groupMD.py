@@ -1,12 +1,23 @@
 import os
-import requests
-import json
+import re
+import math
+import argparse
 import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from llm_client import LLMClient, replay_only_enabled
 
 # Configuration
 MD_DIR = "/Applications/renpy-8.0.3-sdk/projects/LetterWriting/JREinfo/Re_ request info about JRE"
 API_KEY_PATH = "/Applications/renpy-8.0.3-sdk/projects/LetterWriting/scripts/API.txt"
 
+MODEL = "x-ai/grok-beta"
+CLUSTER_SIZE = 25  # documents per map-step prompt
+STOP_WORDS = set("""the and for with that this from are was were will can has have had not but all any
+their there they them its into more also such than then these those which who what when where how
+new may should must would could about been being each other our your you his her one two""".split())
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -48,77 +59,247 @@ def extract_summary(md_content):
         return sections[1].strip().replace('\n', ' ')
     return ""
 
-def process_files(api_key, files):
+GROUPING_PROMPT = """Analyze these documents and group them by their content similarity.
+For each document:
+1. List the file name
+2. Keep the summary exactly as provided
+3. Assign a descriptive group name (2-3 words) for documents that belong together
+
+Format each entry exactly like this:
+[FILE_NAME]
+Summary: [EXACT_SUMMARY_TEXT]
+Group: [GROUP_NAME]
+
+Separate entries with a blank line. Only use the format above."""
+
+SYNTHESIS_INSTRUCTIONS = """Focus on one group per paragraph, discussing the files within that group, referencing their file names, and synthesizing their content. Each paragraph should start with the group name in bold, followed by a colon and a space. The synthesis should be 1-2 paragraphs per group, depending on the number of files in the group."""
+
+def format_documents(files):
+    return "\n\n".join([f"Document {i}:\nFilename: {f['file']}\nSummary: {f['summary']}" 
+                         for i, f in enumerate(files, 1)])
+
+def process_files(client, files):
     """
     Process the files using the LLM API.
     
     Args:
-    api_key (str): The API key for authentication.
+    client (LLMClient): The shared, cached LLM client.
     files (list): List of dictionaries containing file information.
     
     Returns:
     str: The processed result from the LLM, or None if an error occurred.
     """
-    prompt = """Analyze these documents and group them by their content similarity.
-For each document:
-1. List the file name
-2. Keep the summary exactly as provided
-3. Assign a descriptive group name (2-3 words) for documents that belong together
+    prompt = GROUPING_PROMPT + """
 
-Format each entry exactly like this:
-[FILE_NAME]
-Summary: [EXACT_SUMMARY_TEXT]
-Group: [GROUP_NAME]
+After the grouped entries, provide a synthesis of the files. """ + SYNTHESIS_INSTRUCTIONS
+
+    full_prompt = f"{prompt}\n\nDocuments to analyze:\n\n{format_documents(files)}"
+
+    # More deterministic output; identical prompts are answered from the cache
+    try:
+        return client.complete(full_prompt, MODEL, temperature=0.3)
+    except Exception as e:
+        logger.error(f"API request failed: {str(e)}")
+        return None
+
+def tokenize(text):
+    return [word for word in re.findall(r"[a-z0-9]+", text.lower()) if len(word) > 2 and word not in STOP_WORDS]
+
+def tfidf_matrix(texts):
+    """
+    Build an L2-normalised TF-IDF matrix (documents x terms) for the summaries.
+    
+    Args:
+    texts (list): The texts to vectorise.
+    
+    Returns:
+    numpy.ndarray: One row per text.
+    """
+    counts = [Counter(tokenize(text)) for text in texts]
+    vocabulary = {}
+    for doc in counts:
+        for term in doc:
+            vocabulary.setdefault(term, len(vocabulary))
+
+    matrix = np.zeros((len(texts), max(len(vocabulary), 1)))
+    for row, doc in enumerate(counts):
+        for term, count in doc.items():
+            matrix[row, vocabulary[term]] = count
+
+    document_frequency = (matrix > 0).sum(axis=0)
+    idf = np.log((1 + len(texts)) / (1 + document_frequency)) + 1
+    matrix = np.log1p(matrix) * idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+def kmeans(matrix, k, iterations=50, seed=0):
+    """
+    Spherical k-means (cosine similarity) with k-means++ seeding.
+    
+    Args:
+    matrix (numpy.ndarray): L2-normalised rows.
+    k (int): Number of clusters.
+    
+    Returns:
+    numpy.ndarray: The cluster label of each row.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(matrix)
+    centers = [matrix[rng.integers(n)]]
+    for _ in range(1, k):
+        distance = np.clip(1 - np.max(matrix @ np.array(centers).T, axis=1), 0, None)
+        total = distance.sum()
+        centers.append(matrix[rng.choice(n, p=distance / total if total > 0 else None)])
+    centers = np.array(centers)
 
-Separate entries with a blank line. Only use the format above.
+    labels = None
+    for _ in range(iterations):
+        new_labels = np.argmax(matrix @ centers.T, axis=1)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for j in range(k):
+            center = matrix[labels == j].sum(axis=0)
+            norm = np.linalg.norm(center)
+            if norm:
+                centers[j] = center / norm
+    return labels
+
+def cluster_files(files, cluster_size=CLUSTER_SIZE):
+    """
+    Group files with similar summaries locally, before any LLM call.
+    
+    Returns:
+    list: Lists of files, none larger than twice the cluster size.
+    """
+    k = max(1, math.ceil(len(files) / cluster_size))
+    labels = kmeans(tfidf_matrix([f['summary'] for f in files]), k)
 
-After the grouped entries, provide a synthesis of the files. Focus on one group per paragraph, discussing the files within that group, referencing their file names, and synthesizing their content. Each paragraph should start with the group name in bold, followed by a colon and a space. The synthesis should be 1-2 paragraphs per group, depending on the number of files in the group."""
+    clusters = [[] for _ in range(k)]
+    for file_info, label in zip(files, labels):
+        clusters[label].append(file_info)
 
-    documents = "\n\n".join([f"Document {i}:\nFilename: {f['file']}\nSummary: {f['summary']}" 
-                           for i, f in enumerate(files, 1)])
+    # k-means clusters can be uneven; split oversized ones so every prompt stays bounded
+    bounded = []
+    for cluster in clusters:
+        for start in range(0, len(cluster), cluster_size * 2):
+            bounded.append(cluster[start:start + cluster_size * 2])
+    return [cluster for cluster in bounded if cluster]
 
-    full_prompt = f"{prompt}\n\nDocuments to analyze:\n\n{documents}"
+def map_cluster(client, files):
+    """Group and synthesize one cluster of files (the map step)"""
+    prompt = GROUPING_PROMPT + """
 
+After the grouped entries, write a line containing only '### Synthesis' and then a synthesis of the files. """ + SYNTHESIS_INSTRUCTIONS
+    full_prompt = f"{prompt}\n\nDocuments to analyze:\n\n{format_documents(files)}"
     try:
-        response = requests.post(
-            url="https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            },
-            data=json.dumps({
-                "model": "x-ai/grok-beta",
-                "messages": [{
-                    "role": "user",
-                    "content": full_prompt
-                }],
-                "temperature": 0.3  # More deterministic output
-            })
-        )
-
-        if response.status_code == 200:
-            return response.json()['choices'][0]['message']['content']
-        else:
-            logger.error(f"API Error ({response.status_code}): {response.text}")
-            return None
-    except requests.RequestException as e:
+        result = client.complete(full_prompt, MODEL, temperature=0.3)
+    except Exception as e:
         logger.error(f"API request failed: {str(e)}")
         return None
+    if result is None:
+        return None
+    entries, _, synthesis = result.partition("### Synthesis")
+    return {'entries': entries.strip(), 'synthesis': synthesis.strip()}
+
+def reduce_clusters(client, cluster_results):
+    """
+    Merge the per-cluster groups and syntheses into one result (the reduce step).
+    
+    Only group names and synthesis paragraphs are sent, so the reduce prompt
+    stays small however many files were grouped.
+    """
+    group_counts = Counter()
+    for result in cluster_results:
+        group_counts.update(re.findall(r"^Group:\s*(.+?)\s*$", result['entries'], re.MULTILINE))
+
+    groups = "\n".join(f"- {name} ({count} files)" for name, count in group_counts.most_common())
+    syntheses = "\n\n".join(result['synthesis'] for result in cluster_results if result['synthesis'])
+
+    prompt = f"""Several batches of documents were grouped separately, so groups about the same topic may have different names.
+
+1. Under a line containing only '### Group Mapping', list every group name below as 'Old Name -> Final Name', merging groups that cover the same topic.
+2. Under a line containing only '### Synthesis', write the final synthesis. {SYNTHESIS_INSTRUCTIONS} Use the final group names and combine the batch syntheses below.
+
+Groups:
+{groups}
+
+Batch syntheses:
+
+{syntheses}"""
+
+    try:
+        result = client.complete(prompt, MODEL, temperature=0.3)
+    except Exception as e:
+        logger.error(f"API request failed: {str(e)}")
+        result = None
+    if result is None:
+        return None, syntheses
+
+    mapping_text, _, synthesis = result.partition("### Synthesis")
+    mapping = {}
+    for old, new in re.findall(r"^\s*-?\s*(.+?)\s*->\s*(.+?)\s*$", mapping_text, re.MULTILINE):
+        mapping[old.strip('*')] = new.strip('*')
+    return mapping, synthesis.strip()
+
+def process_files_hierarchical(client, files, cluster_size=CLUSTER_SIZE, workers=4):
+    """
+    Group a large set of files with map-reduce.
+    
+    Files are clustered locally with TF-IDF and k-means, each cluster is sent to
+    the LLM in parallel, and the cluster results are merged in a reduce step,
+    so no prompt grows with the total number of files.
+    
+    Returns:
+    str: The grouped entries followed by the synthesis, or None if an error occurred.
+    """
+    clusters = cluster_files(files, cluster_size)
+    logger.info(f"Clustered {len(files)} files into {len(clusters)} groups of similar documents")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        cluster_results = list(executor.map(lambda cluster: map_cluster(client, cluster), clusters))
+
+    if any(result is None for result in cluster_results):
+        logger.error("At least one cluster could not be processed")
+        return None
+
+    mapping, synthesis = reduce_clusters(client, cluster_results)
+    if mapping is None:
+        logger.warning("Reduce step failed; keeping the per-cluster group names")
+        mapping = {}
+
+    def rename(match):
+        return f"Group: {mapping.get(match.group(1), match.group(1))}"
+
+    entries = "\n\n".join(re.sub(r"^Group:\s*(.+?)\s*$", rename, result['entries'], flags=re.MULTILINE)
+                           for result in cluster_results)
+    return f"{entries}\n\n{synthesis}"
 
 def main():
     """
     Main function to process markdown files and generate grouped summaries.
     """
+    parser = argparse.ArgumentParser(description="Group markdown summaries by topic with an LLM")
+    parser.add_argument('--md-dir', default=MD_DIR, help="Folder of markdown files")
+    parser.add_argument('--mode', choices=['auto', 'single', 'hierarchical'], default='auto',
+                        help="single: one prompt; hierarchical: cluster locally, map in parallel, then reduce")
+    parser.add_argument('--cluster-size', type=int, default=CLUSTER_SIZE, help="Documents per map-step prompt")
+    parser.add_argument('--workers', type=int, default=4, help="Concurrent LLM requests in the map step")
+    args = parser.parse_args()
+    md_dir = args.md_dir
+
     # Get API key
     api_key = read_api_key()
-    if not api_key:
+    if not api_key and not replay_only_enabled():
         return
+    client = LLMClient(api_key)
 
     # Find markdown files
     files = []
-    for fname in os.listdir(MD_DIR):
+    for fname in sorted(os.listdir(md_dir)):
         if fname.lower().endswith('.md'):
-            path = os.path.join(MD_DIR, fname)
+            path = os.path.join(md_dir, fname)
             try:
                 with open(path, 'r') as f:
                     content = f.read()
@@ -135,10 +316,14 @@ def main():
     logger.info(f"Processing {len(files)} files...")
 
     # Process through LLM
-    result = process_files(api_key, files)
+    if args.mode == 'hierarchical' or (args.mode == 'auto' and len(files) > args.cluster_size):
+        result = process_files_hierarchical(client, files, args.cluster_size, args.workers)
+    else:
+        result = process_files(client, files)
+    logger.info(client.summary())
 
     if result:
-        output_file = os.path.join(MD_DIR, "grouped_files_with_synthesis.txt")
+        output_file = os.path.join(md_dir, "grouped_files_with_synthesis.txt")
         try:
             with open(output_file, 'w') as f:
                 f.write(result)
@@ -1,6 +1,5 @@
 import os
-import requests
-import json
+from llm_client import LLMClient, replay_only_enabled
 
 # Configuration
 MD_DIR = "/Applications/renpy-8.0.3-sdk/projects/LetterWriting/JREinfo/Re_ request info about JRE"
@@ -21,7 +20,7 @@ def extract_summary(md_content):
         return sections[1].strip().replace('\n', ' ')
     return ""
 
-def process_files(api_key, files):
+def process_files(client, files):
     prompt = """Analyze these documents and group them by their content similarity. 
 For each document:
 1. List the file name
@@ -41,26 +40,7 @@ Separate entries with a blank line. Only use the format above."""
     full_prompt = f"{prompt}\n\nDocuments to analyze:\n\n{documents}"
 
     try:
-        response = requests.post(
-            url="https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            },
-            data=json.dumps({
-                "model": "x-ai/grok-beta",
-                "messages": [{
-                    "role": "user",
-                    "content": full_prompt
-                }],
-                "temperature": 0.3  # More deterministic output
-            })
-        )
-
-        if response.status_code == 200:
-            return response.json()['choices'][0]['message']['content']
-        print(f"API Error ({response.status_code}): {response.text}")
-        return None
+        return client.complete(full_prompt, "x-ai/grok-beta", temperature=0.3)  # More deterministic output
     except Exception as e:
         print(f"API request failed: {str(e)}")
         return None
@@ -68,8 +48,9 @@ Separate entries with a blank line. Only use the format above."""
 def main():
     # Get API key
     api_key = read_api_key()
-    if not api_key:
+    if not api_key and not replay_only_enabled():
         return
+    client = LLMClient(api_key)
 
     # Find markdown files
     files = []
@@ -89,7 +70,8 @@ def main():
     print(f"Processing {len(files)} files...")
     
     # Process through LLM
-    result = process_files(api_key, files)
+    result = process_files(client, files)
+    client.print_stats()
     
     if result:
         output_file = os.path.join(MD_DIR, "grouped_files.txt")
@@ -0,0 +1,287 @@
+import os
+import time
+import asyncio
+import json
+import random
+import sqlite3
+import hashlib
+import threading
+import requests
+
+# Shared chat-completions client for the letter-writing scripts.
+# Responses are cached in a small SQLite file keyed on the model, the
+# temperature and a hash of the request, so re-running a batch does not
+# re-bill or re-wait for prompts that were already answered.
+#
+# Environment settings:
+#   OPENROUTER_API_URL  endpoint (e.g. a local stub for testing)
+#   LLM_CACHE_PATH      cache file (default: .llm_cache.sqlite3 next to this file)
+#   LLM_CACHE_SIZE      number of responses kept, least recently used evicted first
+#   LLM_REPLAY_ONLY=1   answer only from the cache, never call the API
+#   LLM_NO_CACHE=1      bypass the cache entirely
+
+API_URL = os.environ.get("OPENROUTER_API_URL", "https://openrouter.ai/api/v1/chat/completions")
+CACHE_PATH = os.environ.get("LLM_CACHE_PATH",
+                            os.path.join(os.path.dirname(os.path.abspath(__file__)), ".llm_cache.sqlite3"))
+CACHE_SIZE = int(os.environ.get("LLM_CACHE_SIZE", "2000"))
+MAX_RETRIES = 5
+
+class StreamInterrupted(Exception):
+    """A streamed response broke off before the server finished it"""
+
+def replay_only_enabled():
+    return os.environ.get("LLM_REPLAY_ONLY", "") not in ("", "0")
+
+def cache_disabled():
+    return os.environ.get("LLM_NO_CACHE", "") not in ("", "0")
+
+def prompt_hash(payload):
+    """Hash of everything in the request besides model and temperature"""
+    rest = {k: v for k, v in payload.items() if k not in ("model", "temperature")}
+    return hashlib.sha256(json.dumps(rest, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """Persistent LRU cache of LLM responses in SQLite"""
+
+    def __init__(self, path=CACHE_PATH, max_entries=CACHE_SIZE):
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS responses (
+            model TEXT, temperature TEXT, prompt_hash TEXT,
+            response TEXT, latency REAL, created REAL, last_used REAL,
+            PRIMARY KEY (model, temperature, prompt_hash))""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.db.commit()
+
+    def get(self, key):
+        """Return (response, latency of the original call) or None"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT response, latency FROM responses WHERE model=? AND temperature=? AND prompt_hash=?",
+                key).fetchone()
+            if row:
+                self.db.execute(
+                    "UPDATE responses SET last_used=? WHERE model=? AND temperature=? AND prompt_hash=?",
+                    (time.time(),) + key)
+                self.db.commit()
+            return row
+
+    def put(self, key, response, latency):
+        with self.lock:
+            now = time.time()
+            self.db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            key + (response, latency, now, now))
+            # Evict the least recently used responses beyond the size limit
+            self.db.execute("""DELETE FROM responses WHERE rowid IN (
+                SELECT rowid FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)""",
+                            (self.max_entries,))
+            self.db.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+class LLMClient:
+    """Chat-completions client with a persistent response cache, retries and metrics"""
+
+    def __init__(self, api_key, api_url=API_URL, cache_path=CACHE_PATH, cache_size=CACHE_SIZE,
+                 replay_only=None, use_cache=None, max_retries=MAX_RETRIES, timeout=300, extra_headers=None):
+        self.api_key = api_key
+        self.api_url = api_url
+        self.replay_only = replay_only_enabled() if replay_only is None else replay_only
+        use_cache = not cache_disabled() if use_cache is None else use_cache
+        self.cache = ResponseCache(cache_path, cache_size) if use_cache or self.replay_only else None
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.extra_headers = extra_headers or {}
+        self.local = threading.local()
+        self.stats_lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'replay_misses': 0, 'api_calls': 0,
+                      'errors': 0, 'api_seconds': 0.0, 'seconds_saved': 0.0}
+
+    def count(self, name, amount=1):
+        with self.stats_lock:
+            self.stats[name] += amount
+
+    def session(self):
+        # One keep-alive session per thread
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def lookup(self, messages, model, temperature, options):
+        """Build the request payload and cache key; returns (payload, key, cached response or None)"""
+        payload = {"model": model, "messages": messages}
+        if temperature is not None:
+            payload["temperature"] = temperature
+        payload.update(options)
+
+        key = (model, repr(temperature), prompt_hash(payload))
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached:
+                self.count('hits')
+                self.count('seconds_saved', cached[1] or 0.0)
+                return payload, key, cached[0]
+            self.count('misses')
+        return payload, key, None
+
+    def chat(self, messages, model, temperature=None, **options):
+        """Return the assistant message for a chat request, or None on failure"""
+        payload, key, cached = self.lookup(messages, model, temperature, options)
+        if cached is not None:
+            return cached
+
+        if self.replay_only:
+            self.count('replay_misses')
+            print("Replay-only mode: no cached response for this request")
+            return None
+
+        started = time.time()
+        content = self.post(payload)
+        latency = time.time() - started
+        if content is not None and self.cache is not None:
+            self.cache.put(key, content, latency)
+        return content
+
+    def complete(self, prompt, model, temperature=None, **options):
+        """Shortcut for a single user message"""
+        return self.chat([{"role": "user", "content": prompt}], model, temperature, **options)
+
+    def stream_chat(self, messages, model, temperature=None, **options):
+        """
+        Yield the assistant message in pieces as the server streams it (SSE).
+        Cached responses are yielded in one piece; the full streamed text is cached.
+        Raises StreamInterrupted if the stream breaks off before it is finished,
+        so the pieces already yielded are never mistaken for the whole message.
+        """
+        payload, key, cached = self.lookup(messages, model, temperature, options)
+        if cached is not None:
+            yield cached
+            return
+
+        if self.replay_only:
+            self.count('replay_misses')
+            print("Replay-only mode: no cached response for this request")
+            return
+
+        started = time.time()
+        response = self.send(dict(payload, stream=True), stream=True)
+        if response is None:
+            return
+
+        pieces = []
+        finished = False
+        with response:
+            # Server-sent events are UTF-8 whatever the Content-Type says
+            response.encoding = 'utf-8'
+            try:
+                for line in response.iter_lines(decode_unicode=True):
+                    # Skip keep-alive blank lines and ': comment' lines
+                    if not line or not line.startswith('data:'):
+                        continue
+                    data = line[len('data:'):].strip()
+                    if data == '[DONE]':
+                        finished = True
+                        break
+                    choices = json.loads(data).get('choices') or [{}]
+                    piece = (choices[0].get('delta') or {}).get('content')
+                    if piece:
+                        pieces.append(piece)
+                        yield piece
+                    finished = finished or bool(choices[0].get('finish_reason'))
+            except (requests.RequestException, ValueError, AttributeError) as e:
+                self.count('errors')
+                raise StreamInterrupted(str(e)) from e
+            if not finished:
+                self.count('errors')
+                raise StreamInterrupted("connection closed before the response was finished")
+
+        content = "".join(pieces)
+        if content and self.cache is not None:
+            self.cache.put(key, content, time.time() - started)
+
+    async def astream_chat(self, messages, model, temperature=None, **options):
+        """Async version of stream_chat; the HTTP stream is read in a worker thread"""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        finished = object()
+
+        def pump():
+            try:
+                for piece in self.stream_chat(messages, model, temperature, **options):
+                    loop.call_soon_threadsafe(queue.put_nowait, piece)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, finished)
+
+        reader = loop.run_in_executor(None, pump)
+        while True:
+            piece = await queue.get()
+            if piece is finished:
+                break
+            yield piece
+        await reader
+
+    def send(self, payload, stream=False):
+        """Send a request, retrying rate limits, server errors and network failures with backoff.
+        Returns the successful response, or None."""
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+        headers.update(self.extra_headers)
+
+        for attempt in range(self.max_retries):
+            started = time.time()
+            try:
+                self.count('api_calls')
+                response = self.session().post(url=self.api_url, headers=headers, data=json.dumps(payload),
+                                               timeout=self.timeout, stream=stream)
+                self.count('api_seconds', time.time() - started)
+                if response.status_code == 200:
+                    return response
+                if response.status_code != 429 and response.status_code < 500:
+                    print(f"API Error ({response.status_code}): {response.text}")
+                    self.count('errors')
+                    return None
+                retry_after = response.headers.get('Retry-After', '')
+                delay = float(retry_after) if retry_after.isdigit() else 2 ** attempt
+                response.close()
+            except requests.RequestException as e:
+                self.count('api_seconds', time.time() - started)
+                print(f"API request failed: {str(e)}")
+                delay = 2 ** attempt
+            time.sleep(delay + random.uniform(0, 1))
+
+        print(f"Giving up after {self.max_retries} attempts")
+        self.count('errors')
+        return None
+
+    def post(self, payload):
+        """Send a request and return the assistant message, or None"""
+        response = self.send(payload)
+        if response is None:
+            return None
+        try:
+            return response.json()['choices'][0]['message']['content']
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            print(f"Unexpected API response ({type(e).__name__}: {str(e)}): {response.text[:200]}")
+            self.count('errors')
+            return None
+
+    def summary(self):
+        s = self.stats
+        lookups = s['hits'] + s['misses']
+        hit_rate = f"{100 * s['hits'] / lookups:.0f}%" if lookups else "n/a"
+        return (f"LLM cache: {s['hits']} hits, {s['misses']} misses ({hit_rate} hit rate), "
+                f"{s['api_calls']} API calls in {s['api_seconds']:.1f}s, ~{s['seconds_saved']:.1f}s saved"
+                + (f", {s['replay_misses']} not replayable" if s['replay_misses'] else ""))
+
+    def print_stats(self):
+        print(self.summary())
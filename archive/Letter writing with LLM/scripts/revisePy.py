@@ -1,10 +1,9 @@
 import os
 import re
-import json
 import uuid
-import requests
+from llm_client import LLMClient, replay_only_enabled
 
-def process_file_with_llm(api_key, file_path, prompt):
+def process_file_with_llm(client, file_path, prompt):
     # Create backup of original file
     backup_id = uuid.uuid4().hex[:6]
     backup_path = f"{file_path}_backup_{backup_id}"
@@ -14,39 +13,22 @@ def process_file_with_llm(api_key, file_path, prompt):
     with open(backup_path, 'r') as f:
         original_code = f.read()
     
-    # Create API request
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-        "HTTP-Referer": "<YOUR_SITE_URL>",
-        "X-Title": "<YOUR_SITE_NAME>",
-    }
+    messages = [
+        {"role": "system", "content": "You are a Python expert. Please help modify this code."},
+        {"role": "user", "content": f"Original code:\n{original_code}\n\nUser request: {prompt}"}
+    ]
     
-    data = {
-        "model": "x-ai/grok-2-1212",
-        "messages": [
-            {"role": "system", "content": "You are a Python expert. Please help modify this code."},
-            {"role": "user", "content": f"Original code:\n{original_code}\n\nUser request: {prompt}"}
-        ],
-        "temperature": 0.3
-    }
-    
-    # Send to LLM
-    response = requests.post(
-        "https://openrouter.ai/api/v1/chat/completions",
-        headers=headers,
-        data=json.dumps(data)
-    )
+    # Send to LLM (the same code and request are answered from the cache)
+    try:
+        ai_response = client.chat(messages, "x-ai/grok-2-1212", temperature=0.3)
+    except Exception as e:
+        print(f"API request failed: {str(e)}")
+        ai_response = None
     
-    if response.status_code != 200:
-        print(f"API Error: {response.status_code} - {response.text}")
+    if ai_response is None:
         os.rename(backup_path, file_path)  # Restore original
         return False
     
-    # Process response
-    result = response.json()
-    ai_response = result['choices'][0]['message']['content']
-    
     # Extract code blocks and comment non-code
     code_pattern = r'```python(.*?)```'
     matches = re.findall(code_pattern, ai_response, re.DOTALL)
@@ -98,8 +80,12 @@ def main():
     
     # Read API key
     api_key = read_api_key(api_key_path)
-    if not api_key:
+    if not api_key and not replay_only_enabled():
         return
+    client = LLMClient(api_key, extra_headers={
+        "HTTP-Referer": "<YOUR_SITE_URL>",
+        "X-Title": "<YOUR_SITE_NAME>",
+    })
     
     # Get the file path and prompt from the user
     file_path, prompt = get_input_from_user()
@@ -107,7 +93,8 @@ def main():
         return
     
     print(f"Processing {file_path}...")
-    success = process_file_with_llm(api_key, file_path, prompt)
+    success = process_file_with_llm(client, file_path, prompt)
+    client.print_stats()
     
     if success:
         print(f"Successfully updated {file_path}")
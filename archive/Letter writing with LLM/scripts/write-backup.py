@@ -1,8 +1,8 @@
 import os
-import requests
-import json
 from datetime import datetime
 import textwrap
+from llm_client import LLMClient, replay_only_enabled
+from draft_store import DraftStore, history_path, split_legacy_draft
 
 # Configuration
 API_KEY_PATH = "/Applications/renpy-8.0.3-sdk/projects/LetterWriting/scripts/API.txt"
@@ -14,6 +14,7 @@ FILES = {
     'draft': 'draft.txt'
 }
 WRAP_WIDTH = 80  # Set the desired line width for wrapping
+LEGACY_HISTORY_MARKER = "=== Previous Versions ==="  # drafts used to carry their whole history
 
 def read_api_key():
     try:
@@ -35,7 +36,7 @@ def read_file_content(filename):
 def count_words(text):
     return len(text.split())
 
-def process_draft(api_key, context, genre, instructions, existing_draft):
+def process_draft(client, context, genre, instructions, existing_draft):
     task_type = "REVISE" if existing_draft else "GENERATE"
     
     prompt = f"""**Writing Task {task_type}**
@@ -55,46 +56,37 @@ Author Instructions:
         prompt += "\n\nPlease create a new draft according to the specifications."
 
     try:
-        response = requests.post(
-            url="https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            },
-            data=json.dumps({
-                "model": "x-ai/grok-beta",
-                "messages": [{
-                    "role": "user",
-                    "content": prompt
-                }],
-                "temperature": 0.7,
-                "max_tokens": 2000
-            })
-        )
-
-        if response.status_code == 200:
-            print("Draft processing complete with status: Success 🚀")
-            return response.json()['choices'][0]['message']['content']
-        print(f"API Error ({response.status_code}): {response.text}")
-        return None
+        content = client.complete(prompt, "x-ai/grok-beta", temperature=0.7, max_tokens=2000)
     except Exception as e:
         print(f"API request failed: {str(e)}")
         return None
+    if content is not None:
+        print("Draft processing complete with status: Success 🚀")
+    return content
 
-def update_draft_file(new_content, existing_content):
+def load_latest_draft(store):
+    """Latest draft to revise; older versions and manual edits go into the history store"""
+    existing_draft = read_file_content(FILES['draft']) or ""
+    latest, previous = split_legacy_draft(existing_draft, LEGACY_HISTORY_MARKER)
+    if previous and not len(store):
+        store.add(previous, created="before history store")
+    if latest and latest != store.latest().strip():
+        store.add(latest)
+    return latest
+
+def update_draft_file(new_content, store, draft_path):
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     version_header = f"=== Revised Version ({timestamp}) ===\n"
-    
-    if existing_content:
-        version_history = f"\n\n\n=== Previous Versions ===\n{existing_content}"
-    else:
-        version_history = ""
 
     # Wrap the text
     wrapped_new_content = textwrap.fill(new_content, width=WRAP_WIDTH)
-    wrapped_version_history = textwrap.fill(existing_content, width=WRAP_WIDTH)
 
-    return f"{version_header}{wrapped_new_content}{version_history}"
+    # The draft file holds only the newest revision; earlier ones stay in the store
+    updated_content = f"{version_header}{wrapped_new_content}"
+    store.add(updated_content)
+    with open(draft_path, 'w') as f:
+        f.write(updated_content)
+    return updated_content
 
 def main():
     # Verify all files exist
@@ -105,37 +97,40 @@ def main():
     
     # Read API key
     api_key = read_api_key()
-    if not api_key:
+    if not api_key and not replay_only_enabled():
         return
+    client = LLMClient(api_key)
 
     # Read all files
     context = read_file_content(FILES['context'])
     genre = read_file_content(FILES['genre'])
     instructions = read_file_content(FILES['instructions'])
-    existing_draft = read_file_content(FILES['draft']) or ""
 
     if None in [context, genre, instructions]:
         return
 
+    draft_path = os.path.join(DRAFT_DIR, FILES['draft'])
+    store = DraftStore(history_path(draft_path))
+    existing_draft = load_latest_draft(store)
+
     # Process draft
     print(f"Processing {'revision' if existing_draft else 'new draft'}...")
-    new_content = process_draft(api_key, context, genre, instructions, existing_draft)
+    new_content = process_draft(client, context, genre, instructions, existing_draft)
     
     if not new_content:
         print("Processing failed")
         return
 
     # Update draft file
-    draft_path = os.path.join(DRAFT_DIR, FILES['draft'])
-    updated_content = update_draft_file(new_content, existing_draft)
-    
-    with open(draft_path, 'w') as f:
-        f.write(updated_content)
+    updated_content = update_draft_file(new_content, store, draft_path)
     
     # Display draft statistics
     word_count = count_words(updated_content)
     print(f"\nSuccessfully updated draft at:\n{draft_path}")
     print(f"Word Count: {word_count}")
+    print(f"Revisions in history: {len(store)} ({history_path(draft_path)})")
+    store.close()
+    client.print_stats()
 
 if __name__ == "__main__":
     main()
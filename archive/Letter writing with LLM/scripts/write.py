@@ -1,10 +1,12 @@
 # https://grok.com/share/bGVnYWN5_9c095662-912b-4ea9-a0a6-847a77d8d1c8 
 
 import os
-import requests
-import json
+import time
+import asyncio
 from datetime import datetime
 import textwrap
+from llm_client import LLMClient, StreamInterrupted, replay_only_enabled
+from draft_store import DraftStore, history_path, split_legacy_draft
 
 # Configuration
 API_KEY_PATH = "/Applications/renpy-8.0.3-sdk/projects/LetterWriting/scripts/API.txt"
@@ -15,7 +17,11 @@ FILES = {
     'instructions': 'Instructions.txt',
     'draft': 'draft.md'
 }
+PARTIAL_DRAFT = 'draft.partial.md'  # written while the response streams in
+PARTIAL_INTERVAL = 0.5              # seconds between partial draft writes
 WRAP_WIDTH = 80
+MODEL = "x-ai/grok-beta"
+LEGACY_HISTORY_MARKER = "# Previous Versions"  # drafts used to carry their whole history
 
 def read_api_key():
     try:
@@ -37,7 +43,7 @@ def read_file_content(filename):
 def count_words(text):
     return len(text.split())
 
-def process_draft(api_key, context, genre, instructions, existing_draft):
+def build_prompt(context, genre, instructions, existing_draft):
     task_type = "REVISE" if existing_draft else "GENERATE"
     
     # Construct prompt without f-string backslash issues
@@ -64,53 +70,99 @@ def process_draft(api_key, context, genre, instructions, existing_draft):
         prompt += f"{existing_draft}"
     else:
         prompt += "Create a new draft according to the specifications:"
+    return prompt
+
+class SectionParser:
+    """Split a response into its sections as it arrives, one complete line at a time"""
+
+    HEADINGS = {
+        '# Outline': 'outline',
+        '# Drafting Process': 'process',
+        '# Draft': 'draft',
+        '# Questions': 'questions'
+    }
+
+    def __init__(self):
+        self.sections = {'outline': '', 'process': '', 'draft': '', 'questions': []}
+        self.current_section = None
+        self.pending = ''
+
+    def add_line(self, line):
+        if line.strip() in self.HEADINGS:
+            self.current_section = self.HEADINGS[line.strip()]
+        elif self.current_section and line.strip():
+            if self.current_section == 'questions':
+                if len(self.sections['questions']) < 3:
+                    self.sections['questions'].append(line.strip())
+            else:
+                self.sections[self.current_section] += line.strip() + '\n'
+
+    def feed(self, text):
+        # Keep the unfinished last line until the rest of it arrives
+        lines = (self.pending + text).split('\n')
+        self.pending = lines.pop()
+        for line in lines:
+            self.add_line(line)
+
+    def close(self):
+        if self.pending:
+            self.add_line(self.pending)
+            self.pending = ''
+        return self.sections
+
+def write_partial_draft(sections):
+    partial_path = os.path.join(DRAFT_DIR, PARTIAL_DRAFT)
+    with open(partial_path, 'w') as f:
+        f.write(render_revision(sections))
+
+async def stream_draft(client, prompt):
+    """
+    Print the response as it streams in, writing partial drafts along the way.
+    Returns None if the stream broke off; the partial draft is then left in place.
+    """
+    parser = SectionParser()
+    pieces = []
+    started = time.time()
+    last_write = started
 
     try:
-        response = requests.post(
-            url="https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            },
-            data=json.dumps({
-                "model": "x-ai/grok-beta",
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.7,
-                "max_tokens": 2000
-            })
-        )
-
-        if response.status_code == 200:
-            print("Draft processing complete with status: Success 🚀")
-            return response.json()['choices'][0]['message']['content']
-        print(f"API Error ({response.status_code}): {response.text}")
-        return None
-    except Exception as e:
-        print(f"API request failed: {str(e)}")
+        async for piece in client.astream_chat([{"role": "user", "content": prompt}], MODEL,
+                                               temperature=0.7, max_tokens=2000):
+            if not pieces:
+                print(f"First output after {time.time() - started:.2f}s\n")
+            print(piece, end='', flush=True)
+            pieces.append(piece)
+
+            section_before = parser.current_section
+            parser.feed(piece)
+            now = time.time()
+            if parser.current_section != section_before or now - last_write >= PARTIAL_INTERVAL:
+                write_partial_draft(parser.sections)
+                last_write = now
+    except StreamInterrupted as e:
+        if pieces:
+            write_partial_draft(parser.sections)
+            print(f"\n\nStream interrupted: {str(e)}")
+            print(f"What arrived is kept in {os.path.join(DRAFT_DIR, PARTIAL_DRAFT)}; {FILES['draft']} is unchanged")
+        else:
+            print(f"Stream interrupted: {str(e)}")
         return None
 
+    if pieces:
+        print(f"\n\nResponse complete after {time.time() - started:.2f}s")
+    return "".join(pieces) or None
+
+def process_draft(client, context, genre, instructions, existing_draft):
+    prompt = build_prompt(context, genre, instructions, existing_draft)
+    content = asyncio.run(stream_draft(client, prompt))
+    if content is not None:
+        print("Draft processing complete with status: Success 🚀")
+    return content
+
 def extract_sections(response_content):
-    sections = {'outline': '', 'process': '', 'draft': '', 'questions': []}
-    current_section = None
-    lines = response_content.split('\n')
-    
-    for line in lines:
-        if line.strip() == '# Outline':
-            current_section = 'outline'
-        elif line.strip() == '# Drafting Process':
-            current_section = 'process'
-        elif line.strip() == '# Draft':
-            current_section = 'draft'
-        elif line.strip() == '# Questions':
-            current_section = 'questions'
-        elif current_section and line.strip():
-            if current_section == 'questions':
-                if len(sections['questions']) < 3:
-                    sections['questions'].append(line.strip())
-            else:
-                sections[current_section] += line.strip() + '\n'
-    
-    return sections
+    parser = SectionParser()
+    parser.feed(response_content)
+    return parser.close()
 
 def update_instructions_file(questions):
     instructions_path = os.path.join(DRAFT_DIR, FILES['instructions'])
@@ -125,17 +177,31 @@ def update_instructions_file(questions):
     except Exception as e:
         print(f"Failed to update Instructions.txt: {str(e)}")
 
-def update_draft_file(sections, existing_content):
+def render_revision(sections):
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
     new_content = f"# Revised Version ({timestamp})\n\n"
     new_content += "# Outline\n\n" + textwrap.fill(sections['outline'].strip(), width=WRAP_WIDTH) + "\n\n"
     new_content += "# Drafting Process\n\n" + textwrap.fill(sections['process'].strip(), width=WRAP_WIDTH) + "\n\n"
     new_content += "# Draft\n\n" + textwrap.fill(sections['draft'].strip(), width=WRAP_WIDTH) + "\n\n"
-    
-    if existing_content:
-        new_content += "# Previous Versions\n\n" + existing_content
-    
+    return new_content
+
+def load_latest_draft(store):
+    """Latest draft to revise; older versions and manual edits go into the history store"""
+    existing_draft = read_file_content(FILES['draft']) or ""
+    latest, previous = split_legacy_draft(existing_draft, LEGACY_HISTORY_MARKER)
+    if previous and not len(store):
+        store.add(previous, created="before history store")
+    if latest and latest != store.latest().strip():
+        store.add(latest)
+    return latest
+
+def update_draft_file(sections, store, draft_path):
+    # The draft file holds only the newest revision; earlier ones stay in the store
+    new_content = render_revision(sections)
+    store.add(new_content)
+    with open(draft_path, 'w') as f:
+        f.write(new_content)
     return new_content
 
 def main():
@@ -145,19 +211,23 @@ def main():
             return
     
     api_key = read_api_key()
-    if not api_key:
+    if not api_key and not replay_only_enabled():
         return
+    client = LLMClient(api_key)
 
     context = read_file_content(FILES['context'])
     genre = read_file_content(FILES['genre'])
     instructions = read_file_content(FILES['instructions'])
-    existing_draft = read_file_content(FILES['draft']) or ""
 
     if None in [context, genre, instructions]:
         return
 
+    draft_path = os.path.join(DRAFT_DIR, FILES['draft'])
+    store = DraftStore(history_path(draft_path))
+    existing_draft = load_latest_draft(store)
+
     print(f"Processing {'revision' if existing_draft else 'new draft'}...")
-    response_content = process_draft(api_key, context, genre, instructions, existing_draft)
+    response_content = process_draft(client, context, genre, instructions, existing_draft)
     
     if not response_content:
         print("Processing failed")
@@ -167,15 +237,18 @@ def main():
     if sections['questions']:
         update_instructions_file(sections['questions'])
 
-    draft_path = os.path.join(DRAFT_DIR, FILES['draft'])
-    updated_content = update_draft_file(sections, existing_draft)
-    
-    with open(draft_path, 'w') as f:
-        f.write(updated_content)
+    update_draft_file(sections, store, draft_path)
+
+    partial_path = os.path.join(DRAFT_DIR, PARTIAL_DRAFT)
+    if os.path.exists(partial_path):
+        os.remove(partial_path)
     
     draft_word_count = count_words(sections['draft'])
     print(f"\nSuccessfully updated draft at:\n{draft_path}")
     print(f"Draft Word Count: {draft_word_count}")
+    print(f"Revisions in history: {len(store)} ({history_path(draft_path)})")
+    store.close()
+    client.print_stats()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,36 +1,273 @@
 import requests
-from bs4 import BeautifulSoup
 import csv
+import os
+import re
+import json
+import html
+import time
+import argparse
+import codecs
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-def check_math_genealogy_id(id):
-    url = f"https://genealogy.math.ndsu.nodak.edu/id.php?id={id}"
+BASE_URL = "https://genealogy.math.ndsu.nodak.edu/id.php?id={id}"
+TITLE_SUFFIX = " - The Mathematics Genealogy Project"
+TITLE_PATTERN = re.compile(rb'<title[^>]*>(.*?)</title>', re.IGNORECASE | re.DOTALL)
+HEADER_CHARSET = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+HEAD_BYTES = 16384       # the <title> is near the top; never read more than this
+CHUNK_BYTES = 2048
+TIMEOUT = 10
+CHECKPOINT_EVERY = 200   # rows written between checkpoints
+
+def make_session(pool_size=10):
+    """Keep-alive session that retries rate limits and server errors with backoff"""
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504],
+                  allowed_methods=["GET"], respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def read_title(response, max_bytes=HEAD_BYTES):
+    """Read the response only until its <title> is complete, without parsing the page"""
+    head = b""
+    for chunk in response.iter_content(CHUNK_BYTES):
+        head += chunk
+        match = TITLE_PATTERN.search(head)
+        if match:
+            encoding = page_encoding(response, head)
+            return html.unescape(match.group(1).decode(encoding, errors='replace')).strip()
+        if len(head) >= max_bytes:
+            break
+    return ""
+
+def page_encoding(response, head):
+    """Charset named in the Content-Type header, else in a <meta> tag, else UTF-8.
+    Not response.encoding: requests reports ISO-8859-1 for any text/html without a charset."""
+    match = HEADER_CHARSET.search(response.headers.get('Content-Type', '')) or META_CHARSET.search(head)
+    if match:
+        encoding = match.group(1)
+        encoding = encoding.decode('ascii') if isinstance(encoding, bytes) else encoding
+        try:
+            return codecs.lookup(encoding).name
+        except LookupError:
+            pass
+    return 'utf-8'
+
+def check_math_genealogy_id(id, session=None, base_url=BASE_URL):
+    """Return (name, url, status) where status is 'Valid', 'Invalid' or 'Error'"""
+    url = base_url.format(id=id)
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        title = soup.title.string if soup.title else ""
-        if " - The Mathematics Genealogy Project" in title:
-            name = title.split(' - The Mathematics Genealogy Project')[0].strip()
-            return name, url
-        else:
-            return None, url
+        with (session or requests).get(url, timeout=TIMEOUT, stream=True) as response:
+            response.raise_for_status()
+            title = read_title(response)
     except requests.RequestException:
-        return None, url
+        return None, url, 'Error'
+
+    if TITLE_SUFFIX in title:
+        name = title.split(TITLE_SUFFIX)[0].strip()
+        return name, url, 'Valid'
+    return None, url, 'Invalid'
 
 def generate_spreadsheet(start_id, end_id, filename='math_genealogy.csv'):
     with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
         writer = csv.writer(csvfile)
         writer.writerow(['Link', 'Name'])  # Header
-        
+
+        session = make_session(1)
         for id in range(start_id, end_id + 1):
-            name, link = check_math_genealogy_id(id)
+            name, link, _ = check_math_genealogy_id(id, session)
             if name:
                 writer.writerow([link, name])
             else:
                 writer.writerow([link, ''])  # If no name found, leave name column blank
 
-# Example usage
-start_id = 16848  # Example starting ID
-end_id = 16850    # Example ending ID, adjust as needed
-generate_spreadsheet(start_id, end_id)
\ No newline at end of file
+class RateLimiter:
+    """Space requests evenly across all threads, at most `rate` per second"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.lock = threading.Lock()
+        self.next_slot = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class ReorderBuffer:
+    """Hold results that finish early until every lower ID has been written"""
+
+    def __init__(self, next_id):
+        self.next_id = next_id
+        self.pending = {}
+
+    def push(self, id, row):
+        """Add one result; returns the rows that can now be written, in ID order"""
+        self.pending[id] = row
+        ready = []
+        while self.next_id in self.pending:
+            ready.append(self.pending.pop(self.next_id))
+            self.next_id += 1
+        return ready
+
+def checkpoint_path(filename):
+    return filename + ".checkpoint"
+
+def load_checkpoint(filename, start_id, end_id):
+    """Where to resume a scan of this range, or None to start over"""
+    path = checkpoint_path(filename)
+    if not (os.path.exists(path) and os.path.exists(filename)):
+        return None
+    with open(path, 'r') as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('start_id') != start_id or not start_id <= checkpoint['next_id'] <= end_id + 1:
+        return None
+    return checkpoint
+
+def save_checkpoint(filename, start_id, next_id, offset):
+    # Written to a temporary file first so an interrupted save never corrupts it
+    path = checkpoint_path(filename)
+    with open(path + ".tmp", 'w') as f:
+        json.dump({'start_id': start_id, 'next_id': next_id, 'offset': offset}, f)
+    os.replace(path + ".tmp", path)
+
+def scan_range(start_id, end_id, filename='math_genealogy_all.csv', workers=8, rate=10.0,
+               resume=True, base_url=BASE_URL):
+    """
+    Check every ID in [start_id, end_id] concurrently and write the results in ID order.
+    The scan can be interrupted at any point and resumed from its last checkpoint.
+    """
+    checkpoint = load_checkpoint(filename, start_id, end_id) if resume else None
+    if checkpoint:
+        next_id = checkpoint['next_id']
+        csvfile = open(filename, 'r+', newline='', encoding='utf-8')
+        # Drop rows written after the last checkpoint; they are fetched again
+        csvfile.truncate(checkpoint['offset'])
+        csvfile.seek(checkpoint['offset'])
+        print(f"Resuming at ID {next_id}")
+    else:
+        next_id = start_id
+        csvfile = open(filename, 'w', newline='', encoding='utf-8')
+        csv.writer(csvfile).writerow(['Link', 'Name', 'Status'])
+
+    writer = csv.writer(csvfile)
+    limiter = RateLimiter(rate)
+    local = threading.local()
+    counts = {'Valid': 0, 'Invalid': 0, 'Error': 0}
+    started = time.time()
+
+    def fetch(id):
+        if not hasattr(local, 'session'):
+            local.session = make_session()
+        limiter.wait()
+        return id, check_math_genealogy_id(id, local.session, base_url)
+
+    ids = iter(range(next_id, end_id + 1))
+    buffer = ReorderBuffer(next_id)
+    unsaved = 0
+    # A bounded window of requests keeps memory flat however long the range is
+    window = workers * 4
+
+    with csvfile, ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = set()
+        try:
+            while True:
+                for id in ids:
+                    in_flight.add(executor.submit(fetch, id))
+                    if len(in_flight) >= window:
+                        break
+                if not in_flight:
+                    break
+
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    id, (name, link, status) = future.result()
+                    for row in buffer.push(id, [link, name or '', status]):
+                        writer.writerow(row)
+                        counts[row[2]] += 1
+                        unsaved += 1
+
+                if unsaved >= CHECKPOINT_EVERY:
+                    csvfile.flush()
+                    save_checkpoint(filename, start_id, buffer.next_id, csvfile.tell())
+                    unsaved = 0
+                    rate_now = (buffer.next_id - next_id) / max(time.time() - started, 1e-9)
+                    print(f"Checked up to ID {buffer.next_id - 1} ({rate_now:.1f} IDs/s, "
+                          f"{counts['Valid']} valid, {counts['Error']} errors)", flush=True)
+        except KeyboardInterrupt:
+            print("\nInterrupted; waiting for requests in flight...")
+            for future in in_flight:
+                future.cancel()
+            raise
+        finally:
+            csvfile.flush()
+            save_checkpoint(filename, start_id, buffer.next_id, csvfile.tell())
+
+    print(f"Finished IDs {start_id}-{end_id}. This run: {counts['Valid']} valid, {counts['Invalid']} invalid, "
+          f"{counts['Error']} errors in {time.time() - started:.1f}s")
+    return counts
+
+def retry_errors(start_id, filename, workers=8, rate=10.0, base_url=BASE_URL):
+    """
+    Check again the IDs of a finished scan whose row has status 'Error' and
+    rewrite their rows. Rows are in ID order from start_id, one per ID.
+    """
+    with open(filename, 'r', newline='', encoding='utf-8') as csvfile:
+        rows = list(csv.reader(csvfile))
+    header, rows = rows[0], rows[1:]
+    failed = [start_id + i for i, row in enumerate(rows) if row[2] == 'Error']
+    print(f"Retrying {len(failed)} IDs that failed")
+
+    limiter = RateLimiter(rate)
+    local = threading.local()
+
+    def fetch(id):
+        if not hasattr(local, 'session'):
+            local.session = make_session()
+        limiter.wait()
+        return id, check_math_genealogy_id(id, local.session, base_url)
+
+    counts = {'Valid': 0, 'Invalid': 0, 'Error': 0}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for id, (name, link, status) in executor.map(fetch, failed):
+            rows[id - start_id] = [link, name or '', status]
+            counts[status] += 1
+
+    # Written to a temporary file first so an interrupted retry keeps the old results
+    with open(filename + ".tmp", 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(header)
+        writer.writerows(rows)
+        offset = csvfile.tell()
+    os.replace(filename + ".tmp", filename)
+    save_checkpoint(filename, start_id, start_id + len(rows), offset)
+    print(f"Retried {len(failed)} IDs: {counts['Valid']} valid, {counts['Invalid']} invalid, "
+          f"{counts['Error']} still failing")
+    return counts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check a range of Mathematics Genealogy Project IDs")
+    parser.add_argument('start_id', type=int, nargs='?', default=16848)
+    parser.add_argument('end_id', type=int, nargs='?', default=16850)
+    parser.add_argument('--output', default='math_genealogy.csv')
+    parser.add_argument('--workers', type=int, default=8, help="Concurrent requests")
+    parser.add_argument('--rate', type=float, default=10.0, help="Maximum requests per second (0 = unlimited)")
+    parser.add_argument('--no-resume', action='store_true', help="Start over instead of resuming from the checkpoint")
+    parser.add_argument('--base-url', default=BASE_URL, help="URL template with {id}, e.g. a local mirror")
+    parser.add_argument('--retry-errors', action='store_true',
+                        help="After the scan, check again the IDs whose request failed (status Error)")
+    args = parser.parse_args()
+    scan_range(args.start_id, args.end_id, args.output, args.workers, args.rate,
+               resume=not args.no_resume, base_url=args.base_url)
+    if args.retry_errors:
+        retry_errors(args.start_id, args.output, args.workers, args.rate, base_url=args.base_url)